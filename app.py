@@ -1,17 +1,19 @@
 import streamlit as st
 import pandas as pd
-import requests
 import plotly.express as px
+from cinema_api.api_client import get_client
 
 # ===== إعداد الصفحة =====
 st.set_page_config(page_title="لوحة دور السينما", layout="wide")
 
 API = "https://cinema-dashboard-2.onrender.com"  # رابط الـ API بعد النشر
+api = get_client(API)
 
 # ===== حالة تسجيل الدخول =====
+# الحسابات والجلسات في الـ API (/auth)، وهنا الـ token بس
 if "user" not in st.session_state:
     st.session_state.user = None
-    st.session_state.users = {"admin": "1234"} 
+    st.session_state.token = None
 
 # ===== واجهة تسجيل الدخول =====
 if st.session_state.user is None:
@@ -23,9 +25,14 @@ if st.session_state.user is None:
         password = st.text_input("🔑 كلمة المرور", type="password", key="login_pass")
 
         if st.button("تسجيل الدخول"):
-            # تحقق بسيط (تقدري تربطيه بقاعدة بيانات أو API لاحقاً)
-            if username == "admin" and password == "1234":
+            try:
+                session = api.login(username, password)
+            except Exception as e:
+                st.error(f"⚠️ خطأ في الاتصال بالـ API: {e}")
+                st.stop()
+            if session:
                 st.session_state.user = username
+                st.session_state.token = session["token"]
                 st.success("✅ تم تسجيل الدخول بنجاح!")
                 st.rerun()
             else:
@@ -36,64 +43,55 @@ if st.session_state.user is None:
         new_pass = st.text_input("🔑 كلمة مرور", type="password", key="signup_pass")
 
         if st.button("إنشاء الحساب"):
-            if new_user in st.session_state.users:
-                st.warning("⚠️ اسم المستخدم موجود بالفعل، جرّب اسم آخر.")
-            elif len(new_user) < 3 or len(new_pass) < 3:
+            if len(new_user) < 3 or len(new_pass) < 3:
                 st.warning("⚠️ اسم المستخدم وكلمة المرور لازم تكون أطول من 3 حروف.")
             else:
-                st.session_state.users[new_user] = new_pass
-                st.success("✅ تم إنشاء الحساب بنجاح! تقدر تسجل الدخول الآن.")
+                try:
+                    created = api.signup(new_user, new_pass)
+                except Exception as e:
+                    st.error(f"⚠️ خطأ في الاتصال بالـ API: {e}")
+                    st.stop()
+                if created is None:
+                    st.warning("⚠️ إنشاء الحسابات مقفل، اطلب حساب من المسؤول.")
+                elif created:
+                    st.success("✅ تم إنشاء الحساب بنجاح! تقدر تسجل الدخول الآن.")
+                else:
+                    st.warning("⚠️ اسم المستخدم موجود بالفعل، جرّب اسم آخر.")
 # ===== الداشبورد =====
 else:
     st.sidebar.write(f"👋 مرحباً، {st.session_state.user}")
     if st.sidebar.button("🚪 تسجيل الخروج"):
-        st.session_state.user = None
+        try:
+            api.logout(st.session_state.token)
+        except Exception:
+            pass  # الجلسة تنتهي لحالها في الـ API
+        st.session_state.user = st.session_state.token = None
         st.rerun()
 
-    # ===== Fetch filtered data =====
+    # ===== Fetch dashboard summary =====
+    # كل المؤشرات تنحسب في الـ API (/dashboard/summary) على كل الصفوف، بدل
+    # ما ننزل صفوف خام (أول 100 بس) ونحسبها هنا. الرد محفوظ بين الـ reruns
     try:
-        r = requests.get(f"{API}/filter/filter/data")
-        r.raise_for_status()
-        dff = pd.DataFrame(r.json())
-
-        if not dff.empty:
-            dff["purchase_time"] = pd.to_datetime(dff["purchase_time"])
+        summary = api.fetch("/dashboard/summary", token=st.session_state.token)
 
+        if summary["tickets"]:
             # ===== KPIs =====
-            total_sales = float(dff["total"].sum()) if "total" in dff.columns else 0.0
-            tickets_count = len(dff)
-            unique_customers = dff["customer_id"].nunique() if "customer_id" in dff.columns else 0
-            unique_theaters = dff["theater_id"].nunique() if "theater_id" in dff.columns else 0
-            unique_movies = dff["movie_id"].nunique() if "movie_id" in dff.columns else 0
-
-            # العملاء المتكررين
-            repeat_customers = (
-                dff["customer_id"].value_counts().gt(1).sum()
-                if "customer_id" in dff.columns else 0
-            )
-            repeat_ratio = (repeat_customers / unique_customers * 100) if unique_customers > 0 else 0
-
-            # تقسيم الأعمدة
             col1, col2, col3, col4, col5, col6 = st.columns(6)
-            col1.metric("💰 إجمالي المبيعات", f"{total_sales:,.2f} SAR")
-            col2.metric("🎟️ عدد التذاكر", tickets_count)
-            col3.metric("👥 عدد العملاء", unique_customers)
-            col4.metric("🏢 عدد الصالات", unique_theaters)
-            col5.metric("🎬 عدد الأفلام", unique_movies)
-            col6.metric("🔄 العملاء المتكررين", f"{repeat_customers} ({repeat_ratio:.1f}%)")
+            col1.metric("💰 إجمالي المبيعات", f"{summary['total_sales']:,.2f} SAR")
+            col2.metric("🎟️ عدد التذاكر", summary["tickets"])
+            col3.metric("👥 عدد العملاء", summary["unique_customers"])
+            col4.metric("🏢 عدد الصالات", summary["unique_theaters"])
+            col5.metric("🎬 عدد الأفلام", summary["unique_movies"])
+            col6.metric("🔄 العملاء المتكررين",
+                        f"{summary['repeat_customers']} ({summary['repeat_ratio']:.1f}%)")
 
             # ===== Tabs =====
             tab1, tab2, tab3 = st.tabs(["🎬 الأفلام", "👥 العملاء", "📅 الإيرادات"])
 
             with tab1:
                 st.subheader("🎬 أفضل 5 أفلام")
-                if "Title" in dff.columns and "total" in dff.columns:
-                    top_movies = (
-                        dff.groupby("Title")["total"].sum()
-                        .sort_values(ascending=False)
-                        .reset_index()
-                        .head(5)
-                    )
+                top_movies = pd.DataFrame(summary["top_movies"]).rename(columns={"name": "Title"})
+                if not top_movies.empty:
                     fig = px.bar(
                         top_movies,
                         x="Title",
@@ -109,13 +107,8 @@ else:
 
             with tab2:
                 st.subheader("👥 أفضل العملاء")
-                if "name_y" in dff.columns and "total" in dff.columns:
-                    top_customers = (
-                        dff.groupby("name_y")["total"].sum()
-                        .sort_values(ascending=False)
-                        .reset_index()
-                        .head(5)
-                    )
+                top_customers = pd.DataFrame(summary["top_customers"]).rename(columns={"name": "name_y"})
+                if not top_customers.empty:
                     fig2 = px.pie(
                         top_customers,
                         values="total",
@@ -131,11 +124,12 @@ else:
 
             with tab3:
                 st.subheader("📅 الإيرادات اليومية")
-                if "purchase_time" in dff.columns and "total" in dff.columns:
-                    daily_rev = dff.groupby("purchase_time")["total"].sum().reset_index()
+                daily_rev = pd.DataFrame(summary["daily_revenue"])
+                if not daily_rev.empty:
+                    daily_rev["date"] = pd.to_datetime(daily_rev["date"])
                     fig3 = px.line(
                         daily_rev,
-                        x="purchase_time",
+                        x="date",
                         y="total",
                         color_discrete_sequence=px.colors.qualitative.Set2,
                         markers=True,
@@ -150,4 +144,3 @@ else:
 
     except Exception as e:
         st.error(f"⚠️ خطأ في الاتصال بالـ API: {e}")
-        dff = pd.DataFrame()
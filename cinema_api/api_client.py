@@ -0,0 +1,186 @@
+# عميل الـ API المشترك بين الداشبوردين (app.py و cinema_api/app_streamlit.py):
+#   - requests.Session واحد بـ connection pool (keep-alive) لكل عنوان API
+#   - الطلبات المستقلة تنرسل مع بعض (fan-out) فالتفاعل ياخذ زمن طلب واحد
+#   - st.cache_data مفتاحه البارامترات بعد التوحيد، ولما تخلص مدته نسأل
+#     الـ API بـ If-None-Match: لو ما تغير شي يرجع 304 بدون body
+#   - الردود مضغوطة gzip (GZipMiddleware في الـ API)
+#   - live: مؤشرات /live/kpis بالدفع (SSE) بدل إعادة الطلب
+#   - 503 + Retry-After (الـ API لسا يحمّل البيانات): ننتظر ونعيد لحد timeout
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+
+CACHE_TTL = 30     # ثواني قبل ما نتحقق من الـ API مرة ثانية
+POOL_SIZE = 8      # اتصالات مفتوحة وطلبات متوازية
+MAX_ETAGS = 256    # آخر ردود نحتفظ فيها للتحقق بالـ ETag
+
+
+def normalize(params):
+    """بارامترات الطلب كـ tuple مرتبة (بدون القيم الفاضية، والقوائم مرتبة
+    ومفصولة بفواصل) — نفس الاختيارات بأي ترتيب تعطي نفس المفتاح."""
+    items = []
+    for name, value in (params or {}).items():
+        if value is None or value == "" or value == [] or value == ():
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = ",".join(sorted(str(v) for v in value))
+        items.append((name, str(value)))
+    return tuple(sorted(items))
+
+
+def merge_delta(kpis, delta):
+    """مؤشرات سابقة + رسالة delta من /live/kpis: المفاتيح في set تنستبدل،
+    وأيام daily_revenue في days تنستبدل أو تنضاف (مرتبة بالتاريخ)."""
+    kpis = {**kpis, **delta["set"]}
+    if delta["days"]:
+        daily = {d["date"]: d for d in kpis["daily_revenue"]}
+        daily.update({d["date"]: d for d in delta["days"]})
+        kpis["daily_revenue"] = [daily[k] for k in sorted(daily)]
+    return kpis
+
+
+def auth(token):
+    """header الـ Authorization لجلسة /auth/login (فاضي بدون token)."""
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+class ApiClient:
+    def __init__(self, base, timeout=15, pool_size=POOL_SIZE):
+        self.base = base.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self._etags = OrderedDict()  # (path, params) → (etag, payload)
+        self._lock = threading.Lock()
+        self._fanout = ThreadPoolExecutor(pool_size, thread_name_prefix="api")
+
+    def get(self, path, params=None, token=None):
+        """GET يرجع JSON. لو عندنا رد سابق لنفس الطلب نرسل ETag حقه، ولو
+        الـ API رد 304 نرجع نفس الرد بدون تحميله مرة ثانية. token = جلسة
+        /auth/login (لو الـ API يطلبها)."""
+        key = (path, normalize(params))
+        with self._lock:
+            known = self._etags.get(key)
+        headers = {"If-None-Match": known[0]} if known else {}
+        headers.update(auth(token))
+        deadline = time.monotonic() + self.timeout
+        while True:
+            r = self.session.get(self.base + path, params=list(key[1]),
+                                 headers=headers, timeout=self.timeout)
+            wait = r.headers.get("Retry-After")
+            if r.status_code != 503 or not wait or time.monotonic() + float(wait) > deadline:
+                break
+            time.sleep(float(wait))
+        if r.status_code == 304 and known:
+            return known[1]
+        r.raise_for_status()
+        payload = r.json()
+        etag = r.headers.get("ETag")
+        if etag:
+            with self._lock:
+                self._etags[key] = (etag, payload)
+                self._etags.move_to_end(key)
+                while len(self._etags) > MAX_ETAGS:
+                    self._etags.popitem(last=False)
+        return payload
+
+    def download(self, path, params=None, timeout=60, token=None):
+        """الرد كامل بالبايت (مثلاً صيغة csv الـ streaming) بدون كاش."""
+        r = self.session.get(self.base + path, params=list(normalize(params)),
+                             headers=auth(token), timeout=timeout)
+        r.raise_for_status()
+        return r.content
+
+    def export(self, fmt, params=None, wait=600, interval=0.5, token=None):
+        """ملف تصدير من /exports (الـ API يجهزه في الخلفية): نطلبه، نستنى
+        لين يخلص، ونرجع محتواه بالبايت."""
+        r = self.session.post(self.base + "/exports",
+                              params=list(normalize({**(params or {}), "format": fmt})),
+                              headers=auth(token), timeout=self.timeout)
+        r.raise_for_status()
+        job = r.json()
+        deadline = time.monotonic() + wait
+        while job["status"] in ("queued", "running"):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"export {job['id']} still {job['status']}")
+            time.sleep(interval)
+            r = self.session.get(f"{self.base}/exports/{job['id']}", headers=auth(token),
+                                 timeout=self.timeout)
+            r.raise_for_status()
+            job = r.json()
+        if job["status"] != "done":
+            raise RuntimeError(f"export failed: {job['error']}")
+        return self.download(job["download"], timeout=wait, token=token)
+
+    def live(self, params=None, timeout=60, token=None):
+        """مؤشرات /dashboard/summary كاملة أول ما نشترك، وبعدها مع كل تغيير في
+        البيانات (الـ API يرسل الفرق بس ونطبقه هنا). generator ما يخلص إلا
+        لو انقطع الاتصال؛ الـ API يرسل ping كل 15 ثانية فـ timeout أطول منها."""
+        r = self.session.get(self.base + "/live/kpis", params=list(normalize(params)),
+                             headers=auth(token), stream=True, timeout=(self.timeout, timeout))
+        r.raise_for_status()
+        kpis = None
+        with r:
+            for line in r.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                message = json.loads(line[6:])
+                kpis = message["kpis"] if message["type"] == "snapshot" \
+                    else merge_delta(kpis, message)
+                yield kpis
+
+    def fetch(self, path, params=None, token=None):
+        """مثل get لكن من st.cache_data لو نفس الطلب انطلب خلال CACHE_TTL."""
+        return _cached(self, self.base, path, normalize(params), token)
+
+    def fetch_many(self, calls, token=None):
+        """[(path, params), ...] → الردود بنفس الترتيب، كلها بالتوازي."""
+        return list(self._fanout.map(lambda call: self.fetch(*call, token=token), calls))
+
+    # -----------------------
+    # الدخول (/auth)
+    # -----------------------
+    def login(self, username, password):
+        """{"token", "expires", ...} أو None لو البيانات غلط."""
+        r = self.session.post(self.base + "/auth/login", timeout=self.timeout,
+                              json={"username": username, "password": password})
+        if r.status_code == 401:
+            return None
+        r.raise_for_status()
+        return r.json()
+
+    def signup(self, username, password, token=None):
+        """True لو الحساب انضاف، False لو الاسم موجود، None لو إنشاء الحسابات
+        مقفل (CINEMA_AUTH_REQUIRED: للمسؤولين بس، token مسؤول)."""
+        r = self.session.post(self.base + "/auth/users", timeout=self.timeout,
+                              headers=auth(token),
+                              json={"username": username, "password": password})
+        if r.status_code == 409:
+            return False
+        if r.status_code in (401, 403):
+            return None
+        r.raise_for_status()
+        return True
+
+    def logout(self, token):
+        self.session.post(self.base + "/auth/logout", timeout=self.timeout,
+                          headers=auth(token))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _cached(_client, base, path, params, token=None):
+    return _client.get(path, dict(params), token)
+
+
+@st.cache_resource
+def get_client(base):
+    """عميل واحد (ونفس الاتصالات) لكل عنوان API طول عمر تطبيق Streamlit."""
+    return ApiClient(base)
@@ -1,44 +1,68 @@
 # app_streamlit.py
 import streamlit as st
 import pandas as pd
-import requests
-import io
 import plotly.express as px
 from datetime import datetime
+import requests
+from api_client import get_client
 
 API = "http://127.0.0.1:8000"  # عدّليه لو الـ API شغّال على عنوان آخر
+api = get_client(API)
 
 st.set_page_config(page_title="🎬 لوحة دور السينما (API)", layout="wide")
 st.title("🔗 لوحة دور السينما (API) — Streamlit")
 # -----------------------
-# 1) تحميل بيانات خام (cache)
+# 0) الدخول: لو الـ API يطلب token (CINEMA_AUTH_REQUIRED=1) كل الطلبات ترسله
+# -----------------------
+token = st.session_state.setdefault("token", None)
+with st.sidebar.expander("🔐 الدخول", expanded=token is None):
+    if token is None:
+        username = st.text_input("👤 اسم المستخدم", key="login_user")
+        password = st.text_input("🔑 كلمة المرور", type="password", key="login_pass")
+        if st.button("تسجيل الدخول"):
+            try:
+                session = api.login(username, password)
+            except Exception as e:
+                st.error(f"خطأ في الاتصال بالـ API: {e}")
+                st.stop()
+            if session:
+                st.session_state.token = session["token"]
+                st.rerun()
+            st.error("اسم المستخدم أو كلمة المرور غير صحيحة")
+    elif st.button("🚪 تسجيل الخروج"):
+        try:
+            api.logout(token)
+        except Exception:
+            pass  # الجلسة تنتهي لحالها في الـ API
+        st.session_state.token = None
+        st.rerun()
+
+# -----------------------
+# 1) خيارات الفلاتر من الـ API (cache) — بدون تحميل صفوف خام
 # -----------------------
 
 
-@st.cache_data(ttl=60)
-def load_raw():
-    """نحاول جلب بيانات 'خام' من API عبر /filter/data بدون بارامترات
-       (الـ API المفروض ترجع أول N صفوف حسب إعدادها)."""
+def load_options():
+    """الأفلام والصالات وأنواع المقاعد ومدى التاريخ من /dimensions (طلب واحد صغير)."""
     try:
-        r = requests.get(f"{API}/filter/data", timeout=10)
-        r.raise_for_status()
-        df = pd.DataFrame(r.json())
-        # تحويل الأنواع الأساسية إذا وجدت
-        if "purchase_time" in df.columns:
-            df["purchase_time"] = pd.to_datetime(
-                df["purchase_time"], errors="coerce")
-        if "total" in df.columns:
-            df["total"] = pd.to_numeric(df["total"], errors="coerce")
-        return df
+        return api.fetch("/dimensions", token=token)
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 401:
+            # الـ API يطلب دخول، أو الجلسة انتهت
+            st.session_state.token = None
+            st.info("سجلي الدخول من الشريط الجانبي لعرض البيانات.")
+            st.stop()
+        st.error(f"خطأ عند تحميل البيانات من الـ API: {e}")
+        return None
     except Exception as e:
         st.error(f"خطأ عند تحميل البيانات من الـ API: {e}")
-        return pd.DataFrame()
+        return None
 
 
-df_raw = load_raw()
-if df_raw.empty:
+options = load_options()
+if not options:
     st.warning(
-        "لم يتم تحميل بيانات أولية من الـ API أو البيانات فارغة — تأكدي أن `/filter/data` شغال.")
+        "لم يتم تحميل بيانات أولية من الـ API — تأكدي أن `/dimensions` شغال.")
     st.stop()
 
 # -----------------------
@@ -47,80 +71,49 @@ if df_raw.empty:
 st.sidebar.header("🔍 الفلاتر")
 
 # تاريخ (نستخدم نطاق حسب data)
-min_date = df_raw["purchase_time"].min().date(
-) if "purchase_time" in df_raw.columns else datetime.today().date()
-max_date = df_raw["purchase_time"].max().date(
-) if "purchase_time" in df_raw.columns else datetime.today().date()
+date_range_api = options["date_range"]
+min_date = pd.to_datetime(date_range_api["min"]).date(
+) if date_range_api["min"] else datetime.today().date()
+max_date = pd.to_datetime(date_range_api["max"]).date(
+) if date_range_api["max"] else datetime.today().date()
 date_range = st.sidebar.date_input("📅 نطاق التاريخ", (min_date, max_date))
 
-# دوال مساعدة لاستخراج الأسماء/أعمدة مع fallback
-
-
-def col_pair(df, id_candidates, name_candidates):
-    """ترجع (id_col, name_col) إن وُجدا، أو (None,None)."""
-    id_col = next((c for c in id_candidates if c in df.columns), None)
-    name_col = next((c for c in name_candidates if c in df.columns), None)
-    return id_col, name_col
-
-
-movie_id_col, movie_name_col = col_pair(
-    df_raw, ["movie_id", "movieId", "movie"], ["Title", "title", "movie_title"])
-cust_id_col, cust_name_col = col_pair(df_raw, ["customer_id", "cust_id"], [
-                                      "Customer", "name", "customer_name", "name_y"])
-theater_id_col, theater_name_col = col_pair(
-    df_raw, ["theater_id"], ["name_x", "theater_name", "name"])
-seat_col = next(
-    (c for c in ["seat_type", "seat", "seatType"] if c in df_raw.columns), None)
-
-# خيارات الأفلام (عرض الاسم لكن نرسل الـ id)
-movie_options = []
-movie_map = {}
-if movie_id_col and movie_name_col:
-    movies_df = df_raw[[movie_id_col, movie_name_col]
-                       ].drop_duplicates().dropna()
-    movie_map = dict(zip(movies_df[movie_name_col].astype(
-        str), movies_df[movie_id_col].astype(str)))
-    movie_options = sorted(movie_map.keys())
-elif movie_id_col:
-    movie_options = sorted(df_raw[movie_id_col].astype(
-        str).drop_duplicates().tolist())
-
-sel_movies = st.sidebar.multiselect("🎬 الأفلام", options=movie_options)
-
-# عملاء
-cust_options = []
-cust_map = {}
-if cust_id_col and cust_name_col:
-    cust_df = df_raw[[cust_id_col, cust_name_col]].drop_duplicates().dropna()
-    cust_map = dict(zip(cust_df[cust_name_col].astype(
-        str), cust_df[cust_id_col].astype(str)))
-    cust_options = sorted(cust_map.keys())
-elif cust_id_col:
-    cust_options = sorted(df_raw[cust_id_col].astype(
-        str).drop_duplicates().tolist())
-
-sel_customers = st.sidebar.multiselect("👥 العملاء", options=cust_options)
-
-# صالات
-theater_options = []
-theater_map = {}
-if theater_id_col and theater_name_col:
-    th_df = df_raw[[theater_id_col, theater_name_col]
-                   ].drop_duplicates().dropna()
-    theater_map = dict(zip(th_df[theater_name_col].astype(
-        str), th_df[theater_id_col].astype(str)))
-    theater_options = sorted(theater_map.keys())
-elif theater_id_col:
-    theater_options = sorted(df_raw[theater_id_col].astype(
-        str).drop_duplicates().tolist())
-
-sel_theaters = st.sidebar.multiselect("🏢 الصالات", options=theater_options)
+
+def name_map(items):
+    """{الاسم المعروض: الـ ID} — نعرض الاسم لكن نرسل الـ id."""
+    return {str(item["name"]): str(item["id"]) for item in items}
+
+
+movie_map = name_map(options["movies"])
+sel_movies = st.sidebar.multiselect("🎬 الأفلام", options=sorted(movie_map))
+
+# العملاء كتير: بحث بالاسم (/dimensions/customers/search) بدل تحميل القائمة كلها
+picked = st.session_state.setdefault("picked_customers", {})
+query = st.sidebar.text_input(
+    f"🔎 ابحث عن عميل ({options['customers']['count']})").strip()
+if query:
+    try:
+        # الأسماء تتكرر بين العملاء، فنضيف الـ ID للعرض
+        picked.update({f"{c['name']} ({c['id']})": str(c["id"]) for c in api.fetch(
+            options["customers"]["search"], {"q": query}, token=token)})
+    except Exception as e:
+        st.sidebar.error(f"تعذّر البحث عن العملاء: {e}")
+cust_map = dict(picked)
+sel_customers = st.sidebar.multiselect("👥 العملاء", options=sorted(cust_map))
+
+theater_map = name_map(options["theaters"])
+sel_theaters = st.sidebar.multiselect("🏢 الصالات", options=sorted(theater_map))
 
 # نوع المقعد
-seat_options = df_raw[seat_col].dropna().astype(
-    str).unique().tolist() if seat_col else []
 sel_seats = st.sidebar.multiselect(
-    "💺 نوع المقعد", options=sorted(seat_options))
+    "💺 نوع المقعد", options=options["seat_types"])
+
+# الملفات تنجهز في الـ API (/exports)، فنطلبها بس لو انطلبت
+want_excel = st.sidebar.checkbox("📥 تجهيز ملف Excel للبيانات المفلترة")
+want_pdf = st.sidebar.checkbox("📄 تجهيز تقرير PDF")
+
+# المؤشرات تتحدث لحالها من الـ API (/live/kpis) بدل ما نعيد الطلب
+want_live = st.sidebar.checkbox("⚡ تحديث المؤشرات مباشرة")
 
 # الحد الأدنى للمبيعات
 # min_total = st.sidebar.number_input(
@@ -138,26 +131,13 @@ if st.sidebar.button("تطبيق الفلاتر"):
         params["end_date"] = str(date_range[1])
 
     if sel_movies:
-        # نحول الأسماء إلى IDs إذا كان لدينا map، وإلا نرسل الأسماء/IDs مباشرة
-        if movie_map:
-            movie_ids = [movie_map[m] for m in sel_movies]
-        else:
-            movie_ids = sel_movies
-        params["movies"] = ",".join(movie_ids)
+        params["movies"] = ",".join(movie_map[m] for m in sel_movies)
 
     if sel_customers:
-        if cust_map:
-            customer_ids = [cust_map[c] for c in sel_customers]
-        else:
-            customer_ids = sel_customers
-        params["customers"] = ",".join(customer_ids)
+        params["customers"] = ",".join(cust_map[c] for c in sel_customers)
 
     if sel_theaters:
-        if theater_map:
-            th_ids = [theater_map[t] for t in sel_theaters]
-        else:
-            th_ids = sel_theaters
-        params["theaters"] = ",".join(th_ids)
+        params["theaters"] = ",".join(theater_map[t] for t in sel_theaters)
 
     if sel_seats:
         params["seat_type"] = ",".join(sel_seats)
@@ -165,135 +145,126 @@ if st.sidebar.button("تطبيق الفلاتر"):
     if min_total and min_total > 0:
         params["min_total"] = str(min_total)
 
+    # مكان النتائج ثم المقارنة: الـ slider لازم ينقرأ قبل الطلبات عشان
+    # الثلاث طلبات تنرسل مع بعض
+    results_area = st.empty()  # يتبدل كامل مع كل تحديث مباشر
+    compare_area = st.container()
+    with compare_area:
+        st.title("🎟️ مقارنة توزيع المبيعات")
+
+        # ===== اختيار الحد الأدنى =====
+        compare_min = st.slider("💰 اختر الحد الأدنى للمبيعات", 0,
+                                int(options["max_total"]), 0)
+
     # -----------------------
-    # 4) طلب البيانات المفلترة من الـ API
+    # 4) طلب المؤشرات وتوزيع المبيعات (قبل/بعد الحد الأدنى) من الـ API بالتوازي
     # -----------------------
     try:
-        r = requests.get(f"{API}/filter/data", params=params, timeout=15)
-        r.raise_for_status()
-        dff = pd.DataFrame(r.json())
-        if not dff.empty:
-            if "purchase_time" in dff.columns:
-                dff["purchase_time"] = pd.to_datetime(
-                    dff["purchase_time"], errors="coerce")
-            if "total" in dff.columns:
-                dff["total"] = pd.to_numeric(dff["total"], errors="coerce")
-        else:
-            st.warning("لا توجد بيانات مطابقة للفلاتر الحالية.")
+        summary, spread = api.fetch_many([
+            ("/dashboard/summary", params),
+            ("/stats/distribution", {"field": "total", "bins": 20, "min_total": compare_min}),
+        ], token=token)
     except Exception as e:
         st.error(f"خطأ في الاتصال بالـ API: {e}")
         st.stop()
 
     # -----------------------
-    # 5) عرض النتائج + KPIs + رسومات + تحميل Excel
+    # 5) عرض النتائج + KPIs + رسومات + تحميل Excel و PDF
     # -----------------------
-    st.success(f"✅ عدد السجلات بعد التصفية: {len(dff)}")
-    st.dataframe(dff.head(20), use_container_width=True)
-
-    # KPIs
-    col1, col2, col3, col4 = st.columns(4)
-    total_sales = float(dff["total"].sum()) if "total" in dff.columns else 0.0
-    tickets_count = len(dff)
-    unique_customers = dff["customer_id"].nunique(
-    ) if "customer_id" in dff.columns else 0
-    unique_movies = dff["movie_id"].nunique(
-    ) if "movie_id" in dff.columns else 0
-
-    col1.metric("💰 إجمالي المبيعات", f"{total_sales:,.2f} SAR")
-    col2.metric("🎟️ عدد التذاكر", f"{tickets_count:,}")
-    col3.metric("👥 العملاء الفريدون", f"{unique_customers}")
-    col4.metric("🎬 الأفلام الفريدة", f"{unique_movies}")
-
-    # Top Movies (محليًا بعد الفلترة)
-    if "Title" in dff.columns and "total" in dff.columns:
-        top_movies = dff.groupby("Title")["total"].sum().sort_values(
-            ascending=False).head(10).reset_index()
-        fig = px.bar(top_movies, x="Title", y="total",
-                     title="🏷️ الإيرادات حسب الفيلم (بعد الفلترة)", text_auto=True)
-        st.plotly_chart(fig, use_container_width=True)
-
-     # Revenue by Theater
-    if theater_name_col and "total" in dff.columns:
-        rev_th = dff.groupby(theater_name_col)["total"].sum(
-        ).sort_values(ascending=False).reset_index()
-        fig2 = px.bar(rev_th, x=theater_name_col, y="total",
-                      title="🏛️ الإيرادات حسب الصالة", text_auto=True)
-        st.plotly_chart(fig2, use_container_width=True)
-
-    # Daily revenue
-    if "purchase_time" in dff.columns and "total" in dff.columns:
-        daily = dff.groupby(dff["purchase_time"].dt.date)[
-            "total"].sum().reset_index()
-        daily.columns = ["date", "total"]
-        daily["date"] = pd.to_datetime(daily["date"])
-        fig3 = px.line(daily, x="date", y="total", markers=True,
-                       title="📅 الإيرادات اليومية")
-        st.plotly_chart(fig3, use_container_width=True)
-
-     # هيستوغرام لتوزيع المبيعات
-    # fig = px.histogram(
-    #     dff, x="total", nbins=20,
-    #     title=f"📊 توزيع المبيعات (مع حد أدنى {min_total})"
-    # )
-    # st.plotly_chart(fig, use_container_width=True)
-
-    # # عرض القيم الدنيا والعظمى
-    # st.write("Min total:", dff["total"].min())
-    # st.write("Max total:", dff["total"].max())
-
-    st.title("🎟️ مقارنة توزيع المبيعات")
-
-# ===== جلب البيانات الكاملة (بدون فلترة) =====
-    # نحدد limit كبير شوية
-    r_full = requests.get(f"{API}/filter/data?limit=5000")
-    r_full.raise_for_status()
-    df_full = pd.DataFrame(r_full.json())
-
-    # ===== اختيار الحد الأدنى =====
-    min_total = st.slider("💰 اختر الحد الأدنى للمبيعات", 0,
-                          int(df_full["total"].max()), 0)
-
-    # ===== جلب البيانات المفلترة =====
-    params = {"min_total": min_total}
-    r_filtered = requests.get(f"{API}/filter/data", params=params)
-    r_filtered.raise_for_status()
-    df_filtered = pd.DataFrame(r_filtered.json())
-
-    # ===== رسم المقارنة =====
-    if df_filtered.empty:
-        st.warning("⚠️ لا توجد بيانات مطابقة.")
-    else:
-        st.success(f"✅ عدد السجلات بعد الفلترة: {len(df_filtered)}")
-
-        # إضافة عمود لتحديد الحالة
-        df_full["status"] = "📊 قبل الفلترة"
-        df_filtered["status"] = f"✅ بعد الفلترة (>{min_total})"
-
-        # دمج الاثنين
-        combined = pd.concat([df_full, df_filtered])
-
-        fig = px.histogram(
-            combined, x="total", nbins=20, color="status",
-            barmode="overlay",  # overlay = فوق بعض للوضوح
-            title=f"📊 مقارنة توزيع المبيعات (حد أدنى {min_total})"
-        )
-        st.plotly_chart(fig, use_container_width=True)
-
-        # إظهار القيم
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric("Min (قبل)", f"{df_full['total'].min():,.2f}")
-            st.metric("Max (قبل)", f"{df_full['total'].max():,.2f}")
-        with col2:
-            st.metric("Min (بعد)", f"{df_filtered['total'].min():,.2f}")
-            st.metric("Max (بعد)", f"{df_filtered['total'].max():,.2f}")
-
-    # Excel export
-    buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        dff.to_excel(writer, index=False, sheet_name="Filtered")
-    buffer.seek(0)
-    st.download_button("📥 تحميل Excel (البيانات بعد الفلترة)", data=buffer, file_name="filtered_data.xlsx",
-                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    def show_summary(summary, update=0):
+        # update في مفاتيح الرسومات: نفس الرسمة تنرسم أكثر من مرة في نفس الـ run
+        with results_area.container():
+            if not summary["tickets"]:
+                st.warning("لا توجد بيانات مطابقة للفلاتر الحالية.")
+            st.success(f"✅ عدد السجلات بعد التصفية: {summary['tickets']:,}")
+
+            # KPIs
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("💰 إجمالي المبيعات", f"{summary['total_sales']:,.2f} SAR")
+            col2.metric("🎟️ عدد التذاكر", f"{summary['tickets']:,}")
+            col3.metric("👥 العملاء الفريدون", f"{summary['unique_customers']}")
+            col4.metric("🎬 الأفلام الفريدة", f"{summary['unique_movies']}")
+
+            # Top Movies (بعد الفلترة)
+            top_movies = pd.DataFrame(summary["top_movies"]).rename(columns={"name": "Title"})
+            if not top_movies.empty:
+                fig = px.bar(top_movies, x="Title", y="total",
+                             title="🏷️ الإيرادات حسب الفيلم (بعد الفلترة)", text_auto=True)
+                st.plotly_chart(fig, use_container_width=True, key=f"top_movies_{update}")
+
+            # Revenue by Theater
+            rev_th = pd.DataFrame(summary["revenue_by_theater"]).rename(columns={"name": "name_x"})
+            if not rev_th.empty:
+                fig2 = px.bar(rev_th, x="name_x", y="total",
+                              title="🏛️ الإيرادات حسب الصالة", text_auto=True)
+                st.plotly_chart(fig2, use_container_width=True, key=f"theaters_{update}")
+
+            # Daily revenue
+            daily = pd.DataFrame(summary["daily_revenue"])
+            if not daily.empty:
+                daily["date"] = pd.to_datetime(daily["date"])
+                fig3 = px.line(daily, x="date", y="total", markers=True,
+                               title="📅 الإيرادات اليومية")
+                st.plotly_chart(fig3, use_container_width=True, key=f"daily_{update}")
+
+    show_summary(summary)
+
+    # ===== توزيع المبيعات قبل وبعد الفلترة (الـ histogram محسوب في الـ API) =====
+    with compare_area:
+        before, after = spread["baseline"], spread["slice"]
+        if not after["count"]:
+            st.warning("⚠️ لا توجد بيانات مطابقة.")
+        else:
+            st.success(f"✅ عدد السجلات بعد الفلترة: {after['count']:,}")
+
+            edges = spread["edges"]
+            bars = pd.concat([
+                pd.DataFrame({"total": [(a + b) / 2 for a, b in zip(edges, edges[1:])],
+                              "count": part["histogram"], "status": status})
+                for part, status in ((before, "📊 قبل الفلترة"),
+                                     (after, f"✅ بعد الفلترة (>{compare_min})"))])
+            fig = px.bar(bars, x="total", y="count", color="status",
+                         barmode="overlay",  # overlay = فوق بعض للوضوح
+                         title=f"📊 مقارنة توزيع المبيعات (حد أدنى {compare_min})")
+            fig.update_traces(width=edges[1] - edges[0] if len(edges) > 1 else None)
+            st.plotly_chart(fig, use_container_width=True)
+
+            # إظهار القيم
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Min (قبل)", f"{before['min']:,.2f}")
+                st.metric("Max (قبل)", f"{before['max']:,.2f}")
+                st.metric("Median (قبل)", f"{before['quantiles']['p50']:,.2f}")
+            with col2:
+                st.metric("Min (بعد)", f"{after['min']:,.2f}")
+                st.metric("Max (بعد)", f"{after['max']:,.2f}")
+                st.metric("Median (بعد)", f"{after['quantiles']['p50']:,.2f}")
+
+    # Excel (الصفوف كاملة) وتقرير PDF — الـ API يكتبهم في الخلفية ويحفظهم،
+    # فنفس الفلاتر مرة ثانية ترجع الملف الجاهز
+    try:
+        if want_excel:
+            with st.spinner("تجهيز ملف Excel..."):
+                workbook = api.export("xlsx", params, token=token)
+            st.download_button("📥 تحميل Excel (البيانات بعد الفلترة)", data=workbook,
+                               file_name="filtered_data.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        if want_pdf:
+            with st.spinner("تجهيز تقرير PDF..."):
+                report = api.export("pdf", params, token=token)
+            st.download_button("📄 تحميل تقرير PDF", data=report, file_name="cinema_report.pdf",
+                               mime="application/pdf")
+    except Exception as e:
+        st.error(f"خطأ في تجهيز الملف: {e}")
+
+    # آخر شي في الصفحة: الـ run يبقى شغال ويرسم المؤشرات مع كل تحديث من
+    # الـ API، وأي تغيير في الفلاتر يوقفه ويبدأ run جديد
+    if want_live:
+        try:
+            for update, kpis in enumerate(api.live(params, token=token)):
+                if update:  # أول رسالة = نفس summary اللي انرسم
+                    show_summary(kpis, update)
+        except Exception as e:
+            st.warning(f"انقطع التحديث المباشر: {e}")
 else:
     st.info("اضغطي 'تطبيق الفلاتر' في الشريط الجانبي لعرض النتائج.")
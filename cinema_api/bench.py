@@ -0,0 +1,222 @@
+# قياس أداء الـ API على بيانات synthetic.py بأحجام كبيرة:
+#   - زمن التحميل (cold: من الـ CSV وبناء الـ snapshot، warm: من الـ snapshot)
+#   - أعلى RSS للعملية
+#   - لكل endpoint: p50/p95/p99 بالملي ثانية وعدد الطلبات بالثانية (كل طلب
+#     بتاريخ بداية مختلف عشان ما يجي من كاش النتائج)
+# كل قياس في عملية جديدة: زمن التحميل من استيراد main لحد ما /health/ready
+# يرجع 200 (البيانات تنحمّل بالخلفية بعد بداية الـ API)، والنتيجة تنحفظ JSON
+# في benchmarks/ وتنقارن مع آخر baseline لنفس الحجم.
+#
+#   python -m cinema_api.bench 1m               # قياس ومقارنة مع benchmarks/1m.json
+#   python -m cinema_api.bench 10m --save       # قياس وحفظه كـ baseline
+#   python -m cinema_api.bench 1m --check       # exit 1 لو فيه تراجع أكثر من --tolerance
+#   python -m cinema_api.bench 1m --store partitioned   # baseline منفصل: benchmarks/1m-partitioned.json
+import argparse
+import json
+import os
+from pathlib import Path
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from cinema_api.metrics import percentile
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = ROOT / "benchmarks"
+DATA_ROOT = Path(os.environ.get("CINEMA_BENCH_DATA",
+                                Path(tempfile.gettempdir()) / "cinema-bench"))
+
+SCALES = {"1m": 1_000_000, "5m": 5_000_000, "10m": 10_000_000, "50m": 50_000_000}
+
+# {t} = تاريخ بداية مختلف لكل طلب
+ENDPOINTS = {
+    "root": "/",
+    "dashboard/options": "/dashboard/options",
+    "dashboard/summary": "/dashboard/summary?start_date={t}",
+    "dashboard/summary approx": "/dashboard/summary?approx=true&start_date={t}",
+    "movies/top": "/movies/movies/top?start_date={t}",
+    "customers/top": "/customers/customers/top?start_date={t}",
+    "revenue/daily": "/revenue/revenue/daily?start_date={t}",
+    "revenue/series": "/revenue/revenue/series?granularity=week&window=4&start_date={t}",
+    "stats/distribution": "/stats/distribution?min_total=50&start_date={t}",
+    "shows/occupancy": "/shows/occupancy?by=movie&start_date={t}",
+    "filter/data": "/filter/filter/data?limit=100&start_date={t}",
+    "filter/data movie": "/filter/filter/data?limit=100&movies=M001&start_date={t}",
+    "filter/data csv": "/filter/filter/data?format=csv&limit=10000&start_date={t}",
+}
+
+# المقاييس اللي تنقارن مع الـ baseline (الأكبر = أسوأ)
+COMPARED = ["p50_ms", "p99_ms"]
+
+
+def scale_rows(scale):
+    return SCALES[scale] if scale in SCALES else int(scale.replace("_", ""))
+
+
+def peak_rss_mb():
+    import resource
+
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(kb / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# -----------------------
+# داخل عملية القياس
+# -----------------------
+def child(requests, endpoints):
+    t0 = time.perf_counter()
+    from fastapi.testclient import TestClient
+    from cinema_api.main import app
+    from cinema_api.data_loader import get_snapshot
+
+    with TestClient(app) as client:
+        while client.get("/health/ready").status_code != 200:
+            live = client.get("/health/live")
+            if live.status_code != 200:
+                raise RuntimeError(f"warm-up failed: {live.json()}")
+            time.sleep(0.01)
+        out = {"load_s": round(time.perf_counter() - t0, 3),
+               "rows": get_snapshot().rows, "load_rss_mb": peak_rss_mb(), "endpoints": {}}
+        if not endpoints:
+            return out
+
+        n = 0
+        for name in endpoints:
+            path = ENDPOINTS[name]
+            latencies, errors = [], 0
+            started = time.perf_counter()
+            for i in range(requests + 2):  # أول طلبين تسخين
+                n += 1
+                t = f"2025-01-01T00:{n // 60 % 60:02d}:{n % 60:02d}"
+                t1 = time.perf_counter()
+                r = client.get(path.format(t=t))
+                if i >= 2:
+                    latencies.append((time.perf_counter() - t1) * 1000)
+                    errors += r.status_code != 200
+                else:
+                    started = time.perf_counter()
+            elapsed = time.perf_counter() - started
+            out["endpoints"][name] = {
+                "p50_ms": round(percentile(latencies, 0.50), 2),
+                "p95_ms": round(percentile(latencies, 0.95), 2),
+                "p99_ms": round(percentile(latencies, 0.99), 2),
+                "mean_ms": round(sum(latencies) / len(latencies), 2),
+                "req_per_s": round(len(latencies) / elapsed, 1),
+                "errors": errors,
+            }
+    out["peak_rss_mb"] = peak_rss_mb()
+    return out
+
+
+# -----------------------
+# العملية الرئيسية
+# -----------------------
+def dataset(tickets, seed):
+    """مجلد البيانات لهذا الحجم (ينولد مرة وحدة ويبقى للقياسات الجاية)."""
+    from cinema_api import synthetic
+
+    directory = DATA_ROOT / f"{tickets}-{seed}"
+    if not (directory / "tickets.csv").exists():
+        t0 = time.perf_counter()
+        synthetic.generate(directory, tickets, seed)
+        print(f"generated {tickets:,} tickets in {time.perf_counter() - t0:.1f}s -> {directory}")
+    return directory
+
+
+def spawn(directory, workers, requests=0, endpoints=(), store="memory"):
+    env = {**os.environ, "CINEMA_DATA_DIR": str(directory),
+           "CINEMA_SNAPSHOT_DIR": str(directory / ".snapshot"),
+           "CINEMA_PARTITIONS_DIR": str(directory / ".partitions"), "CINEMA_STORE": store,
+           "CINEMA_WATCH_INTERVAL": "0", "CINEMA_POOL_WORKERS": str(workers)}
+    cmd = [sys.executable, "-m", "cinema_api.bench", "--child",
+           "--requests", str(requests), *(["--endpoints", *endpoints] if endpoints else [])]
+    done = subprocess.run(cmd, cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+
+def run(scale, seed=0, requests=50, workers=0, endpoints=None, store="memory"):
+    tickets = scale_rows(scale)
+    directory = dataset(tickets, seed)
+    shutil.rmtree(directory / (".partitions" if store == "partitioned" else ".snapshot"),
+                  ignore_errors=True)
+    cold = spawn(directory, workers, store=store)
+    warm = spawn(directory, workers, requests, endpoints or list(ENDPOINTS), store)
+    return {
+        "scale": scale,
+        "tickets": tickets,
+        "seed": seed,
+        "store": store,
+        "workers": workers,
+        "requests": requests,
+        "when": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": f"{platform.machine()} x{os.cpu_count()}",
+        "load": {"cold_s": cold["load_s"], "warm_s": warm["load_s"]},
+        "rss_mb": {"cold_load": cold["load_rss_mb"], "warm_load": warm["load_rss_mb"],
+                   "peak": warm["peak_rss_mb"]},
+        "endpoints": warm["endpoints"],
+    }
+
+
+def compare(result, baseline, tolerance):
+    """[(المقياس، القديم، الجديد)] للمقاييس اللي زادت أكثر من tolerance
+    (والفرق أكبر من 1ms أو 10MB، عشان التذبذب في الأرقام الصغيرة)."""
+    pairs = [(f"load {k}", baseline["load"].get(k), v, 0.05)
+             for k, v in result["load"].items()]
+    pairs.append(("rss peak", baseline["rss_mb"].get("peak"), result["rss_mb"]["peak"], 10))
+    for name, stats in result["endpoints"].items():
+        old = baseline["endpoints"].get(name, {})
+        pairs.extend((f"{name} {m}", old.get(m), stats[m], 1.0) for m in COMPARED)
+    return [(label, old, new) for label, old, new, floor in pairs
+            if old is not None and new > old * (1 + tolerance) and new - old > floor]
+
+
+def report(result):
+    print(f"{result['tickets']:,} tickets   load cold {result['load']['cold_s']:.2f}s "
+          f"warm {result['load']['warm_s']:.2f}s   peak RSS {result['rss_mb']['peak']:.0f} MB")
+    print(f"  {'endpoint':<26}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}")
+    for name, s in result["endpoints"].items():
+        errors = f"  errors {s['errors']}" if s["errors"] else ""
+        print(f"  {name:<26}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}"
+              f"{s['req_per_s']:>9.1f}{errors}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="cinema API benchmark")
+    parser.add_argument("scale", nargs="?", default="1m",
+                        help="1m / 5m / 10m / 50m أو عدد التذاكر")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=50, help="طلبات لكل endpoint")
+    parser.add_argument("--workers", type=int, default=0, help="CINEMA_POOL_WORKERS")
+    parser.add_argument("--endpoints", nargs="*", choices=list(ENDPOINTS))
+    parser.add_argument("--store", choices=["memory", "partitioned"], default="memory",
+                        help="CINEMA_STORE")
+    parser.add_argument("--save", action="store_true", help="حفظ النتيجة كـ baseline")
+    parser.add_argument("--check", action="store_true", help="exit 1 لو فيه تراجع")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.requests, args.endpoints)))
+        sys.exit()
+
+    result = run(args.scale, args.seed, args.requests, args.workers, args.endpoints,
+                 args.store)
+    report(result)
+    suffix = "" if args.store == "memory" else f"-{args.store}"
+    path = BENCH_DIR / f"{args.scale}{suffix}.json"
+    regressions = []
+    if path.exists():
+        regressions = compare(result, json.loads(path.read_text()), args.tolerance)
+        for label, old, new in regressions:
+            print(f"REGRESSION {label}: {old} -> {new}")
+        if not regressions:
+            print(f"no regressions vs {path.relative_to(ROOT)}")
+    if args.save:
+        BENCH_DIR.mkdir(exist_ok=True)
+        path.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"saved {path.relative_to(ROOT)}")
+    sys.exit(1 if args.check and regressions else 0)
@@ -0,0 +1,153 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import secrets
+import threading
+from fastapi.responses import Response
+import pandas as pd
+from cinema_api import formats, metrics
+from cinema_api.data_loader import get_snapshot
+from cinema_api.executor import engine
+
+# حدود الكاش: عدد النتائج وحجمها بالبايت (LRU يطلع الأقدم استخداماً)
+MAX_ENTRIES = int(os.environ.get("CINEMA_CACHE_ENTRIES", "1024"))
+MAX_BYTES = int(os.environ.get("CINEMA_CACHE_BYTES", str(64 * 1024 * 1024)))
+# نسخة البيانات عدّاد داخل العملية: عمليتين (أو نفس العملية بعد إعادة تشغيل)
+# ممكن يوصلون لنفس الرقم ببيانات مختلفة، فالـ ETag فيه id العملية كمان
+PROCESS_ID = secrets.token_hex(4)
+
+
+def normalize(params):
+    """مفتاح ثابت لنفس الطلب مهما اختلف ترتيب/تكرار/حالة الـ IDs أو كتابة التاريخ."""
+    out = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = sorted({str(v).lower() for v in value})
+        elif name in ("start_date", "end_date"):
+            try:
+                value = pd.Timestamp(value).isoformat()
+            except ValueError:
+                pass  # التاريخ الغلط يوصل للـ endpoint ويرجع الخطأ من هناك
+        out[name] = value
+    return json.dumps(out, sort_keys=True, default=str)
+
+
+class ResultCache:
+    """كاش نتائج الـ endpoints (JSON جاهز بالبايت) مربوط بنسخة البيانات: أول
+    ما تتغير النسخة كل النتائج القديمة تنمسح."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key → (body, headers)
+        self.bytes = 0
+        self.version = None
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _sync(self, version):
+        # طلب بدأ على نسخة أقدم ما يمسح نتائج النسخة الأحدث
+        if self.version is None or version > self.version:
+            self.entries.clear()
+            self.bytes = 0
+            self.version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._sync(version)
+            entry = self.entries.get(key) if version == self.version else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body, headers):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._sync(version)
+            if version != self.version:
+                return
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[0])
+            self.entries[key] = (body, headers)
+            self.bytes += len(body)
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+results = ResultCache()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def cache_key(name, params):
+    return f"{name}?{normalize(params)}"
+
+
+def prefill(name, params, func, *args):
+    """يحسب نتيجة endpoint ويحطها في الكاش (تسخين الكاش وقت التشغيل)، فأول
+    طلب بنفس الـ params يرجع من الكاش."""
+    snapshot = get_snapshot()
+    results.put(cache_key(name, params), snapshot.version, *render(snapshot, func, *args))
+
+
+def render(snapshot, func, *args):
+    """func(snapshot, *args) → (JSON بالبايت، headers). التحويل لـ JSON يصير
+    مع الحساب نفسه (في الـ pool) مو على الـ event loop."""
+    content, headers = func(snapshot, *args)
+    with metrics.span("serialize"):
+        return formats.dumps(content), headers
+
+
+async def cached_response(request, name, params, func, *args):
+    """ترجع نتيجة func(snapshot, *args) من الكاش لو موجودة، مع ETag و 304 لو
+    العميل عنده نفس النسخة. func ترجع (content, headers) وتتنفذ عن طريق
+    الـ executor (inline أو process pool حسب الـ endpoint)."""
+    snapshot = get_snapshot()
+    key = cache_key(name, params)
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    # الـ ETag من العملية ونسخة البيانات والمفتاح بس، فنقدر نرد 304 قبل أي حساب
+    etag = f'"{PROCESS_ID}.{snapshot.version}.{snapshot.rows}.{digest}"'
+
+    # طلب X-Profile يحسب من جديد دايماً (الكاش والـ 304 ما يفيدون الـ profile)
+    profiling = metrics.profiling()
+    entry = None if profiling else results.get(key, snapshot.version)
+    if entry is None and (profiling or not etag_matches(request, etag)):
+        entry = await engine.run(
+            name, f"{snapshot.version}:{key}", snapshot, render, func, *args)
+        results.put(key, snapshot.version, *entry)
+
+    body, headers = entry or (b"", {})
+    headers = {**headers, "ETag": etag, "Cache-Control": "no-cache"}
+    if not profiling and etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
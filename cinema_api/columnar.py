@@ -0,0 +1,172 @@
+# Snapshot ثنائي عمودي للتذاكر: ملف .npy لكل عمود + القواميس في meta.json.
+# الـ workers يفتحون الملفات بـ mmap، فكل workers الـ uvicorn يتشاركون نفس
+# الصفحات من الـ page cache بدل ما كل واحد يقرأ الـ CSV ويسوي merge لحاله.
+#
+#   python -m cinema_api.columnar build   # بناء الـ snapshot من الـ CSV
+#   python -m cinema_api.columnar bench   # مقارنة وقت الإقلاع والذاكرة
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+import shutil
+import time
+import numpy as np
+from cinema_api.store import OBJECT, TicketStore
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FORMAT_VERSION = 2
+
+
+def current_build(directory):
+    """مجلد آخر build (CURRENT يأشر عليه)، أو None."""
+    pointer = Path(directory) / "CURRENT"
+    if not pointer.exists():
+        return None
+    build = Path(directory) / pointer.read_text().strip()
+    return build if (build / "meta.json").exists() else None
+
+
+def read_meta(build):
+    with open(build / "meta.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_stale(directory, sources):
+    """الـ snapshot ناقص أو أقدم من أي ملف CSV مصدر."""
+    build = current_build(directory)
+    if build is None:
+        return True
+    meta = read_meta(build)
+    if meta.get("format") != FORMAT_VERSION:
+        return True
+    return max(Path(s).stat().st_mtime for s in sources) > meta["source_mtime"]
+
+
+@contextmanager
+def build_lock(directory):
+    """قفل بين العمليات عشان worker واحد بس يبني الـ snapshot."""
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(Path(directory) / ".lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def write(directory, store, sources, **extra):
+    """تكتب الـ store في build جديد وبعدين تبدّل CURRENT (القراء ما يشوفون
+    build ناقص). الـ builds القديمة تنحذف — الـ mmap المفتوح عليها يبقى شغال."""
+    directory = Path(directory)
+    source_mtime = max(Path(s).stat().st_mtime for s in sources)
+    name = f"build-{time.time_ns()}-{os.getpid()}"
+    build = directory / name
+    build.mkdir(parents=True)
+
+    for column, array in store.arrays.items():
+        array = array[:store.rows]
+        if store.schema[column] == OBJECT:
+            array = array.astype(str)  # نص بعرض ثابت بدل pickle عشان mmap
+        np.save(build / f"{column}.npy", array)
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "rows": store.rows,
+        "schema": store.schema,
+        "dictionaries": {c: d.values for c, d in store.dictionaries.items()},
+        "source_mtime": source_mtime,
+        **extra,
+    }
+    write_meta(build, meta)
+    switch(directory, name)
+    return build
+
+
+def write_meta(build, meta):
+    """meta.json جديد يستبدل القديم ذرّياً (القارئ يشوف القديم أو الجديد كامل)."""
+    tmp = build / "meta.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, build / "meta.json")
+
+
+def switch(directory, name):
+    """CURRENT يأشر على build name، والـ builds القديمة تنحذف."""
+    directory = Path(directory)
+    pointer = directory / "CURRENT.tmp"
+    pointer.write_text(name)
+    os.replace(pointer, directory / "CURRENT")
+    for old in directory.glob("build-*"):
+        if old.name != name:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def read(directory, name=None):
+    """تفتح build (آخر واحد لو name فاضي) بـ mmap (قراءة فقط) وترجع (store, meta)."""
+    build = current_build(directory) if name is None else Path(directory) / name
+    meta = read_meta(build)
+    arrays = {c: np.load(build / f"{c}.npy", mmap_mode="r") for c in meta["schema"]}
+    store = TicketStore.from_arrays(meta["schema"], arrays, meta["rows"],
+                                    meta["dictionaries"])
+    return store, meta
+
+
+# -----------------------
+# قياس: وقت الإقلاع وذاكرة كل worker (CSV مقابل mmap)
+# -----------------------
+# الذاكرة تنقاس بعد استيراد pandas عشان الفرق يكون للبيانات بس
+PROBE = """
+import json, time
+import numpy, pandas
+
+def memory():
+    status = dict(line.split(":", 1) for line in open("/proc/self/status"))
+    return {k: int(status.get(k, "0 kB").split()[0]) for k in ("RssAnon", "RssFile")}
+
+before = memory()
+t0 = time.perf_counter()
+import cinema_api.data_loader as d
+d.get_snapshot()
+elapsed = time.perf_counter() - t0
+after = memory()
+print(json.dumps({"seconds": elapsed,
+                  "anon_kb": after["RssAnon"] - before["RssAnon"],
+                  "file_kb": after["RssFile"] - before["RssFile"]}))
+"""
+
+
+def bench(runs=3):
+    import subprocess
+    import sys
+
+    root = Path(__file__).resolve().parent.parent
+    results = {}
+    for label, flag in (("csv", "0"), ("mmap", "1")):
+        env = {**os.environ, "CINEMA_SNAPSHOT": flag, "CINEMA_WATCH_INTERVAL": "0"}
+        samples = [json.loads(subprocess.check_output(
+            [sys.executable, "-c", PROBE], cwd=root, env=env)) for _ in range(runs)]
+        results[label] = min(samples, key=lambda s: s["seconds"])
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        from cinema_api import data_loader
+
+        store, offset = data_loader.store_from_csv()
+        print(write(data_loader.SNAPSHOT_DIR, store, data_loader.SOURCES,
+                    tickets_offset=offset))
+    elif command == "bench":
+        for label, r in bench().items():
+            print(f"{label:<5} {r['seconds'] * 1000:8.1f} ms  "
+                  f"private +{r['anon_kb']:,} kB  shared file +{r['file_kb']:,} kB")
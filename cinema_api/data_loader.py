@@ -1,25 +1,483 @@
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from functools import cached_property
+import io
+import os
 from pathlib import Path
+import threading
+import time
+import numpy as np
 import pandas as pd
+from cinema_api import columnar, partitions, shards
+from cinema_api.metrics import span
+from cinema_api.indexes import TicketIndex
+from cinema_api.occupancy import ShowCounters
+from cinema_api.partitions import PartitionStore
+from cinema_api.rollup import RollupCube
+from cinema_api.sketches import Sketches
+from cinema_api.store import Dimension, TicketStore, TicketTable
+
+# تفعيل Copy-on-Write (افتراضي من pandas 3) عشان الـ views ما تنسخ البيانات
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 # تحديد مسار المجلد الحالي (cinema_api)
 BASE_DIR = Path(__file__).resolve().parent
+# مجلد ملفات الـ CSV — CINEMA_DATA_DIR لبيانات ثانية (مثلاً من synthetic.py)
+DATA_DIR = Path(os.environ.get("CINEMA_DATA_DIR", BASE_DIR))
+TICKETS_CSV = DATA_DIR / "tickets.csv"
+SOURCES = [TICKETS_CSV] + [DATA_DIR / f"{name}.csv"
+                           for name in ("movies", "theaters", "shows", "customers")]
+
+# الـ snapshot الثنائي (mmap) بدل قراءة الـ CSV في كل worker — CINEMA_SNAPSHOT=0 يوقفه
+USE_SNAPSHOT = os.environ.get("CINEMA_SNAPSHOT", "1") != "0"
+SNAPSHOT_DIR = Path(os.environ.get("CINEMA_SNAPSHOT_DIR", DATA_DIR / ".snapshot"))
+
+# CINEMA_STORE=partitioned: التذاكر تبقى على القرص مقسّمة حسب الشهر والصالة
+# (partitions.py) وتنقرا حسب الفلاتر، بدل ما تنحمل كاملة في الذاكرة
+STORE = os.environ.get("CINEMA_STORE", "memory")
+PARTITIONS_DIR = Path(os.environ.get("CINEMA_PARTITIONS_DIR", DATA_DIR / ".partitions"))
+CHUNK_ROWS = int(os.environ.get("CINEMA_CHUNK_ROWS", "1000000"))  # دفعات بناء الـ partitions
+
+# عمليات الـ pool (executor.py) تفتح نفس الـ build ونفس بايتات الـ CSV اللي
+# حمّلها الـ API بالضبط، بدون فحص staleness أو إعادة بناء
+PINNED_BUILD = os.environ.get("CINEMA_SNAPSHOT_BUILD")
+PINNED_BYTES = os.environ.get("CINEMA_TICKETS_BYTES")
+
+TICKET_COLUMNS = [
+    "ticket_id", "show_id", "theater_id", "movie_id", "customer_id",
+    "purchase_time", "seat_type", "price", "quantity", "total",
+]
+
+# الأعمدة النصية اللي تتكرر قيمها كثير — نخزنها كـ category (ترميز قاموسي).
+# في الـ store مفاتيح التذكرة بس؛ الباقي أعمدة أبعاد تنضاف وقت الإخراج
+CATEGORICAL_COLUMNS = [
+    "customer_id", "movie_id", "theater_id", "seat_type",
+    "Title", "name_x", "name_y", "city", "show_id", "genre",
+]
+
+# جداول الأبعاد: تنقرا في load() مع التذاكر (load_dimensions) مو وقت
+# الاستيراد، فالـ API يبدأ يستقبل طلبات بدون ما ينتظر ملف العملاء
+movies = theaters = shows = customers = None
+# مفهرسة بالـ ID: الإثراء يصير hash lookup بدل merge
+DIMENSIONS = []
+# star schema: الـ store جدول حقائق ضيّق (أعمدة tickets.csv بأكواد القاموس
+# للمفاتيح)، وأعمدة الأبعاد تنضاف لصفوف الإخراج بس (Snapshot.take و frames)
+STAR = []
+# اسم العرض لكل ID (الفيلم بعنوانه، العميل والصالة بالاسم)
+NAMES = {}
+
+
+def load_dimensions():
+    """قراءة جداول الأبعاد (صغيرة) من الملفات (مرة وحدة، من load())."""
+    global movies, theaters, shows, customers, DIMENSIONS, STAR, NAMES
+    movies = pd.read_csv(DATA_DIR / "movies.csv")
+    theaters = pd.read_csv(DATA_DIR / "theaters.csv")
+    shows = pd.read_csv(DATA_DIR / "shows.csv", parse_dates=["start_time"])
+    customers = pd.read_csv(DATA_DIR / "customers.csv")
+    # أسماء الأعمدة بنفس ناتج الـ merge القديم: name_x للصالة و name_y للعميل
+    DIMENSIONS = [
+        ("movie_id", movies.set_index("movie_id")),
+        ("theater_id", theaters.set_index("theater_id").rename(columns={"name": "name_x"})),
+        ("show_id", shows.set_index("show_id")[["start_time"]].astype("datetime64[ns]")),
+        ("customer_id", customers.set_index("customer_id").rename(columns={"name": "name_y"})),
+    ]
+    STAR = [Dimension(key, table, CATEGORICAL_COLUMNS) for key, table in DIMENSIONS]
+    NAMES = {
+        "movie_id": movies.set_index("movie_id")["Title"],
+        "customer_id": customers.set_index("customer_id")["name"],
+        "theater_id": theaters.set_index("theater_id")["name"],
+    }
+
+
+def enrich(batch):
+    """إضافة أعمدة الفيلم والصالة والعرض والعميل لتذاكر (tickets + movies +
+    theaters + shows + customers) عن طريق lookup بالـ ID لكل جدول."""
+    parts = [batch.reset_index(drop=True)]
+    for key, table in DIMENSIONS:
+        parts.append(table.reindex(batch[key].to_numpy()).reset_index(drop=True))
+    df = pd.concat(parts, axis=1)
+
+    # تحويل الأعمدة الزمنية
+    df["start_time"] = pd.to_datetime(df["start_time"], errors="coerce")
+    df["purchase_time"] = pd.to_datetime(df["purchase_time"], errors="coerce")
+    return df
+
+
+def facts(batch):
+    """صفوف جدول الحقائق: أعمدة tickets.csv بس، و purchase_time كوقت."""
+    df = batch.reset_index(drop=True)[TICKET_COLUMNS]
+    return df.assign(purchase_time=pd.to_datetime(df["purchase_time"], errors="coerce"))
+
+
+def unknown_keys(batch):
+    """IDs في الدفعة ما لها صف في جداول الأبعاد: {column: [ids]}."""
+    missing = {}
+    for key, table in DIMENSIONS:
+        ids = pd.Index(batch[key].dropna().unique())
+        ids = ids[~ids.isin(table.index)]
+        if len(ids):
+            missing[key] = ids.tolist()
+    return missing
+
+
+def duplicate_ids(batch, snapshot=None):
+    """ticket_id في الدفعة مكرر فيها أو موجود من قبل في الـ snapshot."""
+    snapshot = snapshot or get_snapshot()
+    ids = batch["ticket_id"]
+    duplicates = set(ids[ids.duplicated()])
+    wanted = pd.Index(ids.unique())
+    if snapshot.partitions is not None:
+        tables = map(snapshot.partitions.load, snapshot.partitions.fragments)
+    else:
+        tables = [snapshot.table]
+    for table in tables:
+        duplicates.update(wanted[wanted.isin(table.column("ticket_id"))])
+    return sorted(duplicates)
+
+
+def encode_categoricals(df):
+    """ترميز الأعمدة النصية المتكررة كـ category بدل نسخة نصية لكل صف."""
+    return df.astype({c: "category" for c in CATEGORICAL_COLUMNS if c in df.columns})
+
+
+def bytes_per_row(df):
+    return df.memory_usage(deep=True).sum() / max(len(df), 1)
+
+
+def read_tickets(limit=None):
+    """قراءة tickets.csv مرة وحدة، وترجع (التذاكر، عدد البايتات المقروءة) —
+    مراقب الملف يكمل من بعد هذا الـ offset بالضبط. limit = أول كم بايت بس."""
+    data = TICKETS_CSV.read_bytes()[:limit]
+    return pd.read_csv(io.BytesIO(data)), len(data)
+
+
+def store_from_csv(limit=None):
+    tickets, offset = read_tickets(limit)
+    return TicketStore.from_frame(facts(tickets), categorical=CATEGORICAL_COLUMNS), offset
+
+
+def ticket_chunks(limit, rows=CHUNK_ROWS):
+    """أول limit بايت من tickets.csv دفعة دفعة (rows تذكرة) كصفوف حقائق."""
+    with open(TICKETS_CSV, "rb") as f:
+        for batch in pd.read_csv(io.BufferedReader(_Head(f, limit)), chunksize=rows):
+            yield facts(batch)
+
+
+class _Head(io.RawIOBase):
+    """أول limit بايت من ملف مفتوح."""
+
+    def __init__(self, f, limit):
+        self.f, self.left = f, limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self.f.readinto(memoryview(buffer)[:self.left])
+        self.left -= n
+        return n
+
+
+def load_partitions():
+    """نفس load_store لكن للـ partitions: (PartitionStore, offset, build)."""
+    if PINNED_BUILD:
+        store = partitions.read(PARTITIONS_DIR, PINNED_BUILD)
+        return store, store.meta["tickets_offset"], PINNED_BUILD
+    with columnar.build_lock(PARTITIONS_DIR):
+        if partitions.is_stale(PARTITIONS_DIR, SOURCES):
+            size = TICKETS_CSV.stat().st_size
+            partitions.build(PARTITIONS_DIR, ticket_chunks(size), SOURCES,
+                             CATEGORICAL_COLUMNS, tickets_offset=size)
+        store = partitions.read(PARTITIONS_DIR)
+    return store, store.meta["tickets_offset"], store.build.name
+
+
+def load_store():
+    """من الـ snapshot الثنائي لو موجود وأحدث من الـ CSV، وإلا نبنيه أول
+    (worker واحد يبني والباقي ينتظرون ثم يفتحون نفس الملفات بـ mmap).
+    ترجع (store, offset, build) — build = None لو التحميل من الـ CSV."""
+    if PINNED_BUILD:
+        store, meta = columnar.read(SNAPSHOT_DIR, PINNED_BUILD)
+        return store, meta["tickets_offset"], PINNED_BUILD
+    if not USE_SNAPSHOT or PINNED_BYTES:
+        limit = int(PINNED_BYTES) if PINNED_BYTES else None
+        return (*store_from_csv(limit), None)
+    with columnar.build_lock(SNAPSHOT_DIR):
+        if columnar.is_stale(SNAPSHOT_DIR, SOURCES):
+            store, offset = store_from_csv()
+            columnar.write(SNAPSHOT_DIR, store, SOURCES, tickets_offset=offset)
+        build = columnar.current_build(SNAPSHOT_DIR).name
+        store, meta = columnar.read(SNAPSHOT_DIR, build)
+    return store, meta["tickets_offset"], build
+
+
+# -----------------------
+# Snapshot: نسخة ثابتة (immutable) ومرقّمة من البيانات
+# -----------------------
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    table: TicketTable
+    index: TicketIndex
+    cube: RollupCube
+    sketches: Sketches
+    # CINEMA_STORE=partitioned: الصفوف في partitions، و table جدول فاضي بنفس
+    # الأعمدة والقواميس، والفهارس والـ cube والـ sketches = None
+    partitions: PartitionStore = None
+    occupancy: ShowCounters = None  # عدّادات العروض (في الطريقتين)
+    loaded_at: float = field(default_factory=time.time)
 
-# تحميل البيانات من الملفات
-tickets = pd.read_csv(BASE_DIR / "tickets.csv")
-movies = pd.read_csv(BASE_DIR / "movies.csv")
-theaters = pd.read_csv(BASE_DIR / "theaters.csv")
-shows = pd.read_csv(BASE_DIR / "shows.csv")
-customers = pd.read_csv(BASE_DIR / "customers.csv")
+    @property
+    def rows(self):
+        return self.partitions.rows if self.partitions is not None else self.table.rows
 
-# دمج البيانات الأساسية (tickets + movies + theaters + shows + customers)
-df = tickets.merge(movies, on="movie_id", how="left") \
-            .merge(theaters, on="theater_id", how="left") \
-            .merge(shows[["show_id", "start_time"]], on="show_id", how="left") \
-            .merge(customers, on="customer_id", how="left")
+    @cached_property
+    def df(self):
+        # الإطار الكامل (العريض) يتبني مرة وحدة لكل نسخة
+        return self.table.to_frame(dimensions=STAR)
+
+    def take(self, positions):
+        """صفوف الحقائق + أعمدة الأبعاد (Title، name_x، name_y، ...) — للإخراج
+        بس؛ الفلترة والتجميع على أكواد الجدول الضيّق."""
+        return self.table.take(positions, STAR)
+
+    def scan(self, **filters):
+        """(جدول، مواقع الصفوف المطابقة أو None = كل الصفوف) دفعة دفعة:
+        دفعة وحدة من الفهرس، أو دفعة لكل partition متقاطع مع الفلاتر."""
+        if self.partitions is not None:
+            yield from self.partitions.scan(**filters)
+        else:
+            yield self.table, self.index.select(**filters)
+
+    def frames(self, after=None, chunk=10_000, **filters):
+        """إطارات الصفوف المطابقة مرتبة حسب (purchase_time, ticket_id)."""
+        if self.partitions is not None:
+            yield from self.partitions.ordered(after=after, chunk=chunk, dimensions=STAR,
+                                               **filters)
+        else:
+            # دفعات الفهرس الصغيرة تتجمع لحد chunk صف: take وحدة لكل إطار
+            pending, count = [], 0
+            for positions in self.index.ordered(after=after, chunk=chunk, **filters):
+                pending.append(positions)
+                count += len(positions)
+                if count >= chunk:
+                    yield self.take(np.concatenate(pending))
+                    pending, count = [], 0
+            if pending:
+                yield self.take(np.concatenate(pending))
+
+
+_lock = threading.Lock()  # كاتب واحد بس (تحميل أو إضافة تذاكر)
+_load_lock = threading.Lock()
+_current = None
+_store = None
+# من load(): بايتات tickets.csv المحمّلة (ingest يكمل منها) و build الـ snapshot
+TICKETS_OFFSET = None
+SNAPSHOT_BUILD = None
+SOURCE_MTIME = None  # أحدث mtime (ns) لملفات المصدر وقت التحميل
+
+
+def source_version():
+    """هوية البيانات المحمّلة بين التشغيلات: الـ build لو التحميل منه، وإلا
+    mtime ملفات الـ CSV (يتغير لو المحتوى تغير حتى بنفس عدد الصفوف)."""
+    return SNAPSHOT_BUILD or f"csv-{SOURCE_MTIME}"
+
+
+def _publish(table, index, cube, sketches, partitions=None, occupancy=None):
+    """الاستبدال ذرّي: الطلبات الشغالة تكمل على النسخة اللي أخذتها،
+    والطلبات الجديدة تشوف النسخة الجديدة. لازم يكون _lock ماسك."""
+    global _current
+    version = _current.version + 1 if _current is not None else 1
+    _current = Snapshot(version=version, table=table, index=index, cube=cube,
+                        sketches=sketches, partitions=partitions, occupancy=occupancy)
+    return _current
+
+
+def publish_store(store):
+    """تنشر store كامل كنسخة جديدة (الفهارس والـ cube والـ sketches من الصفر)."""
+    global _store
+    table = store.table
+    with span("index"):
+        index, cube = TicketIndex.build(table), RollupCube.build(table)
+        sketches = Sketches.build(table)
+        occupancy = ShowCounters.build(shows, table)
+    with _lock:
+        _store = store
+        return _publish(table, index, cube, sketches, occupancy=occupancy)
+
+
+def publish_partitions(store, occupancy=None):
+    """تنشر PartitionStore كنسخة جديدة (بدون فهارس: الفلترة من إحصائيات الـ partitions).
+    عدّادات العروض تكمل من occupancy (الـ fragments الجديدة بس) لو موجودة."""
+    occupancy = (occupancy or ShowCounters.empty(shows)).extend_partitions(store)
+    with _lock:
+        return _publish(store.empty_table(), None, None, None, store, occupancy)
+
+
+def reload_partitions():
+    """آخر meta.json للـ build بعد إضافة تذاكر في عملية ثانية (عمليات الـ pool،
+    ومراقب كل worker API قبل ما يكتب)."""
+    store = _current.partitions.refresh()
+    if store is _current.partitions:
+        return _current
+    return publish_partitions(store, _current.occupancy)
+
+
+def publish(df):
+    """تنشر إطار كامل (بنفس أعمدة enrich) كنسخة جديدة."""
+    return publish_store(TicketStore.from_frame(
+        encode_categoricals(df), categorical=CATEGORICAL_COLUMNS))
+
+
+def append_tickets(batch, offset=None):
+    """تضيف دفعة تذاكر جديدة بدون إعادة تحميل أو merge: إثراء بالـ lookup،
+    إضافة للـ store، وتحديث الفهارس والـ cube والـ sketches للصفوف الجديدة
+    بس. النسخة الجديدة تنتشر مرة وحدة بعد ما يخلص كل شي، فما أحد يشوف دفعة
+    ناقصة. offset = نهاية الدفعة في tickets.csv (تنحفظ في meta.json الـ partitions)."""
+    if not len(batch):
+        return _current
+    with span("append"):
+        df = facts(batch)
+        with _lock:
+            current = _current
+            if current.partitions is not None:
+                store = current.partitions.append(df, offset)
+                return _publish(store.empty_table(), None, None, None, store,
+                                current.occupancy.extend_partitions(store))
+            if shards.SHARD is not None:
+                df = shards.own_rows(_store, df)
+            table = _store.append(df)
+            return _publish(table, current.index.extend(table), current.cube.extend(table),
+                            current.sketches.extend(table), occupancy=current.occupancy.extend(table))
+
+
+def load(step=lambda name: nullcontext()):
+    """يحمّل التذاكر وينشر أول snapshot — مرة وحدة: الاستدعاءات الثانية (أو
+    اللي جات أثناء التحميل) ترجع نفس الـ snapshot. step(name) يقيس كل مرحلة
+    (lifecycle.py) — read: الـ CSV أو الـ snapshot الثنائي، index: الفهارس."""
+    global TICKETS_OFFSET, SNAPSHOT_BUILD, SOURCE_MTIME
+    with _load_lock:
+        if _current is not None:
+            return _current
+        with span("load"), step("read"):
+            load_dimensions()
+            # قبل القراءة: كتابة أثناء التحميل تعطي mtime أحدث من المحفوظ
+            SOURCE_MTIME = max(Path(s).stat().st_mtime_ns for s in SOURCES)
+            loaded, TICKETS_OFFSET, SNAPSHOT_BUILD = \
+                load_partitions() if STORE == "partitioned" else load_store()
+        with step("index"):
+            if STORE == "partitioned":
+                return publish_partitions(loaded)
+            # عملية shard (shards.py): صفوف الـ shard بس، بفهارسها
+            return publish_store(shards.own(loaded) if shards.SHARD is not None else loaded)
+
+
+def loaded():
+    """في snapshot منشور؟ (الـ gauges وغيرها اللي ما تبي تنتظر التحميل)"""
+    return _current is not None
+
+
+def get_snapshot():
+    """الـ snapshot الحالي؛ أول استدعاء قبل load() يحمّل (السكربتات وعمليات
+    الـ pool). الـ API يحمّل في الخلفية ويرد 503 لين يخلص بدل ما ينتظر هنا."""
+    return _current if _current is not None else load()
 
-# تحويل الأعمدة الزمنية
-df["start_time"] = pd.to_datetime(df["start_time"], errors="coerce")
-df["purchase_time"] = pd.to_datetime(df["purchase_time"], errors="coerce")
 
 def get_data():
-    return df.copy()
+    """ترجع الإطار الحالي بدون نسخ (zero-copy). الإطار مشترك بين كل الطلبات:
+    الفلترة والتجميع ترجع إطارات جديدة، لكن لا تعدّلي أعمدته مباشرة."""
+    return get_snapshot().df
+
+
+def memory_report(raw, encoded):
+    return {
+        "rows": len(encoded),
+        "bytes_per_row_before": round(float(bytes_per_row(raw)), 1),
+        "bytes_per_row_after": round(float(bytes_per_row(encoded)), 1),
+        "columns": {
+            c: [int(raw[c].memory_usage(deep=True, index=False)),
+                int(encoded[c].memory_usage(deep=True, index=False))]
+            for c in CATEGORICAL_COLUMNS if c in encoded.columns
+        },
+    }
+
+
+def store_bytes(store, skip=()):
+    """حجم أعمدة الـ store في الذاكرة (مع النصوص للأعمدة object)."""
+    return int(sum(pd.Series(a[:store.rows], copy=False).memory_usage(deep=True, index=False)
+                   if a.dtype == object else a[:store.rows].nbytes
+                   for c, a in store.arrays.items() if c not in skip))
+
+
+def star_report(tickets, repeat=5):
+    """الإطار العريض القديم (أعمدة الأبعاد في كل صف) مقابل جدول الحقائق +
+    الأبعاد: الذاكرة، التجميع (الإيراد لكل فيلم)، وصفحة 100 صف."""
+
+    def best(func):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t0)
+        return round(min(times) * 1000, 2)
+
+    wide = TicketStore.from_frame(encode_categoricals(enrich(tickets)), CATEGORICAL_COLUMNS)
+    narrow = TicketStore.from_frame(facts(tickets), CATEGORICAL_COLUMNS)
+    wide_table, table = wide.table, narrow.table
+    wide_frame, frame = wide_table.to_frame(), table.to_frame()
+    snapshot = Snapshot(version=0, table=table, index=None, cube=None, sketches=None)
+    page = np.sort(np.random.default_rng(0).choice(table.rows, min(100, table.rows),
+                                                   replace=False))
+    titles = STAR[0].aligned(table.dictionaries["movie_id"], table.sizes["movie_id"])["Title"]
+
+    def star_groupby():
+        # تجميع على أكواد المفتاح، والعنوان ينضاف للنتيجة بس
+        codes = table.column("movie_id")
+        valid = codes >= 0
+        revenue = np.bincount(codes[valid], weights=table.column("total")[valid],
+                              minlength=len(titles))
+        return pd.Series(revenue).groupby(np.asarray(titles)).sum()
+
+    def same_groupby():
+        old = wide_frame.groupby("Title", observed=True)["total"].sum()
+        new = star_groupby()
+        return len(frame) == len(wide_frame) and \
+            np.allclose(old.rename(index=str).sort_index(), new[new != 0].sort_index())
+
+    dimension_bytes = sum(int(d.frame.memory_usage(deep=True).sum()) for d in STAR)
+    return {
+        "rows": table.rows,
+        "bytes": [store_bytes(wide), store_bytes(narrow) + dimension_bytes],
+        # ticket_id نص مختلف لكل صف (نفسه في الطريقتين)
+        "bytes_without_ticket_id": [store_bytes(wide, ["ticket_id"]),
+                                    store_bytes(narrow, ["ticket_id"]) + dimension_bytes],
+        "groupby_ms": [best(lambda: wide_frame.groupby("Title", observed=True)["total"].sum()),
+                       best(star_groupby)],
+        "page_ms": [best(lambda: wide_table.take(page)), best(lambda: snapshot.take(page))],
+        "frame_ms": [best(wide_table.to_frame), best(table.to_frame)],
+        "same_page": wide_table.take(page).equals(snapshot.take(page)),
+        "same_groupby": same_groupby(),
+    }
+
+
+if __name__ == "__main__":
+    # python -m cinema_api.data_loader  → تقرير الذاكرة قبل وبعد الترميز، وبعدين
+    # الإطار العريض مقابل star schema (الذاكرة والزمن)
+    encoded = get_data()  # load() يقرا جداول الأبعاد اللي يحتاجها enrich
+    tickets = read_tickets()[0]
+    report = memory_report(enrich(tickets), encoded)
+    print(f"rows: {report['rows']}")
+    print(f"bytes/row before: {report['bytes_per_row_before']}")
+    print(f"bytes/row after:  {report['bytes_per_row_after']}")
+    for col, (before, after) in report["columns"].items():
+        print(f"  {col:<12} {before:>10,} -> {after:>10,} bytes")
+
+    star = star_report(tickets)
+    print(f"\n{'':<24} {'wide':>12} {'star':>12}")
+    for key in ("bytes", "bytes_without_ticket_id"):
+        wide_mb, star_mb = (b / 2**20 for b in star[key])
+        print(f"{key:<24} {wide_mb:>10.1f}MB {star_mb:>10.1f}MB")
+    for key in ("groupby_ms", "page_ms", "frame_ms"):
+        print(f"{key:<24} {star[key][0]:>12} {star[key][1]:>12}")
+    print(f"same page: {star['same_page']}, same groupby: {star['same_groupby']}")
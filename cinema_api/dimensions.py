@@ -0,0 +1,287 @@
+# جداول الأبعاد لخيارات فلاتر الداشبورد (routers/dimensions.py):
+#   - الأفلام والعملاء والصالات تتحضر مرة وحدة كـ JSON بالبايت مع ETag من
+#     محتواها، فالطلب يرجع البايتات الجاهزة (أو 304) بدون أي حساب
+#   - أنواع المقاعد من قاموس العمود (يكبر مع التذاكر الجديدة)، ومدى التاريخ
+#     وأعلى قيمة تذكرة من الفهارس المرتبة (أول وآخر قيمة في كل segment)
+#   - بحث العملاء (typeahead) بعد توحيد الحروف (العربية كمان): prefix على
+#     كل كلمة من الاسم وعلى الـ ID (بحث ثنائي في مصفوفة مرتبة)، و trigrams
+#     للبحث داخل الكلمات — التكلفة تتبع عدد النتائج مو عدد العملاء
+#
+#   python -m cinema_api.dimensions [customers]   # زمن البحث مقابل المرور على الكل
+from functools import cached_property
+import gzip
+import hashlib
+import re
+import threading
+import unicodedata
+import numpy as np
+import pandas as pd
+from cinema_api import data_loader, formats
+
+SEARCH_LIMIT = 20
+
+# التشكيل والتطويل ينشالون، وأشكال الحرف الواحد تتوحد
+_MARKS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_FOLD = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ة": "ه", "ى": "ي",
+                       "ؤ": "و", "ئ": "ي", "-": " ", "_": " ", ".": " "})
+
+
+def fold(text):
+    """النص بالشكل اللي نبحث فيه: حروف صغيرة، بدون تشكيل، وهمزات الألف
+    والتاء المربوطة والألف المقصورة بشكل واحد."""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    return " ".join(_MARKS.sub("", text).translate(_FOLD).split())
+
+
+class Table:
+    """جدول بعد جاهز للرد: JSON بالبايت و ETag من المحتوى."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.body = formats.dumps(rows)
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=8).hexdigest()}"'
+
+    @cached_property
+    def gzipped(self):
+        # قائمة العملاء كاملة عشرات الـ MB: الضغط مرة وحدة بدل كل طلب (GZipMiddleware)
+        return gzip.compress(self.body, 6)
+
+
+def records(frame, columns):
+    """[{id, name, ...}] من جدول بعد (الأعمدة: {الاسم في الرد: العمود})."""
+    frame = frame[list(columns.values())].rename(columns={v: k for k, v in columns.items()})
+    return formats.records(frame.astype({"id": str, "name": str}))
+
+
+# جدول البعد في data_loader (ينقرا في load()) والأعمدة في الرد
+SOURCES = {
+    "movies": ("movies", {"id": "movie_id", "name": "Title", "genre": "genre"}),
+    "customers": ("customers", {"id": "customer_id", "name": "name"}),
+    "theaters": ("theaters", {"id": "theater_id", "name": "name", "city": "city"}),
+}
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def table(name):
+    """جدول بعد جاهز (يتحضر أول مرة ينطلب بدل وقت الاستيراد: قائمة العملاء
+    كاملة تاخذ وقت مع عملاء كثير)."""
+    with _tables_lock:
+        if name not in _tables:
+            frame, columns = SOURCES[name]
+            _tables[name] = Table(records(getattr(data_loader, frame), columns))
+        return _tables[name]
+
+
+def seat_types(snapshot):
+    table = snapshot.table
+    return sorted(str(s) for s in
+                  table.dictionaries["seat_type"].values[:table.sizes["seat_type"]])
+
+
+def bounds(snapshot):
+    """(أول وقت شراء، آخر وقت) بالنانوثانية وأعلى قيمة تذكرة — من أطراف
+    الفهارس المرتبة، أو إحصائيات الـ partitions. None لو ما فيه قيم."""
+    if snapshot.partitions is not None:
+        return snapshot.partitions.extent(), snapshot.partitions.max_total()
+    times = [s.purchase_time.sorted_values for s in snapshot.index.segments]
+    totals = [s.total.sorted_values for s in snapshot.index.segments]
+    times = [t for t in times if len(t)]
+    totals = [t for t in totals if len(t)]
+    extent = (min(t[0] for t in times), max(t[-1] for t in times)) if times else None
+    return extent, max(float(t[-1]) for t in totals) if totals else None
+
+
+def day(ns):
+    return str(np.datetime64(int(ns), "ns").astype("datetime64[D]"))
+
+
+_bundles = {}  # نسخة الـ snapshot → Table (آخر نسخة بس)
+_bundles_lock = threading.Lock()
+
+
+def bundle(snapshot):
+    """كل خيارات الفلاتر في رد واحد صغير: الأفلام والصالات وأنواع المقاعد ومدى
+    التاريخ وأعلى قيمة. العملاء عددهم بس (القائمة من /dimensions/customers
+    أو البحث)."""
+    with _bundles_lock:
+        out = _bundles.get(snapshot.version)
+    if out is not None:
+        return out
+    extent, highest = bounds(snapshot)
+    out = Table({
+        "movies": table("movies").rows,
+        "theaters": table("theaters").rows,
+        "seat_types": seat_types(snapshot),
+        "customers": {"count": len(table("customers").rows),
+                      "search": "/dimensions/customers/search"},
+        "date_range": {"min": day(extent[0]) if extent else None,
+                       "max": day(extent[1]) if extent else None},
+        "max_total": round(highest, 2) if highest is not None else 0.0,
+    })
+    with _bundles_lock:
+        _bundles.clear()
+        _bundles[snapshot.version] = out
+    return out
+
+
+# -----------------------
+# بحث العملاء
+# -----------------------
+class NameSearch:
+    """فهرس بحث على (id, name):
+    - الأسماء المُوحّدة مرتبة → "الاسم يبدأ بالنص" = مدى بحث ثنائي
+    - tokens: كل كلمة من الاسم والـ ID، مرتبة، مع رقم صاحبها → prefix كلمة
+    - trigrams: لكل ثلاث حروف متتالية، أرقام الأسماء اللي فيها → البحث داخل
+      الكلمة = تقاطع القوائم، والتأكيد على المرشحين لحد ما تكمل النتائج
+    كل المجموعات تترتب بترتيب الاسم (rank) بدون مرور بايثون على كل المطابقين."""
+
+    def __init__(self, ids, names):
+        self.ids = np.asarray(ids, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        folded = pd.Series([fold(n) for n in self.names], dtype=object)
+        self.folded = folded.to_numpy(object)
+        self.order = np.argsort(self.folded, kind="stable")
+        self.sorted_names = self.folded[self.order]
+        self.rank = np.empty(len(self.order), dtype=np.int64)
+        self.rank[self.order] = np.arange(len(self.order))
+
+        words = folded.str.split().explode().dropna()
+        words = pd.concat([words, pd.Series([fold(i) for i in self.ids], dtype=object)])
+        order = np.argsort(words.to_numpy(object), kind="stable")
+        self.tokens = words.to_numpy(object)[order]
+        self.token_owners = words.index.to_numpy()[order]
+
+        # trigrams: كل إزاحة k تتحسب لكل الأسماء مرة وحدة (str.slice)
+        lengths = folded.str.len().to_numpy()
+        grams, owners = [], []
+        for k in range(max(int(lengths.max(initial=0)) - 2, 0)):
+            rows = np.flatnonzero(lengths >= k + 3)
+            grams.append(folded.iloc[rows].str.slice(k, k + 3).to_numpy(object))
+            owners.append(rows)
+        grams = np.concatenate(grams) if grams else np.empty(0, dtype=object)
+        owners = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+        codes, uniques = pd.factorize(grams)
+        order = np.lexsort((self.rank[owners], codes))  # كل قائمة بترتيب الاسم
+        self.gram_owners = owners[order]
+        edges = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self.grams = {g: (edges[i], edges[i + 1]) for i, g in enumerate(uniques)}
+
+    @staticmethod
+    def _range(values, text):
+        return (np.searchsorted(values, text, "left"),
+                np.searchsorted(values, text + "\uffff", "right"))
+
+    def first(self, rows, exclude, count):
+        """أول count من rows (بدون exclude) بترتيب الاسم."""
+        rows = pd.unique(rows[~np.isin(rows, exclude)])
+        if len(rows) > count:
+            rows = rows[np.argpartition(self.rank[rows], count)[:count]]
+        return rows[np.argsort(self.rank[rows])]
+
+    def prefix(self, word):
+        lo, hi = self._range(self.tokens, word)
+        return self.token_owners[lo:hi]
+
+    @staticmethod
+    def _take(candidates, test, exclude, count):
+        """أول count من candidates (مرتبة) يحققون test — يوقف أول ما تكمل."""
+        out, seen = [], set(exclude.tolist())
+        for i in candidates.tolist():
+            if i not in seen and test(i):
+                seen.add(i)
+                out.append(i)
+                if len(out) == count:
+                    break
+        return np.asarray(out, dtype=np.int64)
+
+    def words(self, words, exclude, count):
+        """أول count اسم كل كلمة من words بداية كلمة فيه (أو في الـ ID).
+        المرشحين من أقل كلمة مطابقات، والباقي يتأكد عليهم بالترتيب."""
+        ranges = sorted((self.prefix(w) for w in words), key=len)
+        if len(words) == 1:
+            return self.first(ranges[0], exclude, count)
+        candidates = np.unique(ranges[0])
+        candidates = candidates[np.argsort(self.rank[candidates])]
+
+        def test(i):
+            tokens = self.folded[i].split() + [fold(self.ids[i])]
+            return all(any(t.startswith(w) for t in tokens) for w in words)
+        return self._take(candidates, test, exclude, count)
+
+    def contains(self, text, exclude, count):
+        """أول count اسم فيه text: المرشحين من أقصر قائمة trigram (مرتبة بالاسم)."""
+        if len(text) < 3:
+            return np.empty(0, dtype=np.int64)
+        spans = [self.grams.get(text[i:i + 3]) for i in range(len(text) - 2)]
+        if any(span is None for span in spans):
+            return np.empty(0, dtype=np.int64)
+        lo, hi = min(spans, key=lambda span: span[1] - span[0])
+        return self._take(self.gram_owners[lo:hi], lambda i: text in self.folded[i],
+                          exclude, count)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """[{id, name}] الأقرب أول: الاسم يبدأ بالنص، ثم كل كلمة من النص بداية
+        كلمة في الاسم (أو الـ ID)، ثم النص داخل الاسم."""
+        text = fold(query)
+        if not text or limit <= 0:
+            return []
+        lo, hi = self._range(self.sorted_names, text)
+        ranked = self.order[lo:min(hi, lo + limit)]
+        if len(ranked) < limit:
+            ranked = np.concatenate([ranked, self.words(text.split(), ranked,
+                                                        limit - len(ranked))])
+        if len(ranked) < limit:
+            ranked = np.concatenate([ranked, self.contains(text, ranked, limit - len(ranked))])
+        return [{"id": str(self.ids[i]), "name": str(self.names[i])} for i in ranked]
+
+
+_search = None
+_search_lock = threading.Lock()
+
+
+def customer_search():
+    """فهرس بحث العملاء (يتبني أول مرة ينطلب)."""
+    global _search
+    with _search_lock:
+        if _search is None:
+            customers = data_loader.customers
+            _search = NameSearch(customers["customer_id"], customers["name"])
+        return _search
+
+
+if __name__ == "__main__":
+    # python -m cinema_api.dimensions [customers]  → بحث على N عميل (الأسماء
+    # الحقيقية مكررة بلاحقة + أسماء عربية) مقابل str.contains على الكل
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    arabic_first = ["محمد", "أحمد", "عبدالله", "فاطمة", "نورة", "سارة", "خالد", "ريم", "إبراهيم"]
+    arabic_last = ["العتيبي", "القحطاني", "الشمري", "الزهراني", "الحربي", "الدوسري", "المطيري"]
+    data_loader.load_dimensions()
+    real = data_loader.customers["name"].astype(str).to_numpy(object)
+    rng = np.random.default_rng(0)
+    names = np.where(
+        rng.random(count) < 0.5,
+        real[rng.integers(0, len(real), count)],
+        np.char.add(np.char.add(np.array(arabic_first)[rng.integers(0, 9, count)], " "),
+                    np.array(arabic_last)[rng.integers(0, 7, count)]).astype(object))
+    names = np.char.add(names.astype(str), np.char.mod(" %d", np.arange(count) % 997)).astype(object)
+    ids = np.char.mod("C%07d", np.arange(count)).astype(object)
+
+    t0 = time.perf_counter()
+    index = NameSearch(ids, names)
+    print(f"{count:,} customers indexed in {time.perf_counter() - t0:.1f}s "
+          f"({len(index.tokens):,} tokens, {len(index.grams):,} trigrams)")
+    folded = pd.Series(index.folded)
+    for query in ["moh", "Al-Ot", "otaib", "c00012", "احمد", "أحمد الزهر", "هراني", "xyz"]:
+        t0 = time.perf_counter()
+        for _ in range(20):
+            found = index.search(query)
+        indexed = (time.perf_counter() - t0) / 20 * 1000
+        t0 = time.perf_counter()
+        scan = folded[folded.str.contains(fold(query), regex=False)].head(SEARCH_LIMIT)
+        scanned = (time.perf_counter() - t0) * 1000
+        print(f"{query!r:>14}: {indexed:7.2f} ms ({len(found)} results)   "
+              f"scan {scanned:8.1f} ms ({len(scan)})")
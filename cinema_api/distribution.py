@@ -0,0 +1,228 @@
+# توزيع قيم التذاكر (total / price / quantity) لشريحة مفلترة: histogram و
+# quantiles و min/max/mean، بدون ما الصفوف تطلع من الـ API.
+#
+# الحالة الوسيطة "عدّادات قيم": القيم المختلفة مرتبة مع عدد كل قيمة. تندمج
+# بين الدفعات والـ partitions والـ shards بالجمع، ومنها ينحسب أي histogram
+# أو quantile بالضبط. لو القيم المختلفة كثرت (أكثر من MAX_VALUES) كل قيمة
+# تتقرب لممثل خانة لوغاريتمية بخطأ نسبي RELATIVE_ERROR (مثل DDSketch)، فالحجم
+# يبقى محدود مهما كانت الأسعار.
+#
+# CINEMA_STORE=partitioned: كل fragment يحفظ عدّاداته في meta.json، فالـ
+# fragments اللي داخل الفلاتر بالكامل (تاريخ وصالة) ما تنقرا من القرص.
+#
+#   python -m cinema_api.distribution   # الوقت مقابل الطريقة القديمة (صفوف + histogram)
+import numpy as np
+from cinema_api import shards
+from cinema_api.metrics import span
+
+FIELDS = ("total", "price", "quantity")
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+MAX_VALUES = 4096
+FRAGMENT_VALUES = 256  # عدّادات fragment أكثر من كذا ما تنحفظ في meta.json
+RELATIVE_ERROR = 0.005
+_GAMMA = (1 + RELATIVE_ERROR) / (1 - RELATIVE_ERROR)
+
+
+def empty():
+    return {"values": np.empty(0), "counts": np.empty(0, dtype=np.int64),
+            "sum": 0.0, "min": None, "max": None, "exact": True}
+
+
+def compact(state):
+    """لو القيم المختلفة أكثر من MAX_VALUES: كل قيمة → ممثل خانتها اللوغاريتمية
+    (الـ sum و min و max تبقى دقيقة)."""
+    values = state["values"]
+    if len(values) <= MAX_VALUES:
+        return state
+    magnitude = np.abs(values)
+    buckets = np.ceil(np.log(np.maximum(magnitude, np.finfo(np.float64).tiny))
+                      / np.log(_GAMMA))
+    rounded = np.where(magnitude > 0,
+                       np.sign(values) * 2 * _GAMMA ** buckets / (_GAMMA + 1), 0.0)
+    values, inverse = np.unique(rounded, return_inverse=True)
+    counts = np.bincount(inverse, weights=state["counts"]).astype(np.int64)
+    return {**state, "values": values, "counts": counts, "exact": False}
+
+
+def from_values(values):
+    """عدّادات مصفوفة قيم (الـ NaN تنشال)."""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return empty()
+    unique, counts = np.unique(values, return_counts=True)
+    return compact({"values": unique, "counts": counts.astype(np.int64),
+                    "sum": float(values.sum()), "min": float(unique[0]),
+                    "max": float(unique[-1]), "exact": True})
+
+
+def from_counts(values, counts):
+    """عدّادات جاهزة (من meta.json لـ fragment)."""
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    if not len(values):
+        return empty()
+    return {"values": values, "counts": counts, "sum": float(values @ counts),
+            "min": float(values[0]), "max": float(values[-1]), "exact": True}
+
+
+def merge(states):
+    filled = [s for s in states if len(s["counts"])]
+    if len(filled) <= 1:
+        return filled[0] if filled else empty()
+    values, inverse = np.unique(np.concatenate([s["values"] for s in filled]),
+                                return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate([s["counts"] for s in filled]))
+    return compact({
+        "values": values, "counts": counts.astype(np.int64),
+        "sum": sum(s["sum"] for s in filled),
+        "min": min(s["min"] for s in filled), "max": max(s["max"] for s in filled),
+        "exact": all(s["exact"] for s in filled),
+    })
+
+
+def fragment_counts(encoded, rows):
+    """{field: [القيم، العدد]} لصفوف fragment (partitions.write_fragments)."""
+    out = {}
+    for field in FIELDS:
+        state = from_values(encoded[field][rows])
+        if state["exact"] and len(state["values"]) <= FRAGMENT_VALUES:
+            out[field] = [state["values"].tolist(), state["counts"].tolist()]
+    return out
+
+
+# -----------------------
+# الحساب
+# -----------------------
+def covered(fragment, compiled):
+    """هل كل صفوف الـ fragment داخل مدى التاريخ؟ (الصالة يضمنها prune)."""
+    start, end = compiled["start"], compiled["end"]
+    if start is not None and (fragment["min_time"] is None or fragment["min_time"] < start):
+        return False
+    return end is None or (fragment["max_time"] is not None and fragment["max_time"] <= end)
+
+
+def stored(store, filters, field):
+    """عدّادات الصفوف المطابقة fragment fragment: من meta.json لو الـ fragment
+    مغطى بالكامل، وإلا من عمود field."""
+    compiled = store.compile(**filters)
+    minimum = compiled["min_total"]
+    # فلاتر العملاء والأفلام والمقاعد (و min_total لغير total) تحتاج الصفوف
+    direct = set(compiled["keys"]) <= {"theater_id"} and (minimum is None or field == "total")
+    for fragment in store.prune(compiled):
+        saved = fragment.get("values", {}).get(field)
+        if direct and saved is not None and covered(fragment, compiled):
+            values, counts = np.asarray(saved[0]), np.asarray(saved[1])
+            if minimum is not None:
+                keep = values >= minimum
+                values, counts = values[keep], counts[keep]
+            yield from_counts(values, counts)
+            continue
+        table = store.load(fragment)
+        yield from_values(table.column(field, store.match(table, compiled)))
+
+
+def tally(snapshot, filters, field):
+    """عدّادات قيم field للصفوف المطابقة (محلياً أو في shard)."""
+    if snapshot.partitions is not None:
+        return merge(list(stored(snapshot.partitions, filters, field)))
+    return merge([from_values(part.column(field, positions))
+                  for part, positions in snapshot.scan(**filters)])
+
+
+def counts(snapshot, filters, field):
+    with span("aggregate"):
+        states = shards.scatter(snapshot, tally, filters, field)
+        return merge(states) if states is not None else tally(snapshot, filters, field)
+
+
+def quantiles(state, qs=QUANTILES):
+    """quantiles بنفس تعريف np.quantile (linear) من العدّادات."""
+    cumulative = np.cumsum(state["counts"])
+    positions = np.asarray(qs) * (cumulative[-1] - 1)
+    below = np.floor(positions)
+    low = state["values"][np.searchsorted(cumulative, below, "right")]
+    high = state["values"][np.searchsorted(
+        cumulative, np.minimum(below + 1, cumulative[-1] - 1), "right")]
+    return low + (high - low) * (positions - below)
+
+
+def edges(states, bins):
+    """حدود bins مشتركة لكل الشرائح (الـ histograms تنرسم فوق بعض)، أو None."""
+    filled = [s for s in states if len(s["counts"])]
+    if not filled:
+        return None
+    low, high = min(s["min"] for s in filled), max(s["max"] for s in filled)
+    return np.histogram_bin_edges([], bins, range=(low, high))
+
+
+def describe(state, bin_edges):
+    """ملخص شريحة: العدد و min/max/mean و quantiles و histogram على bin_edges."""
+    total = int(state["counts"].sum())
+    if not total:
+        return {"count": 0, "min": None, "max": None, "mean": None, "quantiles": None,
+                "histogram": [0] * (len(bin_edges) - 1) if bin_edges is not None else []}
+    histogram, _ = np.histogram(state["values"], bin_edges, weights=state["counts"])
+    return {
+        "count": total,
+        "min": round(state["min"], 2),
+        "max": round(state["max"], 2),
+        "mean": round(state["sum"] / total, 2),
+        "quantiles": {f"p{round(q * 100)}": round(float(v), 2)
+                      for q, v in zip(QUANTILES, quantiles(state))},
+        "histogram": histogram.astype(np.int64).tolist(),
+    }
+
+
+def compare(snapshot, filters, baseline, field, bins):
+    """توزيع field للشريحة المفلترة وشريحة المقارنة بنفس الـ bins."""
+    states = [counts(snapshot, filters, field), counts(snapshot, baseline, field)]
+    bin_edges = edges(states, bins)
+    out = {
+        "field": field,
+        "edges": [] if bin_edges is None else np.round(bin_edges, 2).tolist(),
+        "slice": describe(states[0], bin_edges),
+        "baseline": describe(states[1], bin_edges),
+        "exact": all(s["exact"] for s in states),
+    }
+    if not out["exact"]:
+        out["relative_error"] = RELATIVE_ERROR
+    return out
+
+
+if __name__ == "__main__":
+    # python -m cinema_api.distribution [min_total]
+    # الطريقة القديمة (كل الصفوف المفلترة + np.histogram) مقابل compare
+    import sys
+    import time
+    from cinema_api.data_loader import get_snapshot
+    from cinema_api.formats import dumps
+    from cinema_api.routers.filters import filter_params
+
+    snapshot = get_snapshot()
+    minimum = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0
+    filters, baseline = filter_params(min_total=minimum), filter_params()
+
+    def timed(func, repeat=5):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - t0)
+        return best * 1000, result
+
+    def rows():
+        import pandas as pd
+        frames = [pd.concat([t.take(np.arange(t.rows) if p is None else p)
+                             for t, p in snapshot.scan(**f)]) for f in (filters, baseline)]
+        return [np.histogram(f["total"].to_numpy(dtype=np.float64), 20) for f in frames]
+
+    print(f"{snapshot.rows:,} tickets, min_total={minimum}")
+    ms, _ = timed(rows, repeat=1)
+    print(f"  rows + histogram : {ms:8.1f} ms")
+    ms, out = timed(lambda: compare(snapshot, filters, baseline, "total", 20))
+    print(f"  compare          : {ms:8.1f} ms  ({len(dumps(out))} bytes)")
+    full = snapshot.table.column("total")
+    check = np.quantile(full[~np.isnan(full)], QUANTILES).round(2).tolist() \
+        if snapshot.partitions is None else None
+    print(f"  baseline quantiles {out['baseline']['quantiles']} (np.quantile: {check})")
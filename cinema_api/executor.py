@@ -0,0 +1,379 @@
+# تنفيذ الـ endpoints خارج الـ event loop:
+#   - الحسابات الخفيفة تشتغل inline على الـ loop مباشرة
+#   - التجميعات الثقيلة تروح لـ process pool (وبدونه لـ thread) فما تحجز
+#     الـ threadpool ولا الـ GIL عن باقي الطلبات
+#   - الطلبات المتطابقة المتزامنة تنتظر نفس الحساب (single-flight)
+#   - لكل endpoint حد للتزامن ومهلة (timeout)
+#
+# عمليات الـ pool تفتح نفس الـ snapshot (mmap، يعني نفس صفحات الذاكرة) اللي
+# حمّله الـ API. كل عملية لها pool بعملية وحدة (مثل shards.py) فنعرف مين ينفّذ
+# المهمة: تروح للعملية الأقل شغل مع التذاكر اللي ناقصتها هي بس. العملية
+# الفاضية اللي نقصها أكثر من CINEMA_POOL_SYNC_ROWS صف تلحق لحالها بالخلفية.
+#
+#   python -m cinema_api.executor   # load test: p99 للـ endpoints الخفيفة
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+import logging
+import multiprocessing
+import os
+from fastapi import HTTPException
+from cinema_api import metrics
+
+log = logging.getLogger(__name__)
+
+# عدد عمليات الـ pool (0 = الحسابات الثقيلة في thread بدل process)
+POOL_WORKERS = int(os.environ.get("CINEMA_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+TASK_LIMIT = int(os.environ.get("CINEMA_TASK_LIMIT", "4"))        # تزامن لكل endpoint
+TASK_TIMEOUT = float(os.environ.get("CINEMA_TASK_TIMEOUT", "30"))  # ثواني
+# صفوف ناقصة عند عملية فاضية قبل ما تلحق بالخلفية
+SYNC_ROWS = int(os.environ.get("CINEMA_POOL_SYNC_ROWS", "50000"))
+
+
+@dataclass(frozen=True)
+class Policy:
+    heavy: bool = True
+    limit: int = TASK_LIMIT
+    timeout: float = TASK_TIMEOUT
+
+
+# الـ endpoints اللي ما لها policy هنا تعتبر ثقيلة بالقيم الافتراضية
+POLICIES = {
+    "dashboard/options": Policy(heavy=False),
+    "filter/data": Policy(limit=max(1, TASK_LIMIT // 2)),
+    # تجميع على عدّادات العروض (آلاف الصفوف) مو على التذاكر
+    "shows/occupancy": Policy(heavy=False),
+    "shows/near-capacity": Policy(heavy=False),
+}
+
+
+# -----------------------
+# داخل عمليات الـ pool
+# -----------------------
+def _init_worker(env):
+    os.environ.update(env)
+    from cinema_api import data_loader
+
+    data_loader.load()
+
+
+def _catch_up(start, batch):
+    """تلحق الصفوف الناقصة (batch = الصفوف من start). الـ partitions ما تحتاج
+    batch: الصفوف الجديدة في meta.json على القرص."""
+    from cinema_api import data_loader
+
+    rows = data_loader.get_snapshot().rows
+    if batch is not None and start <= rows < start + len(batch):
+        data_loader.append_tickets(batch.iloc[rows - start:])
+    elif batch is None and start > rows:
+        data_loader.reload_partitions()
+    return data_loader.get_snapshot()
+
+
+def _call(func, args, start, batch):
+    snapshot = _catch_up(start, batch)
+    with metrics.collect() as spans:
+        result = func(snapshot, *args)
+    return snapshot.rows, result, spans
+
+
+def _ready():
+    from cinema_api import data_loader
+
+    return data_loader.get_snapshot().rows
+
+
+def _sync(start, batch):
+    return _catch_up(start, batch).rows
+
+
+def plain(frame):
+    """الـ category → object (NaN للناقص، مثل astype(object)): ما ينرسل القاموس
+    كامل مع كل إطار بين العمليات. الإطارات الصغيرة من الأكواد مباشرة، لأن
+    astype يحوّل القاموس كله."""
+    import numpy as np
+    import pandas as pd
+
+    columns = {}
+    for name, col in frame.items():
+        if not isinstance(col.dtype, pd.CategoricalDtype):
+            continue
+        if len(col) >= len(col.cat.categories):
+            columns[name] = col.astype(object)
+            continue
+        codes = col.cat.codes.to_numpy()
+        values = np.full(len(codes), np.nan, dtype=object)
+        values[codes >= 0] = col.cat.categories.take(codes[codes >= 0]).to_numpy(object)
+        columns[name] = pd.Series(values, index=frame.index, dtype=object)
+    return frame.assign(**columns) if columns else frame
+
+
+def delta(snapshot, start):
+    """صفوف التذاكر [start, rows) بأعمدة tickets.csv (قيم نصية بدل أكواد)."""
+    from cinema_api.data_loader import TICKET_COLUMNS
+
+    return plain(snapshot.table.to_frame(start, snapshot.rows)[TICKET_COLUMNS])
+
+
+# -----------------------
+# في عملية الـ API
+# -----------------------
+class Worker:
+    """عملية من الـ pool (ProcessPoolExecutor بعملية وحدة)."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.seen = 0       # الصفوف اللي عند العملية
+        self.busy = 0       # مهام شغالة أو بالانتظار
+        self.syncing = False
+
+
+class Engine:
+    def __init__(self, workers=POOL_WORKERS):
+        self.workers = workers
+        self.processes = []   # Worker لكل عملية
+        self._inflight = {}
+        self._slots = {}
+        self.counters = {}
+        self.syncs = 0
+
+    def start(self):
+        """تشغيل الـ pool وتجهيز كل العمليات (قبل أول طلب ثقيل)."""
+        if self.workers <= 0 or self.processes:
+            return
+        from cinema_api import data_loader
+
+        env = {"CINEMA_WATCH_INTERVAL": "0"}
+        if data_loader.SNAPSHOT_BUILD:
+            env["CINEMA_SNAPSHOT_BUILD"] = data_loader.SNAPSHOT_BUILD
+        else:
+            env["CINEMA_TICKETS_BYTES"] = str(data_loader.TICKETS_OFFSET)
+        context = multiprocessing.get_context("spawn")
+        self.processes = [
+            Worker(ProcessPoolExecutor(1, mp_context=context, initializer=_init_worker,
+                                       initargs=(env,)))
+            for _ in range(self.workers)]
+        try:
+            for worker, future in [(w, w.pool.submit(_ready)) for w in self.processes]:
+                worker.seen = future.result()
+        except Exception:
+            log.exception("process pool failed to start; heavy work runs in threads")
+            self.stop()
+
+    def stop(self):
+        for worker in self.processes:
+            worker.pool.shutdown(wait=False, cancel_futures=True)
+        self.processes = []
+
+    def _counters(self, name):
+        return self.counters.setdefault(
+            name, {"inline": 0, "thread": 0, "process": 0,
+                   "coalesced": 0, "timeouts": 0, "running": 0})
+
+    def _pick(self):
+        """العملية الأقل مهام، وبين المتساوية الأقل نقص."""
+        return min(self.processes, key=lambda w: (w.busy, -w.seen))
+
+    @staticmethod
+    def _delta(snapshot, seen):
+        """الصفوف الناقصة عند عملية عندها seen صف: (start, batch) أو (rows, None)."""
+        if snapshot.partitions is not None or seen >= snapshot.rows:
+            return snapshot.rows, None
+        return seen, delta(snapshot, seen)
+
+    async def _submit(self, worker, func, *args):
+        worker.busy += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(worker.pool, func, *args)
+        finally:
+            worker.busy -= 1
+
+    def _sync_idle(self, snapshot):
+        """العمليات الفاضية اللي نقصها أكثر من SYNC_ROWS تلحق بالخلفية، فالمهمة
+        الجاية لها ما تحمل دفعة كبيرة. كل عملية لحالها: ما فيه انتظار بين العمليات."""
+        if snapshot.partitions is not None:
+            return
+        for worker in self.processes:
+            if not worker.busy and not worker.syncing and snapshot.rows - worker.seen > SYNC_ROWS:
+                worker.syncing = True
+                asyncio.ensure_future(self._sync(worker, snapshot))
+
+    async def _sync(self, worker, snapshot):
+        try:
+            rows = await self._submit(worker, _sync, *self._delta(snapshot, worker.seen))
+            worker.seen = max(worker.seen, rows)
+            self.syncs += 1
+        except BrokenProcessPool:
+            log.exception("process pool died; heavy work runs in threads")
+            self.stop()
+        finally:
+            worker.syncing = False
+
+    async def _execute(self, name, policy, snapshot, func, args):
+        slots = self._slots.get(name)
+        if slots is None:
+            slots = self._slots[name] = asyncio.Semaphore(policy.limit)
+        counters = self._counters(name)
+        async with slots:
+            counters["running"] += 1
+            try:
+                if not policy.heavy:
+                    counters["inline"] += 1
+                    return func(snapshot, *args)
+                if self.processes:
+                    counters["process"] += 1
+                    worker = self._pick()
+                    try:
+                        rows, result, spans = await self._submit(
+                            worker, _call, func, args, *self._delta(snapshot, worker.seen))
+                    except BrokenProcessPool:
+                        log.exception("process pool died; heavy work runs in threads")
+                        self.stop()
+                    else:
+                        worker.seen = max(worker.seen, rows)
+                        metrics.replay(spans)
+                        self._sync_idle(snapshot)
+                        return result
+                counters["thread"] += 1
+                return await asyncio.to_thread(func, snapshot, *args)
+            finally:
+                counters["running"] -= 1
+
+    async def run(self, name, key, snapshot, func, *args):
+        """func(snapshot, *args) حسب policy الـ endpoint. الطلبات بنفس key
+        تنتظر نفس التنفيذ؛ الطلب اللي تخلص مهلته يرجع 503 لكن التنفيذ يكمل
+        للباقين (والنتيجة تدخل الكاش). طلب X-Profile يتنفذ لحاله تحت cProfile."""
+        policy = POLICIES.get(name, Policy())
+        profiling = metrics.profiling()
+        if profiling:
+            key, func, args = f"{key}:profile", metrics.profiled, (func, *args)
+        counters = self._counters(name)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._execute(name, policy, snapshot, func, args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            counters["coalesced"] += 1
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), policy.timeout)
+        except asyncio.TimeoutError:
+            counters["timeouts"] += 1
+            raise HTTPException(status_code=503, detail=f"{name} timed out",
+                                headers={"Retry-After": str(max(1, round(policy.timeout)))})
+        if profiling:
+            result, text = result
+            metrics.attach_profile(text)
+        return result
+
+    def stats(self):
+        return {
+            "workers": len(self.processes),
+            "synced_rows": sorted(w.seen for w in self.processes),
+            "syncs": self.syncs,
+            "inflight": len(self._inflight),
+            "endpoints": self.counters,
+        }
+
+
+engine = Engine()
+
+
+# -----------------------
+# load test: طلبات ثقيلة متزامنة (بدون كاش) وقياس زمن الخفيفة في نفس الوقت
+# -----------------------
+HEAVY_PATHS = [
+    "/revenue/revenue/daily?start_date={t}",
+    "/dashboard/summary?start_date={t}",
+    "/filter/filter/data?limit=5000&start_date={t}",
+]
+LIGHT_PATHS = ["/", "/dashboard/options"]
+
+
+def load_test(workers, clients=8, seconds=5.0, port=8765):
+    """يشغّل uvicorn بـ CINEMA_POOL_WORKERS=workers ويرجع زمن الطلبات
+    الخفيفة (p50/p99 بالملي ثانية) وعدد الطلبات الثقيلة اللي خلصت."""
+    import itertools
+    from pathlib import Path
+    import subprocess
+    import sys
+    import threading
+    import time
+    import urllib.error
+    import urllib.request
+
+    base = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "CINEMA_POOL_WORKERS": str(workers), "CINEMA_WATCH_INTERVAL": "0"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "cinema_api.main:app",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=Path(__file__).resolve().parent.parent, env=env)
+
+    def get(path):
+        try:
+            with urllib.request.urlopen(base + path, timeout=60) as r:
+                r.read()
+                return r.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    try:
+        for _ in range(600):
+            try:
+                get("/")
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        counter = itertools.count()
+        stop = threading.Event()
+        heavy = {"done": 0, "errors": 0}
+
+        def hammer():
+            # كل طلب بتاريخ بداية مختلف (بالثواني) عشان ما يجي من الكاش
+            while not stop.is_set():
+                n = next(counter)
+                t = f"2025-04-01T00:{n // 60 % 60:02d}:{n % 60:02d}"
+                status = get(HEAVY_PATHS[n % len(HEAVY_PATHS)].format(t=t))
+                heavy["done" if status == 200 else "errors"] += 1
+
+        threads = [threading.Thread(target=hammer, daemon=True) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5)
+
+        latencies = []
+        end = time.perf_counter() + seconds
+        for path in itertools.cycle(LIGHT_PATHS):
+            if time.perf_counter() > end:
+                break
+            t0 = time.perf_counter()
+            get(path)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "light_p50_ms": metrics.percentile(latencies, 0.50),
+        "light_p99_ms": metrics.percentile(latencies, 0.99),
+        "light_requests": len(latencies),
+        "heavy_per_s": heavy["done"] / seconds,
+        "heavy_errors": heavy["errors"],
+    }
+
+
+if __name__ == "__main__":
+    # python -m cinema_api.executor [workers]  → threads مقابل process pool
+    import sys
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else max(2, POOL_WORKERS)
+    for label, n in (("threads", 0), (f"pool x{workers}", workers)):
+        r = load_test(n)
+        print(f"{label:<10} light p50 {r['light_p50_ms']:7.1f} ms  "
+              f"p99 {r['light_p99_ms']:7.1f} ms  ({r['light_requests']} req)  "
+              f"heavy {r['heavy_per_s']:6.1f}/s  errors {r['heavy_errors']}")
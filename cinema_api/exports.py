@@ -0,0 +1,342 @@
+# تصدير البيانات كملفات، كـ jobs في الخلفية (routers/exports.py):
+#   - csv و xlsx: الصفوف المفلترة دفعة دفعة من snapshot.frames (xlsx بـ
+#     openpyxl write-only)، فالذاكرة بحجم الدفعة مهما كبرت النتيجة
+#   - pdf: تقرير ملخص (مؤشرات الداشبورد) بنص عربي مشكّل (arabic-reshaper +
+#     python-bidi) وخط TTF فيه الحروف العربية
+#   - الـ id = hash الصيغة والفلاتر ونسخة البيانات، والملف الجاهز يتحفظ في
+#     CINEMA_EXPORT_DIR: نفس التصدير مرة ثانية يرجع الملف بدون حساب (حتى بعد
+#     إعادة التشغيل). الملفات الأقدم تنمسح لما يتعدى حجمها CINEMA_EXPORT_BYTES
+#
+#   python -m cinema_api.exports [csv|xlsx|pdf]   # زمن التصدير وذروة الذاكرة
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+import hashlib
+from importlib.util import find_spec
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+import warnings
+import numpy as np
+from cinema_api import data_loader, formats
+from cinema_api.cache import normalize
+from cinema_api.executor import plain
+from cinema_api.metrics import span
+
+# صيغتا xlsx و pdf اختياريتين، ومكتباتهم تنستورد أول تصدير بس (openpyxl
+# لحالها أكثر من 100ms من وقت تشغيل الـ API) — هنا نشيك إنها موجودة
+HAS_XLSX = find_spec("openpyxl") is not None
+HAS_PDF = all(find_spec(name) is not None for name in ("fpdf", "arabic_reshaper", "bidi"))
+
+log = logging.getLogger(__name__)
+
+EXPORT_DIR = Path(os.environ.get("CINEMA_EXPORT_DIR", data_loader.DATA_DIR / ".exports"))
+EXPORT_WORKERS = int(os.environ.get("CINEMA_EXPORT_WORKERS", "1"))
+EXPORT_BYTES = int(os.environ.get("CINEMA_EXPORT_BYTES", str(1024 * 1024 * 1024)))
+CHUNK_ROWS = 10_000
+EXCEL_ROWS = 1_048_575  # صفوف الشيت الواحد بعد سطر العناوين
+PDF_FONTS = [
+    os.environ.get("CINEMA_PDF_FONT", ""),
+    "/usr/share/fonts/truetype/noto/NotoNaskhArabic-Regular.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+
+def pdf_font():
+    return next((f for f in PDF_FONTS if f and os.path.exists(f)), None)
+
+
+def unavailable(fmt):
+    """سبب عدم توفر الصيغة (مكتبة أو خط ناقص)، أو None."""
+    if fmt == "xlsx" and not HAS_XLSX:
+        return "xlsx export needs openpyxl"
+    if fmt == "pdf" and not HAS_PDF:
+        return "pdf export needs fpdf, arabic-reshaper and python-bidi"
+    if fmt == "pdf" and pdf_font() is None:
+        return "pdf export needs a TTF font with Arabic glyphs (CINEMA_PDF_FONT)"
+    return None
+
+
+# -----------------------
+# الكتابة
+# -----------------------
+def _frames(snapshot, filters, job):
+    """دفعات الصفوف المطابقة (أولها فاضية بالأعمدة)، مع عدّاد الصفوف في الـ job."""
+    yield snapshot.take(np.empty(0, dtype=np.int64))
+    for frame in snapshot.frames(chunk=CHUNK_ROWS, **filters):
+        yield frame
+        job.rows += len(frame)
+
+
+def write_csv(snapshot, filters, path, job):
+    with open(path, "wb") as out:
+        for chunk in formats.csv_chunks(_frames(snapshot, filters, job)):
+            out.write(chunk)
+
+
+def _rows(frame):
+    """صفوف بقيم بايثون لـ openpyxl (الوقت datetime، والناقص None)."""
+    columns = [col.astype(object).where(col.notna(), None).tolist()
+               for _, col in plain(frame).items()]
+    return zip(*columns)
+
+
+def write_xlsx(snapshot, filters, path, job):
+    import openpyxl
+
+    # write-only: كل صف ينكتب لملف مؤقت أول ما ينضاف، فالـ workbook ما يكبر بالذاكرة
+    book = openpyxl.Workbook(write_only=True)
+    sheet, header, used = None, None, EXCEL_ROWS
+    for frame in _frames(snapshot, filters, job):
+        header = header or list(frame.columns)
+        for row in _rows(frame):
+            if used == EXCEL_ROWS:  # الشيت امتلى (حد Excel) → شيت جديد
+                sheet = book.create_sheet(f"tickets {len(book.worksheets) + 1}"
+                                          if book.worksheets else "tickets")
+                sheet.append(header)
+                used = 0
+            sheet.append(row)
+            used += 1
+    if sheet is None:
+        book.create_sheet("tickets").append(header)
+    book.save(path)
+
+
+def shaped(text):
+    """نص عربي بأشكال الحروف المتصلة وبترتيب العرض (fpdf يكتب من اليسار)."""
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+
+    return get_display(arabic_reshaper.reshape(str(text)))
+
+
+class Report:
+    """صفحات A4 من اليمين لليسار: عناوين وجداول (أول عمود على اليمين)."""
+
+    WIDTH = 190
+
+    def __init__(self, font):
+        import fpdf
+
+        if hasattr(fpdf, "set_global"):  # fpdf 1.7: كاش مقاييس الخط جنب الملفات
+            fpdf.set_global("FPDF_CACHE_MODE", 2)
+            fpdf.set_global("FPDF_CACHE_DIR", str(EXPORT_DIR))
+        self.pdf = fpdf.FPDF()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # fpdf 1.7 يحذّر من كل خانة cmap ما يدعمها
+            self.pdf.add_font("arabic", "", font, uni=True)
+        self.pdf.set_auto_page_break(True, margin=15)
+        self.pdf.add_page()
+
+    def title(self, text, size=16):
+        self.pdf.set_font("arabic", size=size)
+        self.pdf.cell(self.WIDTH, 10, shaped(text), ln=1, align="R")
+
+    def line(self, text):
+        self.pdf.set_font("arabic", size=10)
+        self.pdf.cell(self.WIDTH, 7, shaped(text), ln=1, align="R")
+
+    def table(self, title, header, rows, widths):
+        self.title(title, size=13)
+        self.pdf.set_font("arabic", size=10)
+        x = self.pdf.l_margin + self.WIDTH - sum(widths)
+        for i, row in enumerate([header] + rows):
+            self.pdf.set_x(x)
+            if i == 0:
+                self.pdf.set_fill_color(230, 230, 230)
+            # الخلايا تنرسم من اليسار، فالأعمدة بالعكس
+            for value, width in reversed(list(zip(row, widths))):
+                self.pdf.cell(width, 7, shaped(value), border=1, align="R", fill=i == 0)
+            self.pdf.ln()
+        self.pdf.ln(4)
+
+    def save(self, path):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.pdf.output(str(path), "F")
+
+
+def money(value):
+    return f"{value:,.2f}"
+
+
+def describe(filters):
+    labels = {"start_date": "من", "end_date": "إلى", "customers": "العملاء",
+              "movies": "الأفلام", "theaters": "الصالات", "seat_type": "المقاعد",
+              "min_total": "أقل قيمة"}
+    parts = [f"{labels[k]}: {', '.join(v) if isinstance(v, list) else v}"
+             for k, v in filters.items() if v is not None]
+    return " | ".join(parts) or "كل البيانات"
+
+
+def write_pdf(snapshot, filters, path, job):
+    from cinema_api.routers.dashboard import summarize
+
+    summary = summarize(snapshot, filters, top=10)
+    job.rows = summary["tickets"]
+    report = Report(pdf_font())
+    report.title("تقرير مبيعات السينما")
+    report.line(f"الفلاتر: {describe(filters)}")
+    report.line(f"تاريخ التقرير: {time.strftime('%Y-%m-%d %H:%M')}")
+    report.table("المؤشرات", ["المؤشر", "القيمة"], [
+        ["إجمالي المبيعات", money(summary["total_sales"])],
+        ["عدد التذاكر", f"{summary['tickets']:,}"],
+        ["عدد العملاء", f"{summary['unique_customers']:,}"],
+        ["العملاء المتكررين", f"{summary['repeat_customers']:,} ({summary['repeat_ratio']}%)"],
+        ["عدد الصالات", summary["unique_theaters"]],
+        ["عدد الأفلام", summary["unique_movies"]],
+    ], [70, 60])
+    for title, key in (("أعلى الأفلام", "top_movies"), ("أعلى العملاء", "top_customers"),
+                       ("الإيراد حسب الصالة", "revenue_by_theater")):
+        report.table(title, ["الاسم", "المعرف", "الإيراد"],
+                     [[r["name"], r["id"], money(r["total"])] for r in summary[key]],
+                     [80, 40, 50])
+    report.table("الإيراد اليومي", ["اليوم", "الإيراد"],
+                 [[d["date"], money(d["total"])] for d in summary["daily_revenue"]], [60, 60])
+    report.save(path)
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "pdf": write_pdf}
+
+
+# -----------------------
+# الـ jobs
+# -----------------------
+@dataclass
+class ExportJob:
+    id: str
+    format: str
+    filters: dict
+    status: str = "queued"  # queued → running → done | failed
+    rows: int = 0
+    bytes: int = 0
+    error: str = None
+    created: float = field(default_factory=time.time)
+    finished: float = None
+
+    def public(self):
+        return {**asdict(self), "download": f"/exports/{self.id}/download"
+                if self.status == "done" else None}
+
+
+class ExportJobs:
+    def __init__(self, directory=EXPORT_DIR, workers=EXPORT_WORKERS, max_bytes=EXPORT_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.jobs = {}
+        self.hits = self.misses = 0
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="export")
+        self._lock = threading.Lock()
+
+    def path(self, job):
+        return self.directory / f"{job.id}.{job.format}"
+
+    def _meta(self, job_id):
+        return self.directory / f"{job_id}.json"
+
+    def submit(self, fmt, filters):
+        """job للتصدير: الجاهز أو الشغال لنفس الطلب يرجع نفسه بدون حساب."""
+        snapshot = data_loader.get_snapshot()
+        key = f"{fmt}|{normalize(filters)}|{data_loader.source_version()}|{snapshot.rows}"
+        job_id = hashlib.sha1(key.encode()).hexdigest()[:24]
+        with self._lock:
+            job = self.get(job_id)
+            if job is not None and job.status != "failed":
+                self.hits += 1
+                return job
+            self.misses += 1
+            job = self.jobs[job_id] = ExportJob(job_id, fmt, filters)
+        self.pool.submit(self._run, job, snapshot)
+        return job
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None and (job.status != "done" or self.path(job).exists()):
+            return job
+        try:  # ملف جاهز من تشغيل سابق
+            job = ExportJob(**json.loads(self._meta(job_id).read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+        if not self.path(job).exists():
+            return None
+        self.jobs[job_id] = job
+        return job
+
+    def _run(self, job, snapshot):
+        path = self.path(job)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        job.status = "running"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with span(f"export_{job.format}"):
+                WRITERS[job.format](snapshot, job.filters, tmp, job)
+            os.replace(tmp, path)
+            job.bytes = path.stat().st_size
+            job.status = "done"
+            job.finished = time.time()
+            self._meta(job.id).write_text(json.dumps(asdict(job)))
+        except Exception as e:
+            log.exception("export %s failed", job.id)
+            tmp.unlink(missing_ok=True)
+            job.status, job.error, job.finished = "failed", str(e), time.time()
+            return
+        self.evict()
+
+    def evict(self):
+        """الملفات الأقدم تنمسح لحد ما يصير المجموع ضمن max_bytes."""
+        with self._lock:
+            files = sorted((p for p in self.directory.iterdir() if p.suffix[1:] in WRITERS),
+                           key=lambda p: p.stat().st_mtime)
+            total = sum(p.stat().st_size for p in files)
+            for old in files[:-1]:  # آخر ملف (الأحدث) يبقى دايماً
+                if total <= self.max_bytes:
+                    break
+                total -= old.stat().st_size
+                old.unlink(missing_ok=True)
+                self._meta(old.stem).unlink(missing_ok=True)
+                self.jobs.pop(old.stem, None)
+
+    def stop(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {"jobs": {s: statuses.count(s) for s in ("queued", "running", "done", "failed")},
+                "hits": self.hits, "misses": self.misses}
+
+
+jobs = ExportJobs()
+
+
+if __name__ == "__main__":
+    # python -m cinema_api.exports [csv|xlsx|pdf ...]  → زمن كل تصدير وذروة الذاكرة
+    import resource
+    import sys
+
+    snapshot = data_loader.get_snapshot()
+    print(f"{snapshot.rows:,} tickets loaded, RSS "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB")
+    for fmt in sys.argv[1:] or list(WRITERS):
+        problem = unavailable(fmt)
+        if problem:
+            print(f"{fmt}: {problem}")
+            continue
+        job = ExportJob(f"bench-{fmt}", fmt, {})
+        path = EXPORT_DIR / f"{job.id}.{fmt}"
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        t0 = time.perf_counter()
+        WRITERS[fmt](snapshot, {}, path, job)
+        seconds = time.perf_counter() - t0
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{fmt:<5} {job.rows:>10,} rows  {seconds:7.1f}s  "
+              f"{path.stat().st_size / 1e6:8.1f} MB  peak RSS {rss:,.0f} MB")
+        path.unlink()
@@ -0,0 +1,177 @@
+import io
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # صيغة arrow اختيارية
+    pa = None
+
+try:
+    import orjson
+except ImportError:  # بدون orjson: json من المكتبة القياسية (أبطأ)
+    orjson = None
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+# -----------------------
+# JSON: الـ DataFrame يتحول من مصفوفات الأعمدة مباشرة (بدون to_dict ثم
+# jsonable_encoder اللي يمرون على كل قيمة مرتين)
+# -----------------------
+def iso_times(values):
+    """datetime64 → نصوص ISO (مثل Timestamp.isoformat)، و NaT → None."""
+    values = np.asarray(values, dtype="datetime64[ns]")
+    missing = np.isnat(values)
+    ns = values.view("int64")[~missing]
+    unit = "s" if not (ns % 10**9).any() else "us" if not (ns % 1000).any() else "ns"
+    text = np.datetime_as_string(values, unit=unit).astype(object)
+    text[missing] = None
+    return text
+
+
+def json_columns(df):
+    """{column: مصفوفة} جاهزة لـ JSON: الأرقام تبقى numpy (NaN → null)، الوقت
+    نصوص ISO، والـ category تنترجم من الأكواد (قيمة وحدة لكل كود)."""
+    out = {}
+    for name, col in df.items():
+        dtype = col.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            # آخر خانة None للكود -1
+            values = np.append(col.cat.categories.to_numpy(object), None)
+            out[name] = values[col.cat.codes.to_numpy()]
+        elif dtype.kind == "M":
+            out[name] = iso_times(col.to_numpy())
+        elif dtype.kind in "iub":
+            out[name] = col.to_numpy()
+        elif dtype.kind == "f":
+            values = col.to_numpy()
+            out[name] = values if not np.isnan(values).any() else _nullable(values)
+        else:
+            out[name] = col.to_numpy(object, na_value=None)
+    return out
+
+
+def _nullable(values):
+    out = values.astype(object)
+    out[pd.isna(values)] = None
+    return out
+
+
+def records(df):
+    """نفس df.to_dict(orient="records") لكن القيم جاهزة لـ JSON."""
+    columns = json_columns(df)
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*(v.tolist() for v in columns.values()))]
+
+
+def _default(obj):
+    if isinstance(obj, pd.DataFrame):
+        return records(obj)
+    if isinstance(obj, np.ndarray):
+        # مصفوفات object (أو أي مصفوفة بدون orjson)
+        return (_nullable(obj) if obj.dtype.kind in "fM" else obj).tolist()
+    if isinstance(obj, pd.Series):
+        return obj.to_dict()
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return jsonable_encoder(obj)
+
+
+def dumps(content):
+    """JSON بالبايت لأي نتيجة endpoint: dict/list عادية، DataFrame (records)،
+    أو {column: مصفوفة} من json_columns (orient=columns)."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse بـ dumps (orjson لو موجود)."""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def ndjson_chunks(frames):
+    for df in frames:
+        if len(df):
+            # الوقت بنفس iso_times حق ردود الـ JSON (to_json يضيف .000 دايماً)
+            times = {name: iso_times(col.to_numpy())
+                     for name, col in df.items() if col.dtype.kind == "M"}
+            yield df.assign(**times).to_json(orient="records", lines=True,
+                                             force_ascii=False).encode("utf-8")
+
+
+def csv_chunks(frames):
+    header = True
+    for df in frames:
+        yield df.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+
+def _drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def arrow_chunks(frames):
+    """Arrow IPC stream: schema مرة وحدة وبعدها record batch لكل دفعة."""
+    sink = io.BytesIO()
+    writer = None
+    for df in frames:
+        batch = pa.RecordBatch.from_pandas(df, preserve_index=False)
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        if batch.num_rows:
+            writer.write_batch(batch)
+        yield _drain(sink)
+    if writer is not None:
+        writer.close()
+        yield _drain(sink)
+
+
+WRITERS = {"ndjson": ndjson_chunks, "csv": csv_chunks, "arrow": arrow_chunks}
+
+
+if __name__ == "__main__":
+    # python -m cinema_api.formats [rows ...]  → صفوف/ثانية: to_dict + jsonable_encoder
+    # (المسار القديم) مقابل dumps بـ records و orient=columns
+    import sys
+    import time
+
+    from cinema_api.data_loader import get_snapshot
+
+    def timed(func, *args):
+        t0 = time.perf_counter()
+        body = func(*args)
+        return time.perf_counter() - t0, len(body)
+
+    def old_path(df):
+        return JSONResponse(jsonable_encoder(df.to_dict(orient="records"))).body
+
+    snapshot = get_snapshot()
+    sizes = [int(n) for n in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'rows':>10}  {'path':<22}{'rows/s':>14}{'MB':>9}")
+    for n in sizes:
+        df = snapshot.take(np.resize(np.arange(snapshot.rows), n))
+        for label, func, arg in (("to_dict+jsonable", old_path, df),
+                                 ("dumps records", dumps, df),
+                                 ("dumps columns", lambda d: dumps(json_columns(d)), df)):
+            seconds, size = timed(func, arg)
+            print(f"{n:>10,}  {label:<22}{n / seconds:>14,.0f}{size / 1e6:>9.1f}")
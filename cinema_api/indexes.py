@@ -0,0 +1,304 @@
+from functools import cached_property
+import numpy as np
+import pandas as pd
+
+# الأعمدة اللي نبني لها posting lists (فلاتر /filter/data بالـ IDs)
+KEY_COLUMNS = ["customer_id", "movie_id", "theater_id", "seat_type"]
+
+# قيمة NaT بعد تحويل الوقت لـ int64 (nanoseconds)
+NAT = np.iinfo(np.int64).min
+
+
+def time_values(col):
+    """تحويل عمود وقت إلى int64 بالنانوثانية (NaT → NAT)."""
+    return np.asarray(col, dtype="datetime64[ns]").view("int64")
+
+
+def prefix_sums(values):
+    """prefix[i] = مجموع أول i قيمة (NaN = صفر)، فمجموع [a, b) = prefix[b] - prefix[a]."""
+    return np.concatenate([[0.0], np.cumsum(np.nan_to_num(values))])
+
+
+def compile_filters(dictionaries, start_date=None, end_date=None, customers=None,
+                    movies=None, theaters=None, seat_type=None, min_total=None):
+    """فلاتر filter_params → {start, end (ns)، keys: {column: أرقام مفاتيح}، min_total}."""
+    keys = {}
+    for col, values in (("customer_id", customers), ("movie_id", movies),
+                        ("theater_id", theaters), ("seat_type", seat_type)):
+        if values is not None:
+            keys[col] = dictionaries[col].key_ids(values)
+    return {
+        "start": pd.Timestamp(start_date).value if start_date is not None else None,
+        "end": pd.Timestamp(end_date).value if end_date is not None else None,
+        "keys": keys,
+        "min_total": float(min_total) if min_total is not None else None,
+    }
+
+
+def split_positions(row_keys, start):
+    """تقسيم مواقع الصفوف حسب المفتاح: {key_id: مواقع مرتبة تصاعدياً}."""
+    order = np.argsort(row_keys, kind="stable")
+    keys = row_keys[order]
+    bounds = np.flatnonzero(np.diff(keys)) + 1
+    firsts = np.concatenate([[0], bounds]) if len(keys) else bounds
+    return {int(k): p + start for k, p in zip(keys[firsts], np.split(order, bounds))
+            if k >= 0}
+
+
+class KeyIndex:
+    """فهرس مقلوب لعمود: لكل مفتاح (بحروف صغيرة) قائمة مواقع الصفوف، ومعها
+    مفتاح كل صف عشان نقدر نفحص صفوف مرشّحة بدون مسح العمود."""
+
+    def __init__(self, row_keys, postings, start):
+        self.row_keys = row_keys    # مفتاح كل صف (-1 = فاضي)
+        self.postings = postings    # {key_id: مواقع مرتبة}
+        self.start = start
+
+    @classmethod
+    def build(cls, table, name, start, end):
+        row_keys = table.dictionaries[name].lower_keys(table.column(name)[start:end])
+        return cls(row_keys, split_positions(row_keys, start), start)
+
+
+class SortedIndex:
+    """فهرس مرتب لعمود رقمي: البحث الثنائي يرجع مدى المواقع مباشرة."""
+
+    def __init__(self, values, start, null=None):
+        self.values = values
+        self.start = start
+        valid = ~np.isnan(values) if null is None else values != null
+        positions = np.flatnonzero(valid)
+        order = np.argsort(values[positions], kind="stable")
+        self.sorted_values = values[positions][order]
+        self.positions = positions[order] + start
+        self.null = null
+
+    def bounds(self, low=None, high=None):
+        lo = 0 if low is None else np.searchsorted(self.sorted_values, low, "left")
+        hi = len(self.sorted_values) if high is None else \
+            np.searchsorted(self.sorted_values, high, "right")
+        return lo, max(lo, hi)
+
+
+# -----------------------
+# الشروط: كل شرط يعرف حجمه، ويقدر يطلع مواقعه أو يفحص مواقع مرشّحة
+# -----------------------
+class KeyPredicate:
+    def __init__(self, index, ids):
+        self.index = index
+        self.ids = [i for i in ids if i in index.postings]
+        self.size = sum(len(index.postings[i]) for i in self.ids)
+
+    def positions(self):
+        if not self.ids:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate([self.index.postings[i] for i in self.ids]))
+
+    def test(self, positions):
+        return np.isin(self.index.row_keys[positions - self.index.start], self.ids)
+
+
+class RangePredicate:
+    def __init__(self, index, low=None, high=None):
+        self.index = index
+        self.low, self.high = low, high
+        self.lo, self.hi = index.bounds(low, high)
+        self.size = self.hi - self.lo
+
+    def positions(self):
+        return np.sort(self.index.positions[self.lo:self.hi])
+
+    def test(self, positions):
+        values = self.index.values[positions - self.index.start]
+        if self.index.null is None:
+            mask = ~np.isnan(values)
+        else:
+            mask = values != self.index.null
+        if self.low is not None:
+            mask &= values >= self.low
+        if self.high is not None:
+            mask &= values <= self.high
+        return mask
+
+
+class IndexSegment:
+    """فهارس مدى من الصفوف [start, end)."""
+
+    def __init__(self, start, end, keys, purchase_time, total):
+        self.start, self.end = start, end
+        self.keys = keys                    # {column: KeyIndex}
+        self.purchase_time = purchase_time  # SortedIndex (int64 ns)
+        self.total = total                  # SortedIndex (float)
+
+    @property
+    def rows(self):
+        return self.end - self.start
+
+    @classmethod
+    def build(cls, table, start, end):
+        return cls(
+            start, end,
+            keys={c: KeyIndex.build(table, c, start, end) for c in KEY_COLUMNS},
+            purchase_time=SortedIndex(
+                time_values(table.column("purchase_time")[start:end]), start, null=NAT),
+            total=SortedIndex(
+                table.column("total")[start:end].astype("float64"), start),
+        )
+
+    @cached_property
+    def revenue_line(self):
+        """(أوقات الصفوف مرتبة، prefix sum للإيراد بنفس الترتيب): إيراد وعدد
+        تذاكر أي مدى وقت = searchsorted مرتين."""
+        order = self.purchase_time.positions - self.start
+        return self.purchase_time.sorted_values, prefix_sums(self.total.values[order])
+
+    def key_lines(self, column):
+        """نفس revenue_line لكل مفتاح في column: {key_id: (times, prefix)}.
+        تنبني أول ما تنطلب لكل عمود وتبقى مع الـ segment."""
+        lines = self.__dict__.setdefault("_key_lines", {})
+        if column not in lines:
+            times, _ = self.revenue_line
+            order = self.purchase_time.positions - self.start
+            row_keys = self.keys[column].row_keys[order]
+            # ترتيب stable حسب المفتاح: داخل كل مفتاح يبقى الترتيب حسب الوقت
+            by_key = np.argsort(row_keys, kind="stable")
+            keys, times = row_keys[by_key], times[by_key]
+            prefix = prefix_sums(self.total.values[order][by_key])
+            bounds = np.flatnonzero(np.diff(keys)) + 1
+            firsts = np.concatenate([[0], bounds])
+            lasts = np.concatenate([bounds, [len(keys)]])
+            lines[column] = {int(keys[a]): (times[a:b], prefix[a:b + 1])
+                             for a, b in zip(firsts, lasts) if len(keys) and keys[a] >= 0}
+        return lines[column]
+
+    def predicates(self, filters):
+        """(شرط الوقت أو None، باقي الشروط)."""
+        time = None
+        if filters["start"] is not None or filters["end"] is not None:
+            time = RangePredicate(self.purchase_time, filters["start"], filters["end"])
+        others = [KeyPredicate(self.keys[col], ids)
+                  for col, ids in filters["keys"].items()]
+        if filters["min_total"] is not None:
+            others.append(RangePredicate(self.total, filters["min_total"]))
+        return time, others
+
+    def select(self, filters):
+        time, preds = self.predicates(filters)
+        if time is not None:
+            preds.append(time)
+
+        # نبدأ بأصغر مجموعة مرشّحة، وباقي الشروط نفحصها على المرشّحين فقط
+        preds.sort(key=lambda p: p.size)
+        candidates = preds[0].positions()
+        for pred in preds[1:]:
+            if not len(candidates):
+                break
+            candidates = candidates[pred.test(candidates)]
+        return candidates
+
+
+class TicketIndex:
+    """فهارس /filter/data. تتكون من segments: كل دفعة تذاكر جديدة تضيف
+    segment صغير، والـ segments المتقاربة بالحجم تندمج (مثل LSM) فتكلفة
+    الإضافة تتبع حجم الدفعة مو حجم الجدول."""
+
+    def __init__(self, table, segments):
+        self.table = table
+        self.segments = segments
+
+    @property
+    def rows(self):
+        return self.segments[-1].end if self.segments else 0
+
+    @classmethod
+    def build(cls, table):
+        return cls(table, (IndexSegment.build(table, 0, table.rows),))
+
+    def extend(self, table):
+        """فهرس جديد يغطي صفوف table كاملة (الفهرس الحالي ما يتغير)."""
+        if table.rows == self.rows:
+            return TicketIndex(table, self.segments)
+        segments = list(self.segments)
+        segments.append(IndexSegment.build(table, self.rows, table.rows))
+        while len(segments) > 1 and segments[-2].rows <= segments[-1].rows:
+            last, prev = segments.pop(), segments.pop()
+            segments.append(IndexSegment.build(table, prev.start, last.end))
+        return TicketIndex(table, tuple(segments))
+
+    def compile(self, **filters):
+        return compile_filters(self.table.dictionaries, **filters)
+
+    def select(self, **filters):
+        """ترجع مواقع الصفوف المطابقة (مرتبة حسب ترتيب الصفوف)، أو None لو
+        ما فيه أي فلتر — فالتكلفة تتبع حجم النتيجة مو حجم الجدول."""
+        compiled = self.compile(**filters)
+        if compiled["start"] is None and compiled["end"] is None and \
+                not compiled["keys"] and compiled["min_total"] is None:
+            return None
+        parts = [s.select(compiled) for s in self.segments]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def ordered(self, after=None, chunk=10_000, **filters):
+        """مواقع الصفوف المطابقة مرتبة حسب (purchase_time, ticket_id)، دفعة
+        دفعة (generator). after = (وقت بالنانوثانية، ticket_id) لآخر صف في
+        الصفحة السابقة — يعني keyset pagination بدون offset.
+
+        لو فيه فلتر أصغر بكثير من مدى الوقت نجيب المرشّحين ونرتبهم، وإلا نمشي
+        على فهرس الوقت المرتب لكل segment وندمجها دفعة دفعة (ذاكرة ثابتة)."""
+        compiled = self.compile(**filters)
+        if after is not None:
+            start = compiled["start"]
+            compiled["start"] = after[0] if start is None else max(start, after[0])
+        if compiled["start"] is None and compiled["end"] is None:
+            compiled["start"] = NAT + 1  # الصفوف بدون purchase_time ما لها ترتيب
+
+        plans = [s.predicates(compiled) for s in self.segments]
+        time_size = sum(time.size for time, _ in plans)
+        other_size = min((sum(p[i].size for _, p in plans)
+                          for i in range(len(plans[0][1]))), default=None)
+
+        if other_size is not None and other_size * 4 < time_size:
+            batches = [np.concatenate([s.select(compiled) for s in self.segments])]
+        else:
+            batches = self._merge_time(plans, chunk)
+
+        times = self.table.column("purchase_time").view("int64")
+        ticket_ids = self.table.column("ticket_id")
+        for positions in batches:
+            if not len(positions):
+                continue
+            t, ids = times[positions], ticket_ids[positions]
+            if after is not None:
+                keep = (t != after[0]) | (ids > after[1])
+                positions, t, ids = positions[keep], t[keep], ids[keep]
+            order = np.lexsort((ids, t))
+            for i in range(0, len(order), chunk):
+                yield positions[order[i:i + chunk]]
+
+    def _merge_time(self, plans, chunk):
+        """دمج فهارس الوقت المرتبة للـ segments على دفعات: كل دفعة فيها كل
+        الصفوف اللي وقتها <= حد مشترك، فالترتيب بين الدفعات مضمون."""
+        pointers = [time.lo for time, _ in plans]
+        while True:
+            active = [i for i, (time, _) in enumerate(plans) if pointers[i] < time.hi]
+            if not active:
+                return
+            threshold = None
+            for i in active:
+                time = plans[i][0]
+                if pointers[i] + chunk < time.hi:
+                    value = time.index.sorted_values[pointers[i] + chunk - 1]
+                    threshold = value if threshold is None else min(threshold, value)
+
+            parts = []
+            for i in active:
+                time, others = plans[i]
+                values = time.index.sorted_values[pointers[i]:time.hi]
+                end = len(values) if threshold is None else \
+                    np.searchsorted(values, threshold, "right")
+                positions = time.index.positions[pointers[i]:pointers[i] + end]
+                for pred in others:
+                    positions = positions[pred.test(positions)]
+                parts.append(positions)
+                pointers[i] += end
+            yield np.concatenate(parts)
@@ -0,0 +1,123 @@
+# التذاكر الجديدة كلها تمر من tickets.csv: POST /tickets يكتبها في آخر الملف
+# (append_csv) ومراقب كل عملية API يضيفها للـ store حقها. فكل الـ workers
+# يشوفون نفس التذاكر، وتبقى بعد إعادة التشغيل.
+import io
+import logging
+import os
+import threading
+import pandas as pd
+from cinema_api import columnar, data_loader
+from cinema_api.data_loader import TICKETS_CSV, append_tickets, unknown_keys
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+# كل كم ثانية نفحص tickets.csv (0 = إيقاف المراقبة)
+WATCH_INTERVAL = float(os.environ.get("CINEMA_WATCH_INTERVAL", "2"))
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"  # نفس صيغة purchase_time في tickets.csv
+
+watcher = None  # مراقب عملية الـ API (main.warm_up)
+
+
+def append_csv(batch, path=TICKETS_CSV):
+    """تكتب الدفعة في آخر tickets.csv بنفس ترتيب أعمدته. الكتابة كلها تحت
+    قفل بين العمليات، فدفعتين من workers مختلفين ما يتداخلون."""
+    with open(path, "ab") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            with open(path, "rb") as head:
+                columns = head.readline().decode().strip().split(",")
+            f.write(batch.to_csv(columns=columns, header=False, index=False,
+                                 date_format=TIME_FORMAT).encode())
+            f.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class TicketsWatcher:
+    """يتابع tickets.csv (مثل tail -f) ويضيف الأسطر الجديدة للـ store أول
+    بأول. السطر الأخير لو ناقص (بدون \\n) ينتظر للفحص الجاي."""
+
+    def __init__(self, path=TICKETS_CSV, offset=None, interval=WATCH_INTERVAL):
+        self.path = path
+        # افتراضياً من حيث وقف data_loader.load() (لازم يكون خلص)
+        self.offset = data_loader.TICKETS_OFFSET if offset is None else offset
+        self.interval = interval
+        with open(path, "rb") as f:
+            self.header = f.readline()
+        self._lock = threading.Lock()  # المراقب وطلبات POST /tickets
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """تقرأ الأسطر الجديدة وتضيفها. ترجع عدد التذاكر المضافة."""
+        with self._lock:
+            return self._poll()
+
+    def _poll(self):
+        if data_loader.STORE != "partitioned":
+            return self._ingest()
+        if self.path.stat().st_size == self.offset:
+            return 0
+        # الـ fragments على القرص مشتركة بين الـ workers: واحد بس يكتب (تحت
+        # القفل)، وقبلها آخر meta.json — اللي كتبه worker ثاني ننشره ونكمل من
+        # tickets_offset حقه بدل ما نكتب نفس الأسطر مرة ثانية
+        with columnar.build_lock(data_loader.PARTITIONS_DIR):
+            store = data_loader.reload_partitions().partitions
+            self.offset = max(self.offset, store.meta["tickets_offset"])
+            return self._ingest()
+
+    def _ingest(self):
+        size = self.path.stat().st_size
+        if size < self.offset:
+            log.warning("%s got smaller (%d < %d); restart to reload it",
+                        self.path, size, self.offset)
+            self.offset = size
+            return 0
+        if size == self.offset:
+            return 0
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        end = chunk.rfind(b"\n") + 1
+        if not end:
+            return 0
+
+        batch = pd.read_csv(io.BytesIO(self.header + chunk[:end]))
+        missing = unknown_keys(batch)
+        if missing:
+            log.warning("skipping tickets with unknown ids: %s", missing)
+            for key, ids in missing.items():
+                batch = batch[~batch[key].isin(ids)]
+        # الـ offset يتقدم بعد ما الإضافة تنجح بس: لو فشلت نفس الأسطر ترجع في الفحص الجاي
+        if len(batch):
+            append_tickets(batch, self.offset + end)
+        self.offset += end
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                log.exception("failed to ingest new lines from %s", self.path)
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="tickets-watcher",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,121 @@
+# تشغيل الـ API بدون انتظار البيانات: الـ lifespan يبدأ warm-up في thread
+# بالخلفية (تحميل التذاكر والفهارس، عمليات الـ pool، المراقب، تسخين الكاش)
+# والـ API يستقبل طلبات من أول لحظة:
+#   - /health/live: 200 لين الـ warm-up يفشل، بعدها 503 (الـ orchestrator يعيد
+#     تشغيل العملية بدل ما تبقى عالقة)
+#   - /health/ready: 200 لما كل المراحل تخلص، وإلا 503 مع المرحلة الحالية
+#   - endpoints البيانات ترد 503 + Retry-After لين يجهز (require_ready)، وبدون
+#     Retry-After لو فشل (الإعادة ما تفيد)
+#   - زمن كل مرحلة في /health/ready وفي اللوق، وفي /metrics كـ startup_phase_seconds
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from fastapi import HTTPException
+from cinema_api import metrics
+
+RETRY_AFTER = int(os.environ.get("CINEMA_RETRY_AFTER", "5"))  # ثواني
+# المراحل اللي الجاهزية تنتظرها بالترتيب (read و index من data_loader.load)
+PHASES = ("read", "index", "workers", "watcher", "cache")
+
+log = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    def __init__(self, phases=PHASES):
+        self.phases = phases
+        self.state = "starting"   # starting → ready أو failed
+        self.phase = None
+        self.timings = {}         # المرحلة → ثواني
+        self.error = None
+        self.started = time.perf_counter()
+        self.ready_after = None
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    @property
+    def failed(self):
+        return self.state == "failed"
+
+    def retry_headers(self):
+        """Retry-After أثناء التحميل بس؛ بعد الفشل ما فيه شي ننتظره."""
+        return {} if self.failed else {"Retry-After": str(RETRY_AFTER)}
+
+    @contextmanager
+    def step(self, name):
+        self.phase = name
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - t0, 3)
+
+    def start(self, warm_up, after=None):
+        """warm_up(step) في thread بالخلفية؛ كل مرحلة داخل with step(name).
+        after(step) (اختياري) يكمل في نفس الـ thread بعد ما يصير جاهز: تسخين
+        ما يستاهل يأخر الجاهزية، وزمنه ينقاس بنفس الطريقة."""
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(warm_up, after),
+                                        name="warm-up", daemon=True)
+        self._thread.start()
+
+    def _run(self, warm_up, after):
+        try:
+            warm_up(self.step)
+        except Exception as e:
+            self.state, self.error = "failed", repr(e)
+            log.exception("startup failed in phase %s", self.phase)
+            return
+        self.phase = None
+        self.ready_after = round(time.perf_counter() - self.started, 3)
+        self.state = "ready"
+        log.info("ready after %.2fs: %s", self.ready_after,
+                 ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.timings.items()))
+        if after is not None:
+            try:
+                after(self.step)
+            except Exception:
+                log.exception("background warm-up failed in phase %s", self.phase)
+            self.phase = None
+
+    def wait(self, timeout=None):
+        """ينتظر الـ warm-up (الاختبارات والسكربتات)؛ True لو جاهز."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def status(self):
+        return {
+            "status": self.state,
+            "phase": self.phase,
+            "progress": round(sum(name in self.timings for name in self.phases)
+                              / len(self.phases), 2),
+            "phases": dict(self.timings),
+            "uptime": round(time.perf_counter() - self.started, 3),
+            "ready_after": self.ready_after,
+            "error": self.error,
+        }
+
+
+lifecycle = Lifecycle()
+
+
+@metrics.gauge("cinema_ready", "1 once startup warm-up has finished.")
+def _ready_gauge():
+    return int(lifecycle.ready)
+
+
+@metrics.gauge("cinema_startup_phase_seconds", "Duration of each startup phase.", ("phase",))
+def _phase_seconds():
+    return {(name,): seconds for name, seconds in lifecycle.timings.items()}
+
+
+def require_ready():
+    """endpoints البيانات: 503 + Retry-After لين الـ warm-up يخلص."""
+    if not lifecycle.ready:
+        raise HTTPException(status_code=503, detail=lifecycle.status(),
+                            headers=lifecycle.retry_headers())
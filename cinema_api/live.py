@@ -0,0 +1,301 @@
+# مؤشرات الداشبورد بالدفع (routers/live.py: SSE و WebSocket) بدل ما كل
+# داشبورد يعيد الطلب كل شوي:
+#   - كل اشتراك = فلاتر + top. المشتركين بنفس الفلاتر (بعد normalize مثل
+#     الكاش) يتشاركون اشتراك واحد
+#   - مع كل نسخة بيانات جديدة المؤشرات تنحسب مرة وحدة لكل اشتراك (عن طريق
+#     الـ executor مثل /dashboard/summary)، والفرق عن النسخة السابقة يتحول
+#     لـ JSON مرة وحدة وينرسل لكل المشتركين
+#   - الفرق = المفاتيح اللي تغيرت بس، والإيراد اليومي بالأيام اللي تغيرت
+#   - المشترك البطيء (الطابور امتلأ) يفقد الفروقات اللي ما وصلته ويستلم
+#     المؤشرات كاملة بدالها
+#
+#   python -m cinema_api.live [subscribers] [specs] [updates]
+#   # اختبار تحميل: API حقيقي (uvicorn) ومشتركين SSE، ووقت المعالج في الـ API
+#   # لكل تحديث مقابل ما الداشبوردات تعيد طلب /dashboard/summary
+import asyncio
+import logging
+import os
+import time
+from cinema_api import formats
+from cinema_api.cache import normalize
+from cinema_api.data_loader import get_snapshot
+from cinema_api.executor import engine
+from cinema_api.routers.dashboard import summary
+
+INTERVAL = float(os.environ.get("CINEMA_LIVE_INTERVAL", "0.5"))  # ثواني بين فحص النسخة
+BACKLOG = 8      # رسائل تنتظر لكل مشترك قبل ما يعتبر بطيء
+HEARTBEAT = 15   # ثواني: تعليق SSE عشان الاتصال ما ينقطع من البروكسي
+
+log = logging.getLogger(__name__)
+
+
+class Message:
+    """رسالة جاهزة: JSON نص (WebSocket) و event SSE بالبايت، تنبني مرة وحدة
+    لكل المشتركين."""
+
+    def __init__(self, kind, version, payload):
+        self.kind = kind
+        self.text = formats.dumps({"type": kind, "version": version, **payload}).decode()
+        self.sse = f"event: {kind}\nid: {version}\ndata: {self.text}\n\n".encode()
+
+
+def diff(old, new):
+    """{"set": المفاتيح اللي تغيرت، "days": الأيام اللي تغيرت أو انضافت}
+    (العميل يطبقه بـ api_client.merge_delta). لو يوم انشال (ما يصير مع
+    الإضافة بس) daily_revenue كله ينرسل في set."""
+    changes = {k: v for k, v in new.items() if k != "daily_revenue" and old.get(k) != v}
+    before = {d["date"]: d["total"] for d in old.get("daily_revenue", [])}
+    after = {d["date"] for d in new["daily_revenue"]}
+    if before.keys() - after:
+        changes["daily_revenue"] = new["daily_revenue"]
+        return {"set": changes, "days": []}
+    days = [d for d in new["daily_revenue"] if before.get(d["date"]) != d["total"]]
+    return {"set": changes, "days": days}
+
+
+class Subscription:
+    def __init__(self, key, filters, top):
+        self.key = key
+        self.filters = filters
+        self.top = top
+        self.version = None
+        self.kpis = None
+        self.full = None     # آخر مؤشرات كاملة (Message) للمشترك الجديد أو البطيء
+        self.queues = set()
+        self.lock = asyncio.Lock()
+
+
+class Hub:
+    """الاشتراكات المفتوحة، ومهمة تتابع نسخة البيانات وتوزع الفروقات."""
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.updates = self.messages = self.resyncs = 0
+        self.compute_seconds = 0.0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def subscribe(self, filters, top=5):
+        """(الاشتراك، طابور المشترك) وأول رسالة في الطابور المؤشرات كاملة.
+        أخطاء الفلاتر (تاريخ غلط مثلاً) تطلع من هنا قبل فتح الاتصال."""
+        key = normalize({"top": top, **filters})
+        subscription = self.subscriptions.get(key)
+        if subscription is None:
+            subscription = self.subscriptions[key] = Subscription(key, filters, top)
+        try:
+            await self._update(subscription, get_snapshot())
+        except Exception:
+            if not subscription.queues:
+                self.subscriptions.pop(key, None)
+            raise
+        queue = asyncio.Queue(BACKLOG)
+        queue.put_nowait(subscription.full)
+        subscription.queues.add(queue)
+        return subscription, queue
+
+    def unsubscribe(self, subscription, queue):
+        subscription.queues.discard(queue)
+        if not subscription.queues and self.subscriptions.get(subscription.key) is subscription:
+            del self.subscriptions[subscription.key]
+
+    async def _update(self, subscription, snapshot):
+        async with subscription.lock:
+            if subscription.version is not None and subscription.version >= snapshot.version:
+                return
+            t0 = time.perf_counter()
+            kpis, _ = await engine.run("live/summary", f"{snapshot.version}:{subscription.key}",
+                                       snapshot, summary, subscription.filters, subscription.top)
+            previous = subscription.kpis
+            subscription.kpis, subscription.version = kpis, snapshot.version
+            subscription.full = Message("snapshot", snapshot.version, {"kpis": kpis})
+            self.updates += 1
+            if previous is not None and subscription.queues:
+                delta = diff(previous, kpis)
+                if delta["set"] or delta["days"]:
+                    self._fanout(subscription, Message("delta", snapshot.version, delta))
+            self.compute_seconds += time.perf_counter() - t0
+
+    def _fanout(self, subscription, message):
+        for queue in subscription.queues:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # فروقات ضاعت: نفضي الطابور ونرسل المؤشرات كاملة
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(subscription.full)
+                self.resyncs += 1
+            self.messages += 1
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(INTERVAL)
+            if not self.subscriptions:
+                continue  # قبل أول مشترك (أو قبل ما البيانات تجهز) ما فيه شي يتحدث
+            snapshot = get_snapshot()
+            stale = [s for s in list(self.subscriptions.values())
+                     if s.version is not None and s.version < snapshot.version]
+            if stale:
+                results = await asyncio.gather(*(self._update(s, snapshot) for s in stale),
+                                               return_exceptions=True)
+                for subscription, error in zip(stale, results):
+                    if isinstance(error, Exception):
+                        # الاشتراك يبقى على نسخته ويجرب مع النسخة الجاية
+                        log.error("live update failed for %s: %r", subscription.key, error)
+
+    def stats(self):
+        return {
+            "subscriptions": len(self.subscriptions),
+            "subscribers": sum(len(s.queues) for s in self.subscriptions.values()),
+            "updates": self.updates,
+            "messages": self.messages,
+            "resyncs": self.resyncs,
+            "compute_seconds": round(self.compute_seconds, 3),
+        }
+
+
+hub = Hub()
+
+
+if __name__ == "__main__":
+    # python -m cinema_api.live [subscribers] [specs] [updates]
+    import json
+    import socket
+    import subprocess
+    import sys
+    import httpx
+    import pandas as pd
+    from cinema_api.data_loader import DATA_DIR
+
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    specs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    updates = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+    # بدون process pool افتراضياً: الحساب كله في عملية الـ API اللي نقيس وقتها
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "cinema_api.main:app", "--port", str(port),
+         "--log-level", "warning"],
+        env={**os.environ, "CINEMA_POOL_WORKERS": os.environ.get("CINEMA_POOL_WORKERS", "0")})
+
+    def cpu():
+        """وقت المعالج لعملية الـ API (user + system) بالثواني — Linux."""
+        with open(f"/proc/{server.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    # تذاكر للإضافة: صفوف موجودة بأرقام جديدة. كل الاشتراكات تشمل التذاكر
+    # الجديدة (يختلفون في top) فكل تحديث يوصل لكل المشتركين
+    sample = pd.read_csv(DATA_DIR / "tickets.csv", nrows=updates * 15)
+    spec_params = [{"top": 1 + i} for i in range(specs)]
+
+    def batch(i):
+        rows = sample.iloc[i * 5:(i + 1) * 5].assign(
+            ticket_id=[f"LIVE-{i}-{j}" for j in range(5)], purchase_time=lambda f: pd.to_datetime(
+                f["purchase_time"]).dt.strftime("%Y-%m-%dT%H:%M:%S"))
+        return json.loads(rows.to_json(orient="records"))
+
+    async def listen(client, params, seen, ready):
+        first = True
+        async with client.stream("GET", "/live/kpis", params=params, timeout=None) as r:
+            async for line in r.aiter_lines():
+                if line.startswith("data: "):
+                    version = json.loads(line[6:])["version"]
+                    if first:
+                        ready.release()
+                        first = False
+                    count, size = seen.get(version, (0, 0))
+                    seen[version] = (count + 1, size + len(line))
+
+    async def rounds(client, offset, refresh):
+        """updates مرة: دفعة تذاكر ثم refresh لين كل المشتركين يشوفونها.
+        (وقت المعالج لكل تحديث، الزمن الوسيط لين آخر مشترك)."""
+        t0, latencies = cpu(), []
+        for i in range(updates):
+            sent = time.perf_counter()
+            version = (await client.post("/tickets", json=batch(offset + i))).json()["version"]
+            await refresh(version)
+            latencies.append(time.perf_counter() - sent)
+        return (cpu() - t0) / updates, sorted(latencies)[len(latencies) // 2]
+
+    async def main():
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+
+            # الإضافة لحالها (تنطرح من الطريقتين)
+            async def nothing(version):
+                pass
+
+            append, _ = await rounds(client, 2 * updates, nothing)
+
+            # الداشبوردات القديمة: كل مشترك يعيد طلب الملخص بعد كل تحديث
+            sizes = []
+
+            async def poll(version):
+                responses = await asyncio.gather(*(
+                    client.get("/dashboard/summary", params=spec_params[i % specs])
+                    for i in range(subscribers)))
+                sizes.append(sum(len(r.content) for r in responses))
+
+            polling, polled = await rounds(client, 0, poll)
+
+            seen, ready = {}, asyncio.Semaphore(0)
+            tasks = [asyncio.create_task(listen(client, spec_params[i % specs], seen, ready))
+                     for i in range(subscribers)]
+            for _ in range(subscribers):
+                await asyncio.wait_for(ready.acquire(), 60)
+            await asyncio.sleep(2 * INTERVAL)
+
+            async def pushed(version):
+                deadline = time.monotonic() + 60
+                while seen.get(version, (0, 0))[0] < subscribers and time.monotonic() < deadline:
+                    await asyncio.sleep(0.005)
+
+            idle0 = cpu()
+            await asyncio.sleep(2)
+            idle = (cpu() - idle0) / 2
+            push, delivered = await rounds(client, updates, pushed)
+            versions = sorted(seen)[-updates:]
+            stats = (await client.get("/live/stats")).json()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        push_bytes = sum(seen[v][1] for v in versions) / updates
+        print(f"{subscribers} subscribers, {specs} filter specs, {updates} updates "
+              f"(server CPU per update, without the POST /tickets append: "
+              f"{append * 1000:.1f} ms)")
+        polling, push = polling - append, push - append
+        print(f"  polling /dashboard/summary : {polling * 1000:8.1f} ms CPU, "
+              f"{sum(sizes) / len(sizes) / 1024:8.1f} KiB, all refreshed after "
+              f"{polled * 1000:.0f} ms")
+        print(f"  push (SSE deltas)          : {push * 1000:8.1f} ms CPU, "
+              f"{push_bytes / 1024:8.1f} KiB, all updated after {delivered * 1000:.0f} ms"
+              f" (idle {idle * 1000:.1f} ms/s, check every {INTERVAL}s)")
+        print(f"  hub: {stats}")
+
+    try:
+        asyncio.run(main())
+    finally:
+        server.terminate()
+        server.wait()
@@ -1,10 +1,75 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import os
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # استدعاء الراوترات من الباكيج
-from cinema_api.routers import movies, customers, revenue, filters
+from cinema_api.routers import (movies, customers, revenue, filters, tickets, dashboard,
+                                exports, dimensions, stats, shows, live, auth)
+from cinema_api import data_loader, dimensions as dimensions_index, exports as export_jobs, \
+    formats, ingest, live as live_kpis, metrics, shards
+from cinema_api.cache import prefill, results
+from cinema_api.executor import engine
+from cinema_api.lifecycle import lifecycle, require_ready
+import users_db
 
-app = FastAPI(title="Cinema API")
+
+def warm_up(step):
+    """كل اللي يحتاج البيانات، بالترتيب، في thread الـ lifecycle."""
+    data_loader.load(step)
+    # الـ process pool (أو عمليات الـ shards) يبدأ قبل المراقب: العمليات تفتح
+    # نفس الـ snapshot. مع CINEMA_SHARDS التجميع يتوزع على الـ shards والـ
+    # engine يشتغل بـ threads
+    with step("workers"):
+        if shards.SHARDS > 0:
+            shards.coordinator.start()
+        else:
+            engine.start()
+    # متابعة tickets.csv وإضافة التذاكر الجديدة بدون إعادة تشغيل (يكمل من
+    # حيث وقف التحميل)
+    with step("watcher"):
+        ingest.watcher = ingest.TicketsWatcher()
+        ingest.watcher.start()
+    # أول شي يطلبه الداشبورد: الخيارات والملخص بدون فلاتر
+    with step("cache"):
+        for name in dimensions_index.SOURCES:
+            dimensions_index.table(name)
+        prefill("dashboard/options", {}, dashboard.filter_options)
+        no_filters = filters.filter_params()
+        prefill("dashboard/summary", {"top": 5, "approx": False, **no_filters},
+                dashboard.summary, no_filters, 5, False)
+
+
+def warm_up_after_ready(step):
+    # فهرس بحث العملاء يتبني بعد الجاهزية بدل أول طلب بحث (ثواني مع عملاء كثير)
+    with step("search"):
+        dimensions_index.customer_search()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # المستخدمين والجلسات (SQLite)؛ CINEMA_ADMIN_PASSWORD يضيف admin لو مو موجود
+    users_db.init_db()
+    if os.environ.get("CINEMA_ADMIN_PASSWORD"):
+        users_db.add_user("admin", os.environ["CINEMA_ADMIN_PASSWORD"])
+    # الـ API يستقبل طلبات من الحين؛ البيانات تتحمل في الخلفية (lifecycle.py)
+    lifecycle.start(warm_up, after=warm_up_after_ready)
+    # مؤشرات /live: تنحسب مع كل نسخة بيانات جديدة وتنرسل للمشتركين
+    live_kpis.hub.start()
+    yield
+    await live_kpis.hub.stop()
+    if ingest.watcher is not None:
+        ingest.watcher.stop()
+    export_jobs.jobs.stop()
+    engine.stop()
+    shards.coordinator.stop()
+    users_db.close_all()
+
+
+app = FastAPI(title="Cinema API", lifespan=lifespan,
+              default_response_class=formats.FastJSONResponse)
 
 # تفعيل CORS عشان Streamlit يتصل
 app.add_middleware(
@@ -15,13 +80,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# تسجيل الـ Routers
-app.include_router(movies.router, prefix="/movies", tags=["Movies"])
-app.include_router(customers.router, prefix="/customers", tags=["Customers"])
-app.include_router(revenue.router, prefix="/revenue", tags=["Revenue"])
-app.include_router(filters.router, prefix="/filter", tags=["Filters"])
+# ضغط الردود الكبيرة (صفحات /filter/data والـ summary) للداشبوردات
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# آخر middleware = أول واحد يستقبل الطلب: الزمن يشمل الضغط والـ CORS
+app.add_middleware(metrics.TimingMiddleware)
+
+# تسجيل الـ Routers — endpoints البيانات ترد 503 لين البيانات تجهز، وتحتاج
+# token لو CINEMA_AUTH_REQUIRED=1
+protected = [Depends(require_ready), Depends(auth.require_user)]
+app.include_router(auth.router)
+app.include_router(movies.router, prefix="/movies", tags=["Movies"], dependencies=protected)
+app.include_router(customers.router, prefix="/customers", tags=["Customers"],
+                   dependencies=protected)
+app.include_router(revenue.router, prefix="/revenue", tags=["Revenue"], dependencies=protected)
+app.include_router(filters.router, prefix="/filter", tags=["Filters"], dependencies=protected)
+app.include_router(tickets.router, dependencies=protected)
+app.include_router(dashboard.router, dependencies=protected)
+app.include_router(exports.router, dependencies=protected)
+app.include_router(dimensions.router, dependencies=protected)
+app.include_router(stats.router, dependencies=protected)
+app.include_router(shows.router, dependencies=protected)
+app.include_router(live.router, dependencies=protected)
 
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Cinema API is running 🚀"}
+
+
+@app.get("/health/live")
+async def health_live():
+    """العملية شغالة وتستقبل طلبات (حتى أثناء التحميل). 503 لو الـ warm-up
+    فشل: العملية ما راح تجهز أبداً، فالأحسن تنعاد."""
+    status = lifecycle.status()
+    if lifecycle.failed:
+        return JSONResponse({"status": "failed", "phase": status["phase"],
+                             "error": status["error"]}, status_code=503)
+    return {"status": "alive", "uptime": status["uptime"]}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """200 لما البيانات وكل المراحل تجهز، وإلا 503 مع المرحلة الحالية والتقدم."""
+    status = lifecycle.status()
+    if not lifecycle.ready:
+        return JSONResponse(status, status_code=503, headers=lifecycle.retry_headers())
+    return status
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return results.stats()
+
+
+@app.get("/engine/stats")
+def engine_stats():
+    return {**engine.stats(), "shards": shards.coordinator.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """القياسات بصيغة Prometheus text."""
+    return PlainTextResponse(metrics.render(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/metrics/profiles/{profile_id}", response_class=PlainTextResponse)
+def request_profile(profile_id: str):
+    """نتيجة cProfile لطلب انرسل بـ X-Profile: 1 (الـ id من X-Profile-Id)."""
+    text = metrics.get_profile(profile_id)
+    if text is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return text
@@ -0,0 +1,363 @@
+# قياسات الأداء (بدون مكتبات خارجية):
+#   - TimingMiddleware: histogram لزمن كل طلب حسب الـ route والـ status
+#   - span("filter") / span("aggregate") ...: زمن مراحل الحساب. يتسجل في
+#     histogram، ومراحل الطلب الحالي ترجع في Server-Timing header (حتى لو
+#     الحساب صار في عملية من الـ pool)
+#   - gauges: عدد الصفوف، حجم الأعمدة بالذاكرة، الكاش، كاش الـ partitions، الـ executor، الـ shards، التصدير
+#   - /metrics بصيغة Prometheus text
+#   - X-Profile: 1 → حساب الطلب تحت cProfile (بدون كاش) والنتيجة في
+#     /metrics/profiles/{id} (الـ id في X-Profile-Id)
+from collections import OrderedDict
+from contextlib import contextmanager
+import contextvars
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import resource
+import threading
+import time
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# CINEMA_PROFILE=0 يقفل X-Profile (مثلاً لو الـ API مفتوح برّا)
+PROFILE_ENABLED = os.environ.get("CINEMA_PROFILE", "1") != "0"
+MAX_PROFILES = 32
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+               for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def percentile(samples, q):
+    """قيمة الـ quantile q من عيّنات (لقياسات الـ load test والـ bench)."""
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+class Histogram:
+    def __init__(self, name, doc, labels=(), buckets=BUCKETS):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.buckets = buckets
+        self.series = {}  # label values → [counts لكل bucket، المجموع، العدد]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            counts = self.series.get(labels)
+            if counts is None:
+                counts = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][i] += 1
+            counts[1] += value
+            counts[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted((k, [list(c[0]), c[1], c[2]]) for k, c in self.series.items())
+        names = self.labels + ("le",)
+        for labels, (buckets, total, count) in series:
+            for bound, n in zip(self.buckets, buckets):
+                yield f"{self.name}_bucket{_labels(names, labels + (bound,))} {n}"
+            yield f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {count}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {total!r}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {count}"
+
+
+class Gauge:
+    """قيمة تنقرا وقت الـ scrape: func() ترجع رقم أو {label values: رقم}."""
+
+    def __init__(self, name, doc, func, labels=(), kind="gauge"):
+        self.name, self.doc, self.func, self.labels, self.kind = name, doc, func, tuple(labels), kind
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} {self.kind}"
+        values = self.func()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+
+REQUESTS = Histogram("cinema_http_request_duration_seconds",
+                     "Request latency by route and status.", ("method", "route", "status"))
+STAGES = Histogram("cinema_stage_duration_seconds",
+                   "Time spent per processing stage.", ("stage",))
+REGISTRY = [REQUESTS, STAGES]
+
+
+def gauge(name, doc, labels=(), kind="gauge"):
+    """decorator: يسجّل الدالة كـ Gauge في REGISTRY."""
+    def register(func):
+        REGISTRY.append(Gauge(name, doc, func, labels, kind))
+        return func
+    return register
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------
+# spans: مراحل الطلب الحالي (contextvar ينتقل مع asyncio.to_thread)
+# -----------------------
+_spans = contextvars.ContextVar("cinema_spans", default=None)
+
+
+def record(stage, seconds):
+    STAGES.observe(seconds, stage)
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t0)
+
+
+@contextmanager
+def collect():
+    """يجمع الـ spans اللي تنسجل داخل الـ block (في عمليات الـ pool ترجع
+    مع النتيجة وتتسجل في عملية الـ API بـ replay)."""
+    spans = []
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+
+def replay(spans):
+    for stage, seconds in spans:
+        record(stage, seconds)
+
+
+def server_timing(spans):
+    totals = {}
+    for stage, seconds in spans:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in totals.items())
+
+
+# -----------------------
+# profiling لطلب واحد
+# -----------------------
+_profile_id = contextvars.ContextVar("cinema_profile", default=None)
+_ids = itertools.count(1)
+profiles = OrderedDict()  # id → نص pstats
+_profiles_lock = threading.Lock()
+
+
+def profiling():
+    return _profile_id.get() is not None
+
+
+def profiled(snapshot, func, *args):
+    """func(snapshot, *args) تحت cProfile → (النتيجة، أعلى الدوال بالزمن التراكمي)."""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, snapshot, *args)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+    return result, out.getvalue()
+
+
+def attach_profile(text):
+    profile_id = _profile_id.get()
+    if profile_id is None:
+        return
+    with _profiles_lock:
+        profiles[profile_id] = profiles.get(profile_id, "") + text
+        while len(profiles) > MAX_PROFILES:
+            profiles.popitem(last=False)
+
+
+def get_profile(profile_id):
+    with _profiles_lock:
+        return profiles.get(profile_id)
+
+
+# -----------------------
+# ASGI middleware
+# -----------------------
+def route_template(scope):
+    """/metrics/profiles/12-3 → /metrics/profiles/{profile_id} (من path_params)،
+    و "unmatched" للطلبات اللي ما لها route."""
+    if scope.get("route") is None:
+        return "unmatched"
+    path = scope["path"]
+    for name, value in scope.get("path_params", {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+class TimingMiddleware:
+    """زمن كل طلب HTTP (حتى آخر بايت في الرد) حسب الـ route — القالب مثل
+    /filter/filter/data مو الـ URL، فعدد الـ series ثابت — والـ status.
+    يضيف Server-Timing بمراحل الطلب، و X-Profile-Id لو الطلب فيه X-Profile."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        spans = []
+        span_token = _spans.set(spans)
+        profile_id = None
+        if PROFILE_ENABLED and (b"x-profile", b"1") in scope.get("headers", ()):
+            profile_id = f"{os.getpid()}-{next(_ids)}"
+        profile_token = _profile_id.set(profile_id)
+        status = 500
+        t0 = time.perf_counter()
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", ()))
+                timing = server_timing(spans)
+                if timing:
+                    headers.append((b"server-timing", timing.encode()))
+                if profile_id is not None:
+                    headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            REQUESTS.observe(time.perf_counter() - t0, scope["method"],
+                             route_template(scope), str(status))
+            _spans.reset(span_token)
+            _profile_id.reset(profile_token)
+
+
+# -----------------------
+# gauges
+# -----------------------
+@gauge("cinema_dataset_rows", "Tickets in the current snapshot.")
+def _rows():
+    from cinema_api.data_loader import get_snapshot, loaded
+
+    return get_snapshot().rows if loaded() else 0
+
+
+@gauge("cinema_snapshot_version", "Current snapshot version.")
+def _version():
+    from cinema_api.data_loader import get_snapshot, loaded
+
+    return get_snapshot().version if loaded() else 0
+
+
+@gauge("cinema_dataset_bytes", "Bytes held by each ticket column.", ("column",))
+def _column_bytes():
+    from cinema_api.data_loader import get_snapshot, loaded
+
+    if not loaded():
+        return {}
+    table = get_snapshot().table
+    return {(name,): table.column(name).nbytes for name in table.arrays}
+
+
+@gauge("cinema_index_segments", "Index segments in the current snapshot.")
+def _segments():
+    from cinema_api.data_loader import get_snapshot, loaded
+
+    index = get_snapshot().index if loaded() else None
+    return len(index.segments) if index is not None else 0
+
+
+@gauge("cinema_partition_fragments", "Partition fragments in the current snapshot.")
+def _fragments():
+    from cinema_api.data_loader import get_snapshot, loaded
+
+    store = get_snapshot().partitions if loaded() else None
+    return len(store.fragments) if store is not None else 0
+
+
+def _partition_cache(field):
+    from cinema_api.partitions import columns
+
+    return columns.stats()[field]
+
+
+gauge("cinema_partition_cache_bytes", "Bytes held by the partition column cache.")(
+    lambda: _partition_cache("bytes"))
+gauge("cinema_partition_cache_hits_total", "Partition column cache hits.",
+      kind="counter")(lambda: _partition_cache("hits"))
+gauge("cinema_partition_cache_misses_total", "Partition column cache misses.",
+      kind="counter")(lambda: _partition_cache("misses"))
+gauge("cinema_partition_cache_evictions_total", "Partition column cache evictions.",
+      kind="counter")(lambda: _partition_cache("evictions"))
+
+
+def _cache(field):
+    from cinema_api.cache import results
+
+    return results.stats()[field]
+
+
+gauge("cinema_cache_entries", "Cached endpoint results.")(lambda: _cache("entries"))
+gauge("cinema_cache_bytes", "Bytes held by cached results.")(lambda: _cache("bytes"))
+gauge("cinema_cache_hits_total", "Result cache hits.", kind="counter")(lambda: _cache("hits"))
+gauge("cinema_cache_misses_total", "Result cache misses.", kind="counter")(lambda: _cache("misses"))
+gauge("cinema_cache_evictions_total", "Result cache evictions.",
+      kind="counter")(lambda: _cache("evictions"))
+gauge("cinema_cache_hit_ratio", "Result cache hits / lookups.")(lambda: _cache("hit_rate"))
+
+
+@gauge("cinema_engine_tasks_total", "Endpoint computations by where they ran.",
+       ("endpoint", "mode"), kind="counter")
+def _engine_tasks():
+    from cinema_api.executor import engine
+
+    return {(name, mode): c[mode] for name, c in engine.counters.items()
+            for mode in ("inline", "thread", "process", "coalesced", "timeouts")}
+
+
+@gauge("cinema_engine_running", "Endpoint computations running now.", ("endpoint",))
+def _engine_running():
+    from cinema_api.executor import engine
+
+    return {(name,): c["running"] for name, c in engine.counters.items()}
+
+
+@gauge("cinema_export_jobs", "Export jobs by status.", ("status",))
+def _export_jobs():
+    from cinema_api.exports import jobs
+
+    return {(status,): n for status, n in jobs.stats()["jobs"].items()}
+
+
+@gauge("cinema_shards", "Shard processes serving aggregations.")
+def _shards():
+    from cinema_api.shards import coordinator
+
+    return len(coordinator.pools)
+
+
+@gauge("cinema_process_max_resident_bytes", "Peak resident memory of the API process.")
+def _max_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,234 @@
+# إشغال العروض (shows.csv: capacity و base_price و screen_no) من عدّادات لكل
+# عرض بدل تجميع التذاكر مع كل طلب:
+#   - مصفوفة لكل عدّاد بطول جدول العروض، والعرض برقمه (ترتيبه في shows.csv)
+#   - كل تذكرة تحدّث عدّادات عرضها بس (O(1) للتذكرة): المقاعد والتذاكر
+#     والإيراد وأول وآخر وقت شراء
+#   - العدّادات تتحدث مع كل دفعة تذاكر (نسخة جديدة لكل snapshot مثل الـ cube)،
+#     والـ endpoints تجمّع على العروض (آلاف) مو على التذاكر (ملايين)
+#
+#   python -m cinema_api.occupancy   # الوقت مقابل groupby على التذاكر
+import numpy as np
+import pandas as pd
+from cinema_api.indexes import NAT, time_values
+
+LEVELS = {
+    "show": ["show_id"],
+    "screen": ["theater_id", "screen_no"],
+    "theater": ["theater_id"],
+    "movie": ["movie_id"],
+}
+NEAR_CAPACITY = 0.9
+NS_PER_HOUR = 3600 * 10**9
+_NO_SALE = np.iinfo(np.int64).max
+
+
+class ShowCounters:
+    """عدّادات العروض حتى صف (أو fragment) رقم covered. ثابتة: الإضافة ترجع
+    نسخة جديدة والـ snapshots القديمة تبقى على عدّاداتها."""
+
+    def __init__(self, shows, sold, tickets, revenue, first, last, covered=0, lookup=None):
+        self.shows = shows        # shows.csv (الترتيب = رقم العرض)
+        self.sold = sold          # مجموع quantity
+        self.tickets = tickets
+        self.revenue = revenue
+        self.first = first        # أول وقت شراء (ns)، _NO_SALE لو ما فيه
+        self.last = last
+        self.covered = covered
+        # (قاموس show_id، رقم العرض لكل كود + -1 في الآخر) — ينحسب للأكواد الجديدة بس
+        self._lookup = lookup or (None, np.array([-1]))
+
+    @classmethod
+    def empty(cls, shows):
+        n = len(shows)
+        return cls(shows, np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64),
+                   np.zeros(n), np.full(n, _NO_SALE), np.full(n, NAT), 0)
+
+    def ordinals(self, table, positions):
+        """رقم العرض لكل صف (-1 لعرض مو موجود في shows.csv)."""
+        dictionary, size = table.dictionaries["show_id"], table.sizes["show_id"]
+        known, lookup = self._lookup
+        start = len(lookup) - 1 if known is dictionary else 0
+        if start < size:
+            new = pd.Index(self.shows["show_id"]).get_indexer(dictionary.values[start:size])
+            lookup = np.concatenate([lookup[:start], new, [-1]])  # آخر خانة للكود -1
+            self._lookup = (dictionary, lookup)
+        return lookup[table.column("show_id", positions)]
+
+    def add(self, table, positions, covered):
+        """نسخة فيها تذاكر positions من table زيادة."""
+        show = self.ordinals(table, positions)
+        known = show >= 0
+        show = show[known]
+        n = len(self.shows)
+        quantity = table.column("quantity", positions)[known]
+        total = table.column("total", positions)[known].astype(np.float64)
+        times = time_values(table.column("purchase_time", positions)[known])
+
+        sold = self.sold + np.bincount(show, weights=quantity, minlength=n).astype(np.int64)
+        tickets = self.tickets + np.bincount(show, minlength=n)
+        revenue = self.revenue + np.bincount(show, weights=np.nan_to_num(total), minlength=n)
+        first, last = self.first.copy(), self.last.copy()
+        dated = times != NAT
+        np.minimum.at(first, show[dated], times[dated])
+        np.maximum.at(last, show[dated], times[dated])
+        return ShowCounters(self.shows, sold, tickets, revenue, first, last, covered,
+                            self._lookup)
+
+    @classmethod
+    def build(cls, shows, table):
+        return cls.empty(shows).add(table, slice(0, table.rows), table.rows)
+
+    def extend(self, table):
+        """التذاكر من covered لآخر table (الـ store الضيّق append-only)."""
+        if table.rows == self.covered:
+            return self
+        return self.add(table, slice(self.covered, table.rows), table.rows)
+
+    def extend_partitions(self, store):
+        """fragments الـ PartitionStore من covered لآخرها."""
+        counters = self
+        for i, fragment in enumerate(store.fragments[self.covered:], start=self.covered + 1):
+            table = store.load(fragment)
+            counters = counters.add(table, slice(0, table.rows), i)
+        if counters is self:
+            return ShowCounters(self.shows, self.sold, self.tickets, self.revenue,
+                                self.first, self.last, len(store.fragments), self._lookup)
+        return counters
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.sold, self.tickets, self.revenue,
+                                      self.first, self.last))
+
+    def frame(self):
+        """صف لكل عرض: أعمدة shows.csv + العدّادات."""
+        sold = self.first != _NO_SALE
+        return self.shows.assign(
+            sold=self.sold, tickets=self.tickets, revenue=self.revenue,
+            first_sale=np.where(sold, self.first, NAT).view("datetime64[ns]"),
+            last_sale=np.where(sold, self.last, NAT).view("datetime64[ns]"))
+
+
+# -----------------------
+# الاستعلامات
+# -----------------------
+def select(frame, theaters=None, movies=None, start_date=None, end_date=None):
+    """العروض حسب الصالة والفيلم (IDs بحروف صغيرة) ووقت العرض."""
+    keep = np.ones(len(frame), dtype=bool)
+    if theaters:
+        keep &= frame["theater_id"].str.lower().isin(theaters).to_numpy()
+    if movies:
+        keep &= frame["movie_id"].str.lower().isin(movies).to_numpy()
+    if start_date:
+        keep &= (frame["start_time"] >= pd.Timestamp(start_date)).to_numpy()
+    if end_date:
+        keep &= (frame["start_time"] <= pd.Timestamp(end_date)).to_numpy()
+    return frame[keep]
+
+
+def measures(frame):
+    """الإشغال والـ yield والسرعة لصفوف فيها capacity و sold و revenue و
+    base_revenue و lead_hours (لعرض أو مجموعة عروض)."""
+    sold = frame["sold"].to_numpy(dtype=np.float64)
+    capacity = frame["capacity"].to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        occupancy = np.where(capacity > 0, sold / capacity, np.nan)
+        avg_price = np.where(sold > 0, frame["revenue"].to_numpy() / sold, np.nan)
+        # الإيراد الفعلي مقابل بيع نفس المقاعد بسعر العرض الأساسي
+        yield_ = np.where(frame["base_revenue"] > 0,
+                          frame["revenue"].to_numpy() / frame["base_revenue"].to_numpy(), np.nan)
+    return frame.assign(occupancy=occupancy, avg_price=avg_price, yield_ratio=yield_)
+
+
+def per_show(counters):
+    frame = counters.frame()
+    frame["base_revenue"] = frame["base_price"] * frame["sold"]
+    # سرعة البيع: من أول تذكرة لوقت العرض
+    frame["lead_hours"] = (frame["start_time"] - frame["first_sale"]).dt.total_seconds() / 3600
+    frame["remaining"] = frame["capacity"] - frame["sold"]
+    return frame
+
+
+def records(frame, columns):
+    out = frame[columns].copy()
+    for c in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[c]):
+            out[c] = out[c].dt.strftime("%Y-%m-%dT%H:%M:%S").astype(object)
+        elif pd.api.types.is_float_dtype(out[c]):
+            out[c] = out[c].round(4)
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict("records")
+
+
+def occupancy(counters, by="show", sort="occupancy", limit=100, **filters):
+    """الإشغال والـ yield وسرعة البيع لكل عرض أو شاشة أو صالة أو فيلم."""
+    frame = select(per_show(counters), **filters)
+    keys = LEVELS[by]
+    if by == "show":
+        rows = measures(frame)
+        columns = ["show_id", "theater_id", "screen_no", "movie_id", "start_time",
+                   "capacity", "sold", "remaining", "tickets", "revenue", "base_price",
+                   "first_sale", "last_sale", "lead_hours"]
+    else:
+        rows = measures(frame.groupby(keys, sort=False).agg(
+            shows=("show_id", "size"), capacity=("capacity", "sum"), sold=("sold", "sum"),
+            remaining=("remaining", "sum"), tickets=("tickets", "sum"),
+            revenue=("revenue", "sum"), base_revenue=("base_revenue", "sum"),
+            lead_hours=("lead_hours", "mean")).reset_index())
+        columns = keys + ["shows", "capacity", "sold", "remaining", "tickets", "revenue",
+                          "lead_hours"]
+    rows = rows.sort_values([sort] + keys, ascending=[False] + [True] * len(keys),
+                            na_position="last", kind="stable").head(limit)
+    return records(rows, columns + ["occupancy", "avg_price", "yield_ratio"])
+
+
+def near_capacity(counters, after, hours=None, threshold=NEAR_CAPACITY, limit=50, **filters):
+    """العروض الجاية (من after، وخلال hours لو محددة) اللي إشغالها >= threshold."""
+    frame = select(per_show(counters), **filters)
+    upcoming = frame["start_time"] >= after
+    if hours is not None:
+        upcoming &= frame["start_time"] < after + pd.Timedelta(hours=hours)
+    rows = measures(frame[upcoming])
+    rows = rows[rows["occupancy"] >= threshold]
+    rows = rows.sort_values(["start_time", "show_id"], kind="stable").head(limit)
+    return records(rows, ["show_id", "theater_id", "screen_no", "movie_id", "start_time",
+                          "capacity", "sold", "remaining", "occupancy", "lead_hours"])
+
+
+if __name__ == "__main__":
+    # python -m cinema_api.occupancy
+    # الإشغال لكل فيلم من العدّادات مقابل join + groupby على التذاكر كل طلب
+    import time
+    from cinema_api import data_loader
+
+    snapshot = data_loader.get_snapshot()
+    shows = data_loader.shows
+
+    def timed(func, repeat=5):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - t0)
+        return best * 1000, result
+
+    def regroup():
+        frame = snapshot.df if snapshot.partitions is None else pd.concat(snapshot.frames())
+        sold = frame.groupby("show_id", observed=True)["quantity"].sum()
+        per = shows.set_index("show_id").join(sold.rename("sold")).fillna({"sold": 0})
+        grouped = per.groupby("movie_id")[["sold", "capacity"]].sum()
+        return (grouped["sold"] / grouped["capacity"]).sort_values(ascending=False)
+
+    ms, counters = timed(lambda: ShowCounters.build(shows, snapshot.table), repeat=1) \
+        if snapshot.partitions is None else \
+        timed(lambda: ShowCounters.empty(shows).extend_partitions(snapshot.partitions), 1)
+    print(f"{snapshot.rows:,} tickets, {len(shows):,} shows ({counters.nbytes:,} bytes)")
+    print(f"  build counters     : {ms:8.1f} ms")
+    ms, fast = timed(lambda: occupancy(counters, "movie", limit=1000))
+    print(f"  occupancy by movie : {ms:8.1f} ms")
+    ms, slow = timed(regroup, repeat=1)
+    print(f"  join + groupby     : {ms:8.1f} ms")
+    check = {r["movie_id"]: r["occupancy"] for r in fast}
+    print("  same:", all(abs(check[m] - round(v, 4)) < 1e-9 for m, v in slow.items()))
+    ms, _ = timed(lambda: counters.add(snapshot.table, slice(0, 1), counters.covered + 1))
+    print(f"  add 1 ticket       : {ms:8.3f} ms")
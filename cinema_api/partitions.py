@@ -0,0 +1,366 @@
+# Store مقسّم على القرص (CINEMA_STORE=partitioned) لما تاريخ التذاكر ما يعود
+# يدخل كامل في الذاكرة:
+#   - partition لكل (شهر الشراء، الصالة): مجلد YYYY-MM/<theater_id>/ فيه
+#     fragments ثابتة، كل fragment ملف .npy لكل عمود ومرتب حسب
+#     (purchase_time, ticket_id)
+#   - meta.json فيه min/max لوقت الشراء والـ total (وعدّادات القيم لـ
+#     distribution.py) لكل fragment، فالاستعلام
+#     يقرأ بس الـ fragments اللي تتقاطع مع start_date/end_date و theaters
+#     و min_total، ويمشي عليها fragment fragment (ذاكرة محدودة)
+#   - الأعمدة تنقرا لما تنطلب بس، وآخر المستخدم منها يبقى في LRU بحد
+#     CINEMA_PARTITION_CACHE_BYTES
+#   - التذاكر الجديدة تضيف fragments صغيرة و meta.json جديد (version + 1)
+#
+#   python -m cinema_api.partitions                     # بناء الـ partitions من الـ CSV
+#   python -m cinema_api.bench 1m --store partitioned   # زمن وذاكرة الـ endpoints
+from collections import OrderedDict
+from collections.abc import Mapping
+import os
+from pathlib import Path
+import threading
+import time
+import numpy as np
+from cinema_api import columnar
+from cinema_api.distribution import fragment_counts
+from cinema_api.indexes import NAT, compile_filters, time_values
+from cinema_api.store import OBJECT, TicketStore, TicketTable
+
+CACHE_BYTES = int(os.environ.get("CINEMA_PARTITION_CACHE_BYTES", str(256 * 1024 * 1024)))
+NO_VALUE = "none"  # مجلد التذاكر بدون purchase_time أو بدون صالة
+
+
+class ColumnCache:
+    """LRU لأعمدة الـ fragments المقروءة من القرص، بحد أعلى للبايتات. الملفات
+    ما تتغير بعد كتابتها، فالمسار يكفي كمفتاح لكل النسخ."""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # path → ndarray
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            array = self.entries.get(path)
+            if array is not None:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return array
+            self.misses += 1
+        array = np.load(path)
+        if array.nbytes > self.max_bytes:
+            return array
+        with self._lock:
+            if path not in self.entries:
+                self.entries[path] = array
+                self.bytes += array.nbytes
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+        return array
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+columns = ColumnCache()
+
+
+class FragmentColumns(Mapping):
+    """أعمدة fragment كـ {column: ndarray} تنقرا (عن طريق الكاش) أول ما تنطلب."""
+
+    def __init__(self, path, schema):
+        self.path, self.schema = path, schema
+
+    def __getitem__(self, name):
+        if name not in self.schema:
+            raise KeyError(name)
+        return columns.get(self.path / f"{name}.npy")
+
+    def __iter__(self):
+        return iter(self.schema)
+
+    def __len__(self):
+        return len(self.schema)
+
+
+# -----------------------
+# الكتابة
+# -----------------------
+def _bounds(values, valid):
+    if not valid.any():
+        return None, None
+    values = values[valid]
+    return values.min().item(), values.max().item()
+
+
+def write_fragments(build, encoder, df, first=0):
+    """تكتب صفوف df كـ fragment لكل (شهر، صالة) وترجع وصفها للـ meta.
+    first = رقم أول fragment (الأسماء ما تتكرر في نفس الـ build)."""
+    encoded = encoder.encode(df)
+    times = time_values(encoded["purchase_time"])
+    months = encoded["purchase_time"].astype("datetime64[M]").view("int64")
+    theaters = encoded["theater_id"]
+    order = np.lexsort((encoded["ticket_id"], times, theaters, months))
+    cuts = np.flatnonzero((np.diff(months[order]) != 0) |
+                          (np.diff(theaters[order]) != 0)) + 1
+    names = encoder.dictionaries["theater_id"].values
+
+    fragments = []
+    for n, rows in enumerate(np.split(order, cuts) if len(order) else [], start=first):
+        month, theater = months[rows[0]], int(theaters[rows[0]])
+        label = NO_VALUE if month == NAT else str(np.datetime64(int(month), "M"))
+        folder = NO_VALUE if theater < 0 else str(names[theater]).replace("/", "_")
+        relative = f"{label}/{folder}/f-{n:06d}"
+        path = build / relative
+        path.mkdir(parents=True)
+        for column, values in encoded.items():
+            values = values[rows]
+            if encoder.schema[column] == OBJECT:
+                values = values.astype(str)
+            np.save(path / f"{column}.npy", values)
+
+        t, total = times[rows], encoded["total"][rows].astype("float64")
+        min_time, max_time = _bounds(t, t != NAT)
+        min_total, max_total = _bounds(total, ~np.isnan(total))
+        fragments.append({
+            "path": relative, "month": label, "theater": theater, "rows": len(rows),
+            "min_time": min_time, "max_time": max_time,
+            "min_total": min_total, "max_total": max_total,
+            "values": fragment_counts(encoded, rows),
+        })
+    return fragments
+
+
+def manifest(encoder, fragments, **extra):
+    return {
+        "format": columnar.FORMAT_VERSION,
+        "layout": "partitioned",
+        "rows": sum(f["rows"] for f in fragments),
+        "schema": encoder.schema,
+        "dtypes": {c: a.dtype.str for c, a in encoder.arrays.items()},
+        "dictionaries": {c: list(d.values) for c, d in encoder.dictionaries.items()},
+        "fragments": fragments,
+        **extra,
+    }
+
+
+def build(directory, chunks, sources, categorical=(), **extra):
+    """يبني partitions من دفعات إطارات (أعمدة facts) في build جديد
+    ويبدّل CURRENT. الذاكرة بحجم الدفعة مهما كبر الملف."""
+    directory = Path(directory)
+    source_mtime = max(Path(s).stat().st_mtime for s in sources)
+    name = f"build-{time.time_ns()}-{os.getpid()}"
+    path = directory / name
+    path.mkdir(parents=True)
+
+    encoder, fragments = None, []
+    for df in chunks:
+        if encoder is None:
+            encoder = TicketStore.from_frame(df.iloc[:0], categorical)
+        fragments.extend(write_fragments(path, encoder, df, len(fragments)))
+    if encoder is None:
+        raise ValueError("no ticket chunks to partition")
+
+    columnar.write_meta(path, manifest(encoder, fragments, version=1,
+                                       source_mtime=source_mtime, **extra))
+    columnar.switch(directory, name)
+    return path
+
+
+# -----------------------
+# القراءة
+# -----------------------
+class PartitionStore:
+    """نسخة ثابتة من meta.json: الـ fragments وقت النسخة والقواميس وإحصائياتها.
+    الإضافة تكتب fragments جديدة وترجع PartitionStore جديد."""
+
+    def __init__(self, build, meta, encoder=None):
+        self.build = Path(build)
+        self.meta = meta
+        self.version = meta["version"]
+        self.rows = meta["rows"]
+        self.schema = meta["schema"]
+        self.fragments = meta["fragments"]
+        if encoder is None:
+            # store فاضي بنفس الـ schema والقواميس: يرمّز دفعات الإضافة
+            empty = {c: np.empty(0, dtype=np.dtype(d)) for c, d in meta["dtypes"].items()}
+            encoder = TicketStore.from_arrays(self.schema, empty, 0, meta["dictionaries"])
+        self.encoder = encoder
+        self.sizes = {c: len(v) for c, v in meta["dictionaries"].items()}
+
+    @property
+    def dictionaries(self):
+        return self.encoder.dictionaries
+
+    def empty_table(self):
+        """جدول بدون صفوف بنفس الأعمدة والقواميس (للـ decode وأعمدة النتائج الفاضية)."""
+        return TicketTable(self.schema, dict(self.encoder.arrays), 0,
+                           self.dictionaries, self.sizes)
+
+    def load(self, fragment):
+        return TicketTable(self.schema, FragmentColumns(self.build / fragment["path"], self.schema),
+                           fragment["rows"], self.dictionaries, self.sizes)
+
+    def prune(self, compiled):
+        """الـ fragments اللي ممكن فيها صفوف مطابقة (حسب min/max والصالة)."""
+        start, end, minimum = compiled["start"], compiled["end"], compiled["min_total"]
+        theaters = compiled["keys"].get("theater_id")
+        lower_ids = self.dictionaries["theater_id"].lower_ids
+        for fragment in self.fragments:
+            if start is not None and (fragment["max_time"] is None or fragment["max_time"] < start):
+                continue
+            if end is not None and (fragment["min_time"] is None or fragment["min_time"] > end):
+                continue
+            if theaters is not None and (fragment["theater"] < 0 or
+                                         lower_ids[fragment["theater"]] not in theaters):
+                continue
+            if minimum is not None and (fragment["max_total"] is None or
+                                        fragment["max_total"] < minimum):
+                continue
+            yield fragment
+
+    @staticmethod
+    def match(table, compiled):
+        """مواقع الصفوف المطابقة داخل fragment، أو None لو كل صفوفه مطابقة.
+        الصالة ما تنفحص: prune يضمنها لكل الـ fragment."""
+        lo, hi = 0, table.rows
+        start, end = compiled["start"], compiled["end"]
+        if start is not None or end is not None:
+            times = time_values(table.column("purchase_time"))
+            lo = np.searchsorted(times, NAT + 1 if start is None else start, "left")
+            if end is not None:
+                hi = max(lo, np.searchsorted(times, end, "right"))
+        keys = {c: ids for c, ids in compiled["keys"].items() if c != "theater_id"}
+        if not keys and compiled["min_total"] is None:
+            return None if (lo, hi) == (0, table.rows) else np.arange(lo, hi)
+
+        rows = slice(lo, hi)
+        mask = np.ones(hi - lo, dtype=bool)
+        for column, ids in keys.items():
+            mask &= np.isin(table.lower_keys(column, rows), ids)
+        if compiled["min_total"] is not None:
+            mask &= table.column("total", rows) >= compiled["min_total"]
+        return lo + np.flatnonzero(mask)
+
+    def compile(self, **filters):
+        return compile_filters(self.dictionaries, **filters)
+
+    def scan(self, **filters):
+        """(جدول fragment، مواقع مطابقة أو None = الكل) لكل fragment فيه صفوف مطابقة."""
+        compiled = self.compile(**filters)
+        for fragment in self.prune(compiled):
+            table = self.load(fragment)
+            positions = self.match(table, compiled)
+            if positions is None or len(positions):
+                yield table, positions
+
+    def ordered(self, after=None, chunk=10_000, dimensions=(), **filters):
+        """إطارات الصفوف المطابقة مرتبة حسب (purchase_time, ticket_id)، دفعة
+        دفعة. الشهور تنقرا بالترتيب، فالصفحة الأولى تقرأ أول شهر مطابق بس.
+        dimensions: أعمدة الأبعاد تنضاف لكل إطار (TicketTable.take)."""
+        compiled = self.compile(**filters)
+        if after is not None:
+            start = compiled["start"]
+            compiled["start"] = after[0] if start is None else max(start, after[0])
+        if compiled["start"] is None and compiled["end"] is None:
+            compiled["start"] = NAT + 1  # الصفوف بدون purchase_time ما لها ترتيب
+
+        months = {}
+        for fragment in self.prune(compiled):
+            months.setdefault(fragment["month"], []).append(fragment)
+        for month in sorted(months):
+            tables, parts = [], []
+            for fragment in months[month]:
+                table = self.load(fragment)
+                positions = self.match(table, compiled)
+                tables.append(table)
+                parts.append(np.arange(table.rows) if positions is None else positions)
+            sources = np.repeat(np.arange(len(parts)), [len(p) for p in parts])
+            positions = np.concatenate(parts)
+            t = np.concatenate([time_values(tb.column("purchase_time", p))
+                                for tb, p in zip(tables, parts)])
+            ids = np.concatenate([tb.column("ticket_id", p) for tb, p in zip(tables, parts)])
+            if after is not None:
+                keep = (t != after[0]) | (ids > after[1])
+                sources, positions, t, ids = sources[keep], positions[keep], t[keep], ids[keep]
+            order = np.lexsort((ids, t))
+            for i in range(0, len(order), chunk):
+                rows = order[i:i + chunk]
+                yield self._take(tables, sources[rows], positions[rows], dimensions)
+
+    def _take(self, tables, sources, positions, dimensions=()):
+        """إطار الصفوف (fragment، موقع) بنفس ترتيبها — الأعمدة تتجمع أول
+        وبعدين إطار واحد (الـ category dtype ينبني مرة وحدة)."""
+        if (sources == sources[0]).all():
+            return tables[sources[0]].take(positions, dimensions)
+        groups = [np.flatnonzero(sources == source) for source in np.unique(sources)]
+        order = np.argsort(np.concatenate(groups))
+        arrays = {c: np.concatenate([tables[sources[rows[0]]].column(c, positions[rows])
+                                     for rows in groups])[order]
+                  for c in self.schema}
+        return TicketTable(self.schema, arrays, len(positions), self.dictionaries,
+                           self.sizes).to_frame(dimensions=dimensions)
+
+    def extent(self):
+        """(أول وقت شراء، آخر وقت) كـ int64 ns من الـ meta، أو None."""
+        dated = [f for f in self.fragments if f["min_time"] is not None]
+        if not dated:
+            return None
+        return min(f["min_time"] for f in dated), max(f["max_time"] for f in dated)
+
+    def max_total(self):
+        totals = [f["max_total"] for f in self.fragments if f["max_total"] is not None]
+        return max(totals) if totals else None
+
+    def append(self, df, tickets_offset=None):
+        """تكتب df كـ fragments جديدة و meta.json بنسخة أحدث. كاتب واحد بس:
+        الـ workers تكتب تحت columnar.build_lock بعد refresh (ingest.py).
+        tickets_offset = نهاية أسطر tickets.csv اللي صارت في الـ fragments."""
+        fragments = self.fragments + write_fragments(self.build, self.encoder, df,
+                                                     len(self.fragments))
+        meta = {**self.meta, **manifest(self.encoder, fragments),
+                "version": self.version + 1}
+        if tickets_offset is not None:
+            meta["tickets_offset"] = tickets_offset
+        columnar.write_meta(self.build, meta)
+        return PartitionStore(self.build, meta, self.encoder)
+
+    def refresh(self):
+        """نفس الـ build بآخر meta.json (إضافات عملية ثانية: عمليات الـ pool
+        بعد إضافة في الـ API، أو worker API ثاني)."""
+        meta = columnar.read_meta(self.build)
+        return self if meta["version"] <= self.version else PartitionStore(self.build, meta)
+
+
+def is_stale(directory, sources):
+    return columnar.is_stale(directory, sources) or \
+        columnar.read_meta(columnar.current_build(directory)).get("layout") != "partitioned"
+
+
+def read(directory, name=None):
+    build = columnar.current_build(directory) if name is None else Path(directory) / name
+    return PartitionStore(build, columnar.read_meta(build))
+
+
+if __name__ == "__main__":
+    # data_loader يبني الـ partitions وقت الاستيراد لو ناقصة أو أقدم من الـ CSV
+    os.environ["CINEMA_STORE"] = "partitioned"
+    t0 = time.perf_counter()
+    from cinema_api import data_loader
+
+    store = data_loader.get_snapshot().partitions
+    print(f"{store.rows:,} tickets in {len(store.fragments):,} fragments "
+          f"({time.perf_counter() - t0:.1f}s) -> {store.build}")
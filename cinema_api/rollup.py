@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+from cinema_api import shards
+from cinema_api.indexes import NAT, time_values
+from cinema_api.metrics import span
+
+# الـ cube مجمّع على هذي الأبعاد، وكل خلية فيها الإيراد والكمية وعدد التذاكر
+DIMENSIONS = ["day", "movie_id", "theater_id", "seat_type", "customer_id"]
+MEASURES = ["revenue", "quantity", "tickets"]
+
+# فلاتر الـ IDs وأعمدتها في الـ cube
+KEY_FILTERS = [("customers", "customer_id"), ("movies", "movie_id"),
+               ("theaters", "theater_id"), ("seat_type", "seat_type")]
+
+NS_PER_DAY = 86_400 * 10**9
+NULL_DAY = np.iinfo(np.int32).min  # تذاكر بدون purchase_time
+
+
+def day_numbers(col):
+    """رقم اليوم (أيام من 1970-01-01) لكل قيمة وقت."""
+    t = time_values(col)
+    return np.where(t == NAT, NULL_DAY, t // NS_PER_DAY).astype(np.int32)
+
+
+def day_labels(days):
+    return (np.datetime64(0, "D") + np.asarray(days, dtype="int64")).astype(str)
+
+
+def measures(table, keys, rows=slice(None)):
+    """إطار بالقياسات لكل تذكرة (rows: slice أو مواقع)، جاهز للتجميع حسب keys."""
+    total = table.column("total")[rows]
+    return pd.DataFrame({
+        **keys,
+        "revenue": total,
+        "quantity": table.column("quantity")[rows],
+        "tickets": np.ones(len(total), dtype=np.int64),
+    })
+
+
+def group(frame, by):
+    return frame.groupby(by)[MEASURES].sum()
+
+
+def decode(table, by, out):
+    """أكواد القاموس → القيم الأصلية (وتشيل المجموعات الفاضية)."""
+    if by == "day":
+        return out
+    out = out[out.index >= 0]
+    out.index = table.decode(by, out.index)
+    return out
+
+
+def split_days(start_date=None, end_date=None):
+    """تقسيم [start, end] إلى أيام كاملة يجاوبها الـ cube، وأطراف جزئية
+    (بداية/نهاية اليوم) تنحسب من الصفوف عن طريق الفهرس."""
+    start = pd.Timestamp(start_date) if start_date else None
+    end = pd.Timestamp(end_date) if end_date else None
+    first_day = None if start is None else -(-start.value // NS_PER_DAY)
+    last_day = None if end is None else (end.value + 1) // NS_PER_DAY - 1
+
+    if first_day is not None and last_day is not None and first_day > last_day:
+        return 1, 0, [(start, end)]
+
+    edges = []
+    if start is not None and start.value < first_day * NS_PER_DAY:
+        edges.append((start, pd.Timestamp(first_day * NS_PER_DAY - 1)))
+    if end is not None and end.value >= (last_day + 1) * NS_PER_DAY:
+        edges.append((pd.Timestamp((last_day + 1) * NS_PER_DAY), end))
+    return first_day, last_day, edges
+
+
+def cell_mask(table, cells, first_day=None, last_day=None, filters=None):
+    """الخلايا (صفوف إطار فيه عمود day وأكواد الأبعاد) اللي داخل الأيام
+    والفلاتر. فلاتر الأعمدة اللي مو موجودة في cells تنتجاهل."""
+    mask = np.ones(len(cells), dtype=bool)
+    days = cells["day"].to_numpy()
+    if first_day is not None or last_day is not None:
+        mask &= days != NULL_DAY
+    if first_day is not None:
+        mask &= days >= first_day
+    if last_day is not None:
+        mask &= days <= last_day
+    for key, col in KEY_FILTERS:
+        if filters and filters.get(key) is not None and col in cells:
+            dictionary = table.dictionaries[col]
+            mask &= np.isin(dictionary.lower_keys(cells[col].to_numpy()),
+                            dictionary.key_ids(filters[key]))
+    return mask
+
+
+def rollup(frame):
+    return frame.groupby(DIMENSIONS, sort=False)[MEASURES].sum().reset_index()
+
+
+class CubePart:
+    """خلايا الـ cube لمدى من صفوف التذاكر [start, end)."""
+
+    def __init__(self, start, end, cells):
+        self.start, self.end = start, end
+        self.cells = cells
+
+    @property
+    def rows(self):
+        return self.end - self.start
+
+    @classmethod
+    def build(cls, table, start, end):
+        rows = slice(start, end)
+        keys = {"day": day_numbers(table.column("purchase_time")[rows])}
+        keys.update({c: table.column(c)[rows] for c in DIMENSIONS[1:]})
+        return cls(start, end, rollup(measures(table, keys, rows)))
+
+    def merge(self, other):
+        return CubePart(self.start, other.end,
+                        rollup(pd.concat([self.cells, other.cells])))
+
+
+class RollupCube:
+    """تجميع مسبق (materialized) على (day, movie, theater, seat, customer)
+    بأكواد القاموس. التذاكر الجديدة تضيف part صغير، والأجزاء المتقاربة
+    بالحجم تندمج مثل فهارس TicketIndex."""
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    @property
+    def rows(self):
+        return self.parts[-1].end if self.parts else 0
+
+    @property
+    def cells(self):
+        if len(self.parts) == 1:
+            return self.parts[0].cells
+        return pd.concat([p.cells for p in self.parts], ignore_index=True)
+
+    @classmethod
+    def build(cls, table):
+        return cls((CubePart.build(table, 0, table.rows),))
+
+    def extend(self, table):
+        if table.rows == self.rows:
+            return self
+        parts = list(self.parts)
+        parts.append(CubePart.build(table, self.rows, table.rows))
+        while len(parts) > 1 and parts[-2].rows <= parts[-1].rows:
+            last, prev = parts.pop(), parts.pop()
+            parts.append(prev.merge(last))
+        return RollupCube(tuple(parts))
+
+    def query(self, table, by, first_day=None, last_day=None, filters=None):
+        cells = self.cells
+        return group(cells[cell_mask(table, cells, first_day, last_day, filters)], by)
+
+
+def raw(table, by, positions):
+    """نفس التجميع لكن من صفوف التذاكر مباشرة (positions من TicketIndex)."""
+    rows = slice(None) if positions is None else positions
+    if by == "day":
+        keys = day_numbers(table.column("purchase_time")[rows])
+    else:
+        keys = table.column(by)[rows]
+    return group(measures(table, {by: keys}, rows), by)
+
+
+def scanned(snapshot, by, filters):
+    """التجميع من الصفوف المطابقة دفعة دفعة (partition لكل دفعة)."""
+    parts = [raw(table, by, positions) for table, positions in snapshot.scan(**filters)]
+    if not parts:
+        return pd.DataFrame({"revenue": np.empty(0), "quantity": np.empty(0, dtype=np.int64),
+                             "tickets": np.empty(0, dtype=np.int64)},
+                            index=pd.Index(np.empty(0, dtype=np.int64), name=by))
+    return parts[0] if len(parts) == 1 else pd.concat(parts).groupby(level=0).sum()
+
+
+def aggregate_codes(snapshot, by, filters):
+    if snapshot.cube is None or filters.get("min_total") is not None:
+        # min_total شرط على التذكرة نفسها، فالـ cube ما يقدر يجاوبه
+        return scanned(snapshot, by, filters)
+
+    first_day, last_day, edges = split_days(
+        filters.get("start_date"), filters.get("end_date"))
+    parts = [snapshot.cube.query(snapshot.table, by, first_day, last_day, filters)]
+    for start, end in edges:
+        positions = snapshot.index.select(
+            **{**filters, "start_date": start, "end_date": end})
+        parts.append(raw(snapshot.table, by, positions))
+
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts).groupby(level=0).sum()
+
+
+def aggregate(snapshot, by, filters):
+    """الإيراد/الكمية/عدد التذاكر مجمّعة حسب by ("day" أو "movie_id" أو
+    "customer_id")، بنفس فلاتر /filter/data."""
+    with span("aggregate"):
+        partials = shards.scatter(snapshot, aggregate_codes, by, filters)
+        out = (aggregate_codes(snapshot, by, filters) if partials is None
+               else shards.merge_sums(partials))
+        return decode(snapshot.table, by, out)
+
+
+def top_codes(snapshot, by, filters, limit):
+    out = aggregate_codes(snapshot, by, filters)
+    return out[out.index >= 0].nlargest(limit, "revenue")
+
+
+def top_revenue(snapshot, by, filters, limit):
+    """أعلى limit قيمة من by بالإيراد. لو الـ shards مقسّمة حسب by فكل قيمة
+    مجموعها كامل في shard واحد، فيكفي أعلى limit من كل shard."""
+    if shards.split_by(by):
+        with span("aggregate"):
+            partials = shards.scatter(snapshot, top_codes, by, filters, limit)
+        if partials is not None:
+            revenue = decode(snapshot.table, by, pd.concat(partials))["revenue"]
+            return revenue.sort_values(ascending=False).head(limit)
+    return aggregate(snapshot, by, filters)["revenue"].sort_values(ascending=False).head(limit)
+
+
+def verify(snapshot, cases=None):
+    """مقارنة نتائج الـ cube مع الحساب المباشر من الصفوف. ترجع الفروقات."""
+    if cases is None:
+        times = pd.Series(snapshot.table.column("purchase_time")).dropna().sort_values()
+        mid = times.iloc[len(times) // 2] if len(times) else None
+        cases = [
+            {},
+            {"start_date": str(mid), "end_date": str(times.iloc[-1].date())},
+            {"start_date": str(times.iloc[0].date()), "end_date": str(mid)},
+            {"seat_type": ["vip"], "theaters": ["t01", "t02"]},
+        ] if mid is not None else [{}]
+
+    problems = []
+    for filters in cases:
+        for by in ("day", "movie_id", "customer_id"):
+            expected = scanned(snapshot, by, filters)
+            got = aggregate_codes(snapshot, by, filters)
+            if set(got.index) != set(expected.index) or not np.allclose(
+                    got.loc[expected.index].to_numpy(float),
+                    expected.to_numpy(float)):
+                problems.append((by, filters))
+    return problems
+
+
+if __name__ == "__main__":
+    # python -m cinema_api.rollup  → فحص تطابق الـ cube مع الصفوف
+    from cinema_api.data_loader import get_snapshot
+
+    snapshot = get_snapshot()
+    print(f"rows: {snapshot.rows:,}  cube cells: {len(snapshot.cube.cells):,}")
+    problems = verify(snapshot)
+    print("consistent" if not problems else f"mismatches: {problems}")
@@ -0,0 +1,92 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.requests import HTTPConnection
+from pydantic import BaseModel
+import users_db
+
+
+router = APIRouter(prefix="/auth", tags=["Auth"])
+
+# CINEMA_AUTH_REQUIRED=1: endpoints البيانات تحتاج Authorization: Bearer <token>
+AUTH_REQUIRED = os.environ.get("CINEMA_AUTH_REQUIRED", "0") == "1"
+# مع AUTH_REQUIRED إنشاء الحسابات للمسؤولين بس (وإلا أي أحد يسجل ويتخطى
+# الحماية)، إلا لو CINEMA_OPEN_SIGNUP=1
+OPEN_SIGNUP = os.environ.get("CINEMA_OPEN_SIGNUP", "0") == "1"
+ADMINS = set(os.environ.get("CINEMA_ADMINS", "admin").split(","))
+
+
+class Credentials(BaseModel):
+    username: str
+    password: str
+
+
+def bearer(connection):
+    header = connection.headers.get("authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token.strip()
+    # WebSocket و EventSource ما يقدرون يرسلون headers: ?token=
+    return connection.query_params.get("token")
+
+
+def current_user(connection: HTTPConnection):
+    """اسم المستخدم من الـ token (كاش في الذاكرة، بدون القاعدة غالباً) أو 401."""
+    username = users_db.validate(bearer(connection))
+    if username is None:
+        raise HTTPException(status_code=401, detail="invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return username
+
+
+def require_user(connection: HTTPConnection):
+    """current_user لو CINEMA_AUTH_REQUIRED، وإلا الطلب يمر بدون token."""
+    if AUTH_REQUIRED:
+        return current_user(connection)
+    return None
+
+
+def signup_allowed(connection: HTTPConnection):
+    """إنشاء حساب: مفتوح بدون AUTH_REQUIRED (أو مع OPEN_SIGNUP)، وإلا token
+    مستخدم من CINEMA_ADMINS (401 بدون token، 403 لغير المسؤول)."""
+    if not AUTH_REQUIRED or OPEN_SIGNUP:
+        return None
+    username = current_user(connection)
+    if username not in ADMINS:
+        raise HTTPException(status_code=403, detail="only admins can create accounts")
+    return username
+
+
+@router.post("/users", status_code=201, dependencies=[Depends(signup_allowed)])
+def create_user(credentials: Credentials):
+    if len(credentials.username) < 3 or len(credentials.password) < 3:
+        raise HTTPException(status_code=422,
+                            detail="username and password need at least 3 characters")
+    if not users_db.add_user(credentials.username, credentials.password):
+        raise HTTPException(status_code=409, detail="username already exists")
+    return {"username": credentials.username}
+
+
+@router.post("/login")
+def login(credentials: Credentials):
+    """token جلسة (Bearer) صالح لـ CINEMA_SESSION_TTL ثانية."""
+    session = users_db.login(credentials.username, credentials.password)
+    if session is None:
+        raise HTTPException(status_code=401, detail="wrong username or password")
+    token, expires = session
+    return {"token": token, "token_type": "bearer", "expires": expires,
+            "username": credentials.username}
+
+
+@router.post("/logout", status_code=204)
+def logout(connection: HTTPConnection, username: str = Depends(current_user)):
+    users_db.logout(bearer(connection))
+
+
+@router.get("/me")
+def me(username: str = Depends(current_user)):
+    return {"username": username}
+
+
+@router.get("/stats")
+def auth_stats():
+    return users_db.tokens.stats()
@@ -1,14 +1,29 @@
-from fastapi import APIRouter
-from cinema_api.data_loader import get_data
+from fastapi import APIRouter, Depends, Request
+from cinema_api.cache import cached_response
+from cinema_api.rollup import top_revenue
+from cinema_api.routers.filters import filter_params
+from cinema_api.sketches import approx_headers
 
 
 
 router = APIRouter(prefix="/customers", tags=["Customers"])
 
 
+def top_spenders(snapshot, filters, limit, approx=False):
+    if approx and snapshot.sketches is not None:  # بدون sketches في CINEMA_STORE=partitioned
+        # Space-Saving: الإيراد حد أعلى، والحقيقي ما ينقص عنه بأكثر من X-Error-Bound
+        top = snapshot.sketches.top(snapshot, "customer_id", filters, limit)
+        if top is not None:
+            top.index = snapshot.table.decode("customer_id", top.index)
+            return top["revenue"].round(2).to_dict(), approx_headers(top)
+    return top_revenue(snapshot, "customer_id", filters, limit).to_dict(), \
+        approx_headers() if approx else {}
+
+
 @router.get("/top")
-def top_customers(limit: int = 5):
-    df = get_data()
-    top = df.groupby("customer_id")["total"].sum(
-    ).sort_values(ascending=False).head(limit)
-    return top.to_dict()
+async def top_customers(request: Request, limit: int = 5, approx: bool = False,
+                        filters: dict = Depends(filter_params)):
+    """approx=true: تقدير من الـ sketches (فلاتر التاريخ بس، وإلا الحساب الدقيق)."""
+    return await cached_response(request, "customers/top",
+                                 {"limit": limit, "approx": approx, **filters},
+                                 top_spenders, filters, limit, approx)
@@ -0,0 +1,230 @@
+from fastapi import APIRouter, Depends, Query, Request
+import numpy as np
+from cinema_api import data_loader, shards
+from cinema_api.cache import cached_response
+from cinema_api.dimensions import bounds, day, seat_types
+from cinema_api.metrics import span
+from cinema_api.rollup import NULL_DAY, day_labels, day_numbers
+from cinema_api.routers.filters import filter_params
+from cinema_api.sketches import HLL_ERROR
+
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+
+def money(value):
+    return round(float(value), 2)
+
+
+def per_code(table, name, codes, totals):
+    """(الإيراد، عدد التذاكر) لكل كود قاموس — bincount بدل groupby."""
+    size = table.sizes[name]
+    valid = codes >= 0
+    revenue = np.bincount(codes[valid], weights=totals[valid], minlength=size)
+    count = np.bincount(codes[valid], minlength=size)
+    return revenue, count
+
+
+def ranking(table, name, revenue, count, top=None):
+    """[{id, name, total}] مرتبة تنازلياً بالإيراد (الأكواد اللي ما لها تذاكر تنشال)."""
+    codes = np.flatnonzero(count)
+    codes = codes[np.argsort(-revenue[codes], kind="stable")][:top]
+    ids = table.decode(name, codes)
+    names = data_loader.NAMES[name].reindex(ids).fillna("").to_numpy()
+    return [{"id": i, "name": n, "total": money(r)}
+            for i, n, r in zip(ids, names, revenue[codes])]
+
+
+def options(name):
+    return [{"id": i, "name": n} for i, n in data_loader.NAMES[name].items()]
+
+
+def approx_customers(snapshot, filters, top):
+    """(عدد العملاء، أعلى العملاء، حدود الخطأ) من الـ sketches، أو None لو
+    الفلاتر ما تنجاوب منها."""
+    sketches = snapshot.sketches
+    if sketches is None:  # CINEMA_STORE=partitioned
+        return None
+    heavy = sketches.top(snapshot, "customer_id", filters, top)
+    distinct = sketches.distinct_customers(snapshot, filters)
+    if heavy is None or distinct is None:
+        return None
+    ids = snapshot.table.decode("customer_id", heavy.index)
+    names = data_loader.NAMES["customer_id"].reindex(ids).fillna("").to_numpy()
+    ranked = [{"id": i, "name": n, "total": money(r)}
+              for i, n, r in zip(ids, names, heavy["revenue"])]
+    bounds = {"unique_customers_relative_error": round(HLL_ERROR, 4),
+              "top_customers_max_overestimate": money(heavy["error"].max())
+              if len(heavy) else 0.0}
+    return distinct, ranked, bounds
+
+
+def tally(snapshot, filters, names):
+    """مجاميع الصفوف المفلترة في مرور واحد: كل عمود يتقرأ مرة وحدة وكل تجميع
+    bincount على أكواد القاموس. الناتج يندمج بـ combine (من كل shard)."""
+    stats = {name: [np.zeros(snapshot.table.sizes[name]),
+                    np.zeros(snapshot.table.sizes[name], dtype=np.int64)] for name in names}
+    tickets, sales, lows, highs, daily_parts = 0, 0.0, [], [], []
+
+    # دفعة وحدة من الفهرس، أو دفعة لكل partition (الذاكرة بحجم الدفعة)
+    chunks = snapshot.scan(**filters)
+    while True:
+        with span("filter"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        part, positions = chunk
+        with span("aggregate"):
+            totals = part.column("total", positions).astype("float64")
+            if not len(totals):
+                continue
+            days = day_numbers(part.column("purchase_time", positions))
+            for name in names:
+                revenue, count = per_code(part, name, part.column(name, positions), totals)
+                stats[name][0][:] += revenue
+                stats[name][1][:] += count
+            tickets += len(totals)
+            sales += totals.sum()
+            lows.append(totals.min())
+            highs.append(totals.max())
+            dated = days != NULL_DAY
+            if dated.any():
+                first = days[dated].min()
+                offsets = days[dated] - first
+                daily_parts.append((first, np.bincount(offsets, weights=totals[dated]),
+                                    np.bincount(offsets)))
+
+    # الأكواد اللي لها تذاكر بس (أصغر بكثير من القاموس لما ينرسل بين العمليات)
+    sparse = {}
+    for name, (revenue, count) in stats.items():
+        codes = np.flatnonzero(count)
+        sparse[name] = (codes, revenue[codes], count[codes])
+    return {"stats": sparse, "tickets": tickets, "sales": sales,
+            "low": min(lows) if lows else None, "high": max(highs) if highs else None,
+            "daily": merge_days(daily_parts)}
+
+
+def merge_days(parts):
+    """[(أول يوم، إيراد لكل يوم، عدد لكل يوم)] → وحدة، أو None."""
+    parts = [p for p in parts if p is not None]
+    if not parts:
+        return None
+    first = min(f for f, _, _ in parts)
+    length = max(f + len(r) for f, r, _ in parts) - first
+    revenue, count = np.zeros(length), np.zeros(length, dtype=np.int64)
+    for f, r, c in parts:
+        revenue[f - first:f - first + len(r)] += r
+        count[f - first:f - first + len(c)] += c
+    return first, revenue, count
+
+
+def combine(table, states, names):
+    """نتائج tally (من shard أو أكثر) → متجهات كاملة لكل اسم. عدد المختلفين
+    صحيح حتى لو نفس العميل في أكثر من shard، لأن العدّادات تنجمع قبل العد."""
+    stats = {name: (np.zeros(table.sizes[name]), np.zeros(table.sizes[name], dtype=np.int64))
+             for name in names}
+    for state in states:
+        for name in names:
+            codes, revenue, count = state["stats"][name]
+            stats[name][0][codes] += revenue
+            stats[name][1][codes] += count
+    lows = [s["low"] for s in states if s["low"] is not None]
+    highs = [s["high"] for s in states if s["high"] is not None]
+    return (stats, sum(s["tickets"] for s in states), sum(s["sales"] for s in states),
+            min(lows) if lows else None, max(highs) if highs else None,
+            merge_days([s["daily"] for s in states]))
+
+
+def summarize(snapshot, filters, top=5, approx=False):
+    """كل مؤشرات الداشبورد من الصفوف المفلترة (tally محلي أو على كل shard).
+    approx=True: مؤشرات العملاء من الـ sketches (repeat_customers ما ينحسب تقريبياً)."""
+    table = snapshot.table
+    estimated = approx_customers(snapshot, filters, top) if approx else None
+    names = ("movie_id", "theater_id") if estimated else ("movie_id", "customer_id", "theater_id")
+    states = shards.scatter(snapshot, tally, filters, names)
+    if states is None:
+        states = [tally(snapshot, filters, names)]
+    with span("aggregate"):
+        stats, tickets, sales, low, high, days = combine(table, states, names)
+
+    unique = {name: int(np.count_nonzero(count)) for name, (_, count) in stats.items()}
+    if estimated:
+        unique["customer_id"], top_customers, bounds = estimated
+        repeat = None
+    else:
+        top_customers = ranking(table, "customer_id", *stats["customer_id"], top)
+        repeat = int(np.count_nonzero(stats["customer_id"][1] > 1))
+
+    daily = []
+    if days is not None:
+        first, revenue, count = days
+        present = np.flatnonzero(count)
+        daily = [{"date": d, "total": money(r)}
+                 for d, r in zip(day_labels(present + first), revenue[present])]
+
+    repeat_ratio = repeat
+    if repeat is not None:
+        repeat_ratio = round(repeat / unique["customer_id"] * 100, 2) \
+            if unique["customer_id"] else 0.0
+
+    out = {
+        "tickets": tickets,
+        "total_sales": money(sales),
+        "unique_customers": unique["customer_id"],
+        "unique_theaters": unique["theater_id"],
+        "unique_movies": unique["movie_id"],
+        "repeat_customers": repeat,
+        "repeat_ratio": repeat_ratio,
+        "ticket_total": {"min": money(low), "max": money(high)}
+        if tickets else None,
+        "top_movies": ranking(table, "movie_id", *stats["movie_id"], top),
+        "top_customers": top_customers,
+        "revenue_by_theater": ranking(table, "theater_id", *stats["theater_id"]),
+        "daily_revenue": daily,
+    }
+    if approx:
+        out["approx"] = bounds if estimated else False
+    return out
+
+
+def summary(snapshot, filters, top, approx=False):
+    return summarize(snapshot, filters, top, approx), {}
+
+
+def filter_options(snapshot):
+    # مدى التاريخ وأعلى قيمة من أطراف الفهارس المرتبة (بدون قراءة العمودين)
+    extent, highest = bounds(snapshot)
+    return {
+        "movies": options("movie_id"),
+        "customers": options("customer_id"),
+        "theaters": options("theater_id"),
+        "seat_types": seat_types(snapshot),
+        "date_range": {
+            "min": day(extent[0]) if extent else None,
+            "max": day(extent[1]) if extent else None,
+        },
+        "max_total": money(highest) if highest is not None else 0.0,
+    }, {}
+
+
+@router.get("/summary")
+async def dashboard_summary(
+    request: Request,
+    top: int = Query(5, ge=1, le=100),
+    approx: bool = False,
+    filters: dict = Depends(filter_params),
+):
+    """مؤشرات الداشبورد كاملة بنفس فلاتر /filter/data — بدون تحميل صفوف.
+    approx=true (فلاتر التاريخ بس): عدد العملاء من HyperLogLog وأعلى العملاء
+    من Space-Saving، وحدود الخطأ في مفتاح approx."""
+    return await cached_response(request, "dashboard/summary",
+                                 {"top": top, "approx": approx, **filters},
+                                 summary, filters, top, approx)
+
+
+@router.get("/options")
+async def dashboard_options(request: Request):
+    """خيارات فلاتر الداشبورد (الأفلام، العملاء، الصالات، أنواع المقاعد، مدى
+    التاريخ وأعلى قيمة تذكرة) بدل ما العميل يستخرجها من الصفوف. قائمة
+    العملاء كاملة هنا؛ /dimensions أصغر وفيه بحث العملاء."""
+    return await cached_response(request, "dashboard/options", {}, filter_options)
@@ -0,0 +1,41 @@
+from typing import Literal
+from fastapi import APIRouter, Query, Request, Response
+from cinema_api import dimensions
+from cinema_api.cache import etag_matches
+from cinema_api.data_loader import get_snapshot
+
+
+router = APIRouter(prefix="/dimensions", tags=["Dimensions"])
+
+
+def tagged(request, table):
+    """الرد الجاهز (مضغوط لو العميل يقبل gzip)، أو 304 لو عنده نفس الـ ETag."""
+    headers = {"ETag": table.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request, table.etag):
+        return Response(status_code=304, headers=headers)
+    if len(table.body) >= 1024 and "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(table.gzipped, media_type="application/json",
+                        headers={**headers, "Content-Encoding": "gzip"})
+    return Response(table.body, media_type="application/json", headers=headers)
+
+
+@router.get("")
+def all_dimensions(request: Request):
+    """كل خيارات فلاتر الداشبورد في طلب واحد صغير: الأفلام والصالات وأنواع
+    المقاعد ومدى التاريخ وأعلى قيمة تذكرة، وعدد العملاء (الاختيار منهم
+    عن طريق /dimensions/customers/search)."""
+    return tagged(request, dimensions.bundle(get_snapshot()))
+
+
+@router.get("/customers/search")
+def search_customers(q: str = "", limit: int = Query(dimensions.SEARCH_LIMIT, ge=1, le=100)):
+    """بحث العملاء بالاسم أو الـ ID أثناء الكتابة (typeahead): بداية الاسم، ثم
+    بداية أي كلمة، ثم داخل الاسم. الحروف العربية تتوحد (الهمزات، ة/ه، ى/ي، التشكيل)."""
+    return dimensions.customer_search().search(q, limit)
+
+
+@router.get("/{name}")
+def dimension(request: Request, name: Literal["movies", "customers", "theaters", "seat_types"]):
+    if name == "seat_types":
+        return tagged(request, dimensions.Table(dimensions.seat_types(get_snapshot())))
+    return tagged(request, dimensions.table(name))
@@ -0,0 +1,53 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import FileResponse
+from cinema_api import exports
+from cinema_api.routers.filters import filter_params
+
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+
+def find(job_id):
+    job = exports.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="export not found")
+    return job
+
+
+@router.post("", status_code=202)
+def create_export(
+    response: Response,
+    fmt: Literal["csv", "xlsx", "pdf"] = Query("csv", alias="format"),
+    filters: dict = Depends(filter_params),
+):
+    """تصدير بنفس فلاتر /filter/data: csv و xlsx الصفوف كاملة، و pdf تقرير
+    ملخص بالعربي. يرجع الـ job (202) — الحالة من /exports/{id} والملف من
+    /exports/{id}/download. نفس الطلب على نفس البيانات يرجع الملف الجاهز (200)."""
+    problem = exports.unavailable(fmt)
+    if problem:
+        raise HTTPException(status_code=400, detail=problem)
+    job = exports.jobs.submit(fmt, filters)
+    response.headers["Location"] = f"/exports/{job.id}"
+    if job.status == "done":
+        response.status_code = 200
+    return job.public()
+
+
+@router.get("/stats")
+def export_stats():
+    return exports.jobs.stats()
+
+
+@router.get("/{job_id}")
+def export_status(job_id: str):
+    return find(job_id).public()
+
+
+@router.get("/{job_id}/download")
+def download_export(job_id: str):
+    job = find(job_id)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"export is {job.status}")
+    return FileResponse(exports.jobs.path(job), media_type=exports.MEDIA_TYPES[job.format],
+                        filename=f"tickets-{job.id[:8]}.{job.format}")
@@ -1,46 +1,165 @@
-from fastapi import APIRouter, Query
+import base64
+import json
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+import numpy as np
 import pandas as pd
-from cinema_api.data_loader import get_data
+from cinema_api import formats, shards
+from cinema_api.cache import cached_response
+from cinema_api.data_loader import get_snapshot
+from cinema_api.executor import plain
+from cinema_api.indexes import NAT, time_values
+from cinema_api.metrics import span
 
 
 
 router = APIRouter(prefix="/filter", tags=["Filters"])
 
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 10_000      # سقف صفحة الـ JSON (صيغ الـ streaming بدون سقف)
+STREAM_CHUNK = 10_000   # عدد الصفوف في كل دفعة streaming
 
-@router.get("/data")
-def filter_data(
+
+def split_ids(value):
+    """"C0001, c0002" → ["c0001", "c0002"] (الفهارس مبنية بحروف صغيرة)."""
+    return [v.strip().lower() for v in value.split(",")] if value else None
+
+
+def check_date(name, value):
+    """التاريخ كما هو لو pd.Timestamp يقراه، وإلا 400 (بدل 500 من compile_filters)."""
+    if not value:
+        return None
+    try:
+        valid = pd.Timestamp(value) is not pd.NaT
+    except (ValueError, TypeError, OverflowError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail=f"invalid {name}: {value!r}")
+    return value
+
+
+def filter_params(
     start_date: str = None,
     end_date: str = None,
-    customers: str = Query(None),
-    movies: str = Query(None),
-    theaters: str = Query(None),
-    seat_type: str = Query(None),
-    min_total: float = Query(None),
+    customers: str = None,
+    movies: str = None,
+    theaters: str = None,
+    seat_type: str = None,
+    min_total: float = None,
 ):
-    df = get_data()
+    """تحويل بارامترات الطلب إلى فلاتر جاهزة لـ TicketIndex.select.
+    نفس البارامترات تستخدمها باقي الراوترات عن طريق Depends(filter_params)."""
+    return {
+        "start_date": check_date("start_date", start_date),
+        "end_date": check_date("end_date", end_date),
+        "customers": split_ids(customers),
+        "movies": split_ids(movies),
+        "theaters": split_ids(theaters),
+        "seat_type": split_ids(seat_type),
+        "min_total": min_total,
+    }
+
+
+# -----------------------
+# cursor = (purchase_time بالنانوثانية، ticket_id) لآخر صف في الصفحة
+# -----------------------
+def encode_cursor(frame):
+    """cursor لآخر صف في الإطار."""
+    time = int(time_values(frame["purchase_time"].to_numpy()[-1:])[0])
+    ticket_id = str(frame["ticket_id"].iloc[-1])
+    return base64.urlsafe_b64encode(json.dumps([time, ticket_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        time, ticket_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        time = int(time)
+        if not NAT < time <= np.iinfo(np.int64).max or not isinstance(ticket_id, str):
+            raise ValueError(cursor)
+        return time, ticket_id
+    except (ValueError, TypeError, OverflowError):
+        raise HTTPException(status_code=400, detail="invalid cursor")
 
-    if start_date:
-        df = df[df["purchase_time"] >= pd.to_datetime(start_date)]
-    if end_date:
-        df = df[df["purchase_time"] <= pd.to_datetime(end_date)]
 
-    if customers:
-        cust_list = [c.strip().lower() for c in customers.split(",")]
-        df = df[df["customer_id"].str.lower().isin(cust_list)]
+def take_rows(snapshot, frames, limit):
+    """أول limit صف من generator إطارات مرتب، كإطار واحد."""
+    parts, count = [], 0
+    for frame in frames:
+        parts.append(frame)
+        count += len(frame)
+        if count >= limit:
+            break
+    if not parts:
+        return snapshot.take(np.empty(0, dtype=np.int64))
+    frame = parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+    return frame.iloc[:limit]
 
-    if movies:
-        mov_list = [m.strip().lower() for m in movies.split(",")]
-        df = df[df["movie_id"].str.lower().isin(mov_list)]
 
-    if theaters:
-        th_list = [t.strip().lower() for t in theaters.split(",")]
-        df = df[df["theater_id"].str.lower().isin(th_list)]
+def stream_frames(snapshot, frames, limit):
+    """دفعات DataFrame صغيرة بدل قائمة وحدة كبيرة: الذاكرة ثابتة مهما كبرت النتيجة."""
+    remaining = limit
+    yield snapshot.take(np.empty(0, dtype=np.int64))  # الأعمدة حتى لو النتيجة فاضية
+    for frame in frames:
+        if remaining is not None:
+            frame = frame.iloc[:remaining]
+            remaining -= len(frame)
+        yield frame
+        if remaining == 0:
+            return
 
-    if seat_type:
-        seat_list = [s.strip().lower() for s in seat_type.split(",")]
-        df = df[df["seat_type"].str.lower().isin(seat_list)]
 
-    if min_total is not None:
-        df = df[df["total"] >= float(min_total)]
+def first_rows(snapshot, filters, after, limit):
+    return take_rows(snapshot, snapshot.frames(after=after, chunk=limit, **filters), limit)
+
+
+def shard_rows(snapshot, filters, after, limit):
+    return plain(first_rows(snapshot, filters, after, limit))
+
+
+def page(snapshot, filters, after, limit, orient="records"):
+    """صفحة JSON مع X-Next-Cursor لو فيه صفوف بعدها. orient="columns":
+    {column: [قيم]} بدل قائمة صفوف (أصغر، وتنقرا بـ pd.DataFrame مباشرة)."""
+    # صف زيادة عشان نعرف إذا فيه صفحة بعدها
+    with span("filter"):
+        # مع الـ shards: أول limit + 1 من كل shard، وبعدين أول limit + 1 من الكل
+        frames = shards.scatter(snapshot, shard_rows, filters, after, limit + 1)
+        frame = (first_rows(snapshot, filters, after, limit + 1) if frames is None
+                 else shards.merge_ordered(frames, limit + 1))
+    headers = {}
+    if len(frame) > limit:
+        frame = frame.iloc[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(frame)
+    with span("materialize"):
+        return (formats.json_columns(frame) if orient == "columns" else frame), headers
+
+
+@router.get("/data")
+async def filter_data(
+    request: Request,
+    filters: dict = Depends(filter_params),
+    limit: int = Query(None, ge=1),
+    cursor: str = None,
+    fmt: Literal["json", "ndjson", "csv", "arrow"] = Query("json", alias="format"),
+    orient: Literal["records", "columns"] = "records",
+):
+    """الصفوف مرتبة حسب (purchase_time, ticket_id). صيغة json ترجع صفحة
+    (limit افتراضي 100 وأقصى MAX_LIMIT) ومعها X-Next-Cursor للصفحة الجاية،
+    كصفوف أو (orient=columns) كأعمدة؛ باقي الصيغ streaming للنتيجة كاملة
+    (أو لحد limit)."""
+    after = decode_cursor(cursor)
+
+    if fmt != "json":
+        if fmt == "arrow" and formats.pa is None:
+            raise HTTPException(status_code=400, detail="arrow format needs pyarrow")
+        snapshot = get_snapshot()
+        frames = snapshot.frames(after=after, chunk=STREAM_CHUNK, **filters)
+        chunks = formats.WRITERS[fmt](stream_frames(snapshot, frames, limit))
+        return StreamingResponse(chunks, media_type=formats.MEDIA_TYPES[fmt])
 
-    return df.head(100).to_dict(orient="records")
+    limit = min(limit or DEFAULT_LIMIT, MAX_LIMIT)
+    params = {"limit": limit, "cursor": cursor, "orient": orient, **filters}
+    return await cached_response(request, "filter/data", params,
+                                 page, filters, after, limit, orient)
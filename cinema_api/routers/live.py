@@ -0,0 +1,79 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, \
+    WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from cinema_api import live
+from cinema_api.routers.filters import filter_params
+
+
+router = APIRouter(prefix="/live", tags=["Live"])
+
+
+@router.get("/kpis")
+async def live_kpis(
+    request: Request,
+    top: int = Query(5, ge=1, le=100),
+    filters: dict = Depends(filter_params),
+):
+    """Server-Sent Events: أول event (snapshot) فيه مؤشرات /dashboard/summary
+    كاملة، وبعدها event delta مع كل تغيير في البيانات فيه اللي تغير بس
+    ({"set": مفاتيح جديدة، "days": أيام daily_revenue اللي تغيرت})."""
+    subscription, queue = await live.hub.subscribe(filters, top)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), live.HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                yield message.sse
+        finally:
+            live.hub.unsubscribe(subscription, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/ws")
+async def live_ws(websocket: WebSocket, top: int = 5, filters: dict = Depends(filter_params)):
+    """نفس رسائل /live/kpis كـ JSON. العميل يقدر يغير الاشتراك برسالة فيها
+    فلاتر جديدة ({"movies": "M001", "top": 10, ...}) وأول رد المؤشرات كاملة."""
+    await websocket.accept()
+    subscription = queue = sender = None
+
+    async def send(queue):
+        while True:
+            await websocket.send_text((await queue.get()).text)
+
+    try:
+        while True:
+            try:
+                new, new_queue = await live.hub.subscribe(filters, top)
+            except (HTTPException, ValueError) as e:
+                # فلاتر غلط: الاشتراك السابق (لو فيه) يكمل
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                await websocket.send_text(json.dumps({"type": "error", "detail": detail}))
+            else:
+                if sender is not None:
+                    sender.cancel()
+                    live.hub.unsubscribe(subscription, queue)
+                subscription, queue = new, new_queue
+                sender = asyncio.create_task(send(queue))
+            spec = await websocket.receive_json()
+            top = min(max(int(spec.pop("top", top)), 1), 100)
+            filters = filter_params(**spec)
+    except (WebSocketDisconnect, ValueError, TypeError) as e:
+        if not isinstance(e, WebSocketDisconnect):
+            await websocket.close(code=1008, reason=str(e))
+    finally:
+        if sender is not None:
+            sender.cancel()
+            live.hub.unsubscribe(subscription, queue)
+
+
+@router.get("/stats")
+def live_stats():
+    return live.hub.stats()
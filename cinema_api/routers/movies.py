@@ -1,13 +1,32 @@
-from fastapi import APIRouter
-from cinema_api.data_loader import get_data
+from fastapi import APIRouter, Depends, Request
+from cinema_api import data_loader
+from cinema_api.cache import cached_response
+from cinema_api.rollup import aggregate
+from cinema_api.routers.filters import filter_params
+from cinema_api.sketches import approx_headers
 
 
 router = APIRouter(prefix="/movies", tags=["Movies"])
 
 
-@router.get("/top")
-def top_movies(limit: int = 5):
-    df = get_data()
-    top = df.groupby("Title")["total"].sum().sort_values(
+def top_titles(snapshot, filters, limit, approx=False):
+    if approx and snapshot.sketches is not None:  # بدون sketches في CINEMA_STORE=partitioned
+        top = snapshot.sketches.top(snapshot, "movie_id", filters, limit)
+        if top is not None:
+            top.index = snapshot.table.decode("movie_id", top.index)
+            titles = top["revenue"].groupby(top.index.map(data_loader.NAMES["movie_id"])).sum()
+            titles = titles.sort_values(ascending=False).round(2)
+            return titles.to_dict(), approx_headers(top)
+    revenue = aggregate(snapshot, "movie_id", filters)["revenue"]
+    top = revenue.groupby(revenue.index.map(data_loader.NAMES["movie_id"])).sum().sort_values(
         ascending=False).head(limit)
-    return top.to_dict()
+    return top.to_dict(), approx_headers() if approx else {}
+
+
+@router.get("/top")
+async def top_movies(request: Request, limit: int = 5, approx: bool = False,
+                     filters: dict = Depends(filter_params)):
+    """approx=true: تقدير من الـ sketches (فلاتر التاريخ بس، وإلا الحساب الدقيق)."""
+    return await cached_response(request, "movies/top",
+                                 {"limit": limit, "approx": approx, **filters},
+                                 top_titles, filters, limit, approx)
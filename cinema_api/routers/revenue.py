@@ -1,13 +1,50 @@
-from fastapi import APIRouter
-from cinema_api.data_loader import get_data
-
+from typing import Literal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from cinema_api.cache import cached_response
+from cinema_api.data_loader import get_snapshot
+from cinema_api.rollup import NULL_DAY, aggregate, day_labels
+from cinema_api.routers.filters import filter_params
+from cinema_api import timeseries
 
 router = APIRouter(prefix="/revenue", tags=["Revenue"])
 
 
+def daily_totals(snapshot, filters):
+    daily = aggregate(snapshot, "day", filters)["revenue"].sort_index()
+    daily = daily[daily.index != NULL_DAY]
+    return dict(zip(day_labels(daily.index), daily)), {}
+
+
 @router.get("/daily")
-def daily_revenue():
-    df = get_data()
-    daily = df.groupby(df["purchase_time"].dt.date)[
-        "total"].sum().reset_index()
-    return dict(zip(daily["purchase_time"].astype(str), daily["total"]))
+async def daily_revenue(request: Request, filters: dict = Depends(filter_params)):
+    return await cached_response(request, "revenue/daily", filters, daily_totals, filters)
+
+
+@router.get("/series")
+async def revenue_series(
+    request: Request,
+    granularity: Literal["hour", "day", "week", "month"] = None,
+    bucket: Literal["hour", "day", "week", "month"] = None,
+    tz: str = timeseries.DEFAULT_TZ,
+    window: int = Query(None, ge=2, le=366),
+    compare: Literal["yoy"] = None,
+    filters: dict = Depends(filter_params),
+):
+    """الإيراد وعدد التذاكر لكل فترة granularity (ساعة/يوم/أسبوع/شهر؛ bucket
+    اسم قديم لنفس البارامتر) بتوقيت tz، في المدى [start_date, end_date] وبنفس
+    فلاتر /filter/data. window = متوسط متحرك على آخر window فترة، compare=yoy
+    = نفس الفترة السنة الماضية ونسبة النمو."""
+    bucket = granularity or bucket or "day"
+    try:
+        ZoneInfo(tz)
+        start, end = timeseries.period_range(
+            get_snapshot(), tz, filters["start_date"], filters["end_date"])
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if timeseries.bucket_count(start, end, bucket) + (window or 0) > timeseries.MAX_BUCKETS:
+        raise HTTPException(status_code=400,
+                            detail=f"more than {timeseries.MAX_BUCKETS} {bucket} buckets")
+    params = {"bucket": bucket, "tz": tz, "window": window, "compare": compare, **filters}
+    return await cached_response(request, "revenue/series", params,
+                                 timeseries.revenue_series, filters, bucket, tz, window, compare)
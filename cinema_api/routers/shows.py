@@ -0,0 +1,75 @@
+from typing import Literal
+import pandas as pd
+from fastapi import APIRouter, Query, Request
+from cinema_api import occupancy as counters
+from cinema_api.cache import cached_response
+from cinema_api.routers.filters import check_date, split_ids
+
+
+router = APIRouter(prefix="/shows", tags=["Shows"])
+
+
+def show_time(name, value):
+    """وقت من الطلب بنفس شكل start_time في shows.csv (بدون timezone؛ الوقت
+    بـ timezone يتحول لـ UTC مثل فلاتر التذاكر)، أو None. غلط → 400."""
+    value = check_date(name, value)
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    return value.tz_convert(None) if value.tz is not None else value
+
+
+def show_filters(theaters=None, movies=None, start_date=None, end_date=None):
+    return {"theaters": split_ids(theaters), "movies": split_ids(movies),
+            "start_date": show_time("start_date", start_date),
+            "end_date": show_time("end_date", end_date)}
+
+
+def occupancy(snapshot, by, sort, limit, filters):
+    return counters.occupancy(snapshot.occupancy, by, sort, limit, **filters), {}
+
+
+def near_capacity(snapshot, after, hours, threshold, limit, filters):
+    return counters.near_capacity(snapshot.occupancy, after, hours, threshold, limit,
+                                  **filters), {}
+
+
+@router.get("/occupancy")
+async def shows_occupancy(
+    request: Request,
+    by: Literal["show", "screen", "theater", "movie"] = "show",
+    sort: Literal["occupancy", "yield_ratio", "sold", "revenue", "lead_hours"] = "occupancy",
+    limit: int = Query(100, ge=1, le=10_000),
+    theaters: str = None,
+    movies: str = None,
+    start_date: str = None,
+    end_date: str = None,
+):
+    """الإشغال (sold / capacity) والـ yield (الإيراد مقابل base_price) وسرعة
+    البيع لكل عرض أو شاشة أو صالة أو فيلم، من عدّادات العروض (start_date و
+    end_date على وقت العرض)."""
+    filters = show_filters(theaters, movies, start_date, end_date)
+    params = {"by": by, "sort": sort, "limit": limit, **filters}
+    return await cached_response(request, "shows/occupancy", params,
+                                 occupancy, by, sort, limit, filters)
+
+
+@router.get("/near-capacity")
+async def shows_near_capacity(
+    request: Request,
+    after: str = None,
+    hours: float = Query(None, gt=0),
+    threshold: float = Query(counters.NEAR_CAPACITY, ge=0, le=1),
+    limit: int = Query(50, ge=1, le=1000),
+    theaters: str = None,
+    movies: str = None,
+):
+    """العروض الجاية (من after، افتراضياً الحين، وخلال hours لو محددة) اللي
+    إشغالها وصل threshold أو أكثر، مرتبة بوقت العرض."""
+    # الحين بالدقيقة عشان الكاش يخدم الطلبات في نفس الدقيقة
+    after = show_time("after", after) or pd.Timestamp.now().floor("min")
+    filters = show_filters(theaters, movies)
+    params = {"after": after.isoformat(), "hours": hours, "threshold": threshold,
+              "limit": limit, **filters}
+    return await cached_response(request, "shows/near-capacity", params,
+                                 near_capacity, after, hours, threshold, limit, filters)
@@ -0,0 +1,43 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query, Request
+from cinema_api.cache import cached_response
+from cinema_api.distribution import compare
+from cinema_api.routers.filters import filter_params
+
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+def baseline_params(
+    baseline_start_date: str = None,
+    baseline_end_date: str = None,
+    baseline_customers: str = None,
+    baseline_movies: str = None,
+    baseline_theaters: str = None,
+    baseline_seat_type: str = None,
+    baseline_min_total: float = None,
+):
+    """شريحة المقارنة: نفس فلاتر filter_params ببادئة baseline_ (بدونها = كل التذاكر)."""
+    return filter_params(baseline_start_date, baseline_end_date, baseline_customers,
+                         baseline_movies, baseline_theaters, baseline_seat_type,
+                         baseline_min_total)
+
+
+def distribution(snapshot, filters, baseline, field, bins):
+    return compare(snapshot, filters, baseline, field, bins), {}
+
+
+@router.get("/distribution")
+async def stats_distribution(
+    request: Request,
+    field: Literal["total", "price", "quantity"] = "total",
+    bins: int = Query(20, ge=1, le=200),
+    filters: dict = Depends(filter_params),
+    baseline: dict = Depends(baseline_params),
+):
+    """توزيع field (histogram بنفس الـ bins، quantiles، min/max/mean) للتذاكر
+    المفلترة ولشريحة المقارنة في رد واحد صغير مهما كان عدد الصفوف."""
+    params = {"field": field, "bins": bins, **filters,
+              **{f"baseline_{k}": v for k, v in baseline.items()}}
+    return await cached_response(request, "stats/distribution", params,
+                                 distribution, filters, baseline, field, bins)
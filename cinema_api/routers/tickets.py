@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import List
+from fastapi import APIRouter, HTTPException
+import pandas as pd
+from pydantic import BaseModel
+from cinema_api import ingest
+from cinema_api.data_loader import TICKET_COLUMNS, duplicate_ids, get_snapshot, unknown_keys
+from cinema_api.timeseries import DATA_TZ
+
+
+router = APIRouter(prefix="/tickets", tags=["Tickets"])
+
+
+class Ticket(BaseModel):
+    ticket_id: str
+    show_id: str
+    theater_id: str
+    movie_id: str
+    customer_id: str
+    purchase_time: datetime
+    seat_type: str
+    price: float
+    quantity: int
+    total: float
+
+
+def data_time(value):
+    """purchase_time بـ timezone → نفس الوقت بتوقيت البيانات (DATA_TZ) وبدون
+    tz، مثل باقي tickets.csv."""
+    if value.tzinfo is None:
+        return value
+    return pd.Timestamp(value).tz_convert(DATA_TZ).tz_localize(None).to_pydatetime()
+
+
+@router.post("")
+def add_tickets(batch: List[Ticket]):
+    """إضافة دفعة تذاكر جديدة بدون إعادة تشغيل الـ API. الدفعة تنكتب في
+    tickets.csv وهذي العملية تضيفها على طول؛ الـ workers الثانية من مراقبها
+    (خلال CINEMA_WATCH_INTERVAL)."""
+    df = pd.DataFrame([{**t.model_dump(), "purchase_time": data_time(t.purchase_time)}
+                       for t in batch], columns=TICKET_COLUMNS)
+    missing = unknown_keys(df)
+    if missing:
+        raise HTTPException(status_code=422, detail={"unknown_ids": missing})
+    duplicates = duplicate_ids(df)
+    if duplicates:
+        raise HTTPException(status_code=422, detail={"duplicate_ticket_ids": duplicates})
+    ingest.append_csv(df)
+    ingest.watcher.poll()
+    snapshot = get_snapshot()
+    return {"added": len(df), "rows": snapshot.rows, "version": snapshot.version}
@@ -0,0 +1,301 @@
+# توزيع التجميعات على عمليات (scatter-gather) — CINEMA_SHARDS=N:
+#   - التذاكر تتقسم على N عملية حسب الصالة (CINEMA_SHARD_KEY=theater، الصالات
+#     تتوزع بحيث عدد التذاكر متقارب) أو حسب hash رقم العميل (customer)
+#   - كل عملية تحمّل نفس الـ snapshot (mmap) وتحتفظ بصفوف الـ shard حقها بس،
+#     وتبني فهارسها والـ cube عليها، فالحساب الجزئي يشتغل بنفس دوال الـ API
+#   - عملية الـ API (المنسّق) ترسل الطلب لكل الـ shards بالتوازي وتدمج:
+#     المجاميع تنجمع، وأعلى K ينحسب بعد الجمع (أو من أعلى K لكل shard لو
+#     المفتاح نفسه مفتاح التقسيم)، وعدد المختلفين من عدّادات لكل كود
+#   - التذاكر الجديدة توصل لكل shard مع الطلب الجاي (مثل executor.py)
+#
+#   python -m cinema_api.shards [--key theater|customer]   # قياس بـ 1 و 2 و 4 و 8 shards
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import multiprocessing
+import os
+import numpy as np
+import pandas as pd
+from cinema_api import metrics
+
+log = logging.getLogger(__name__)
+
+SHARDS = int(os.environ.get("CINEMA_SHARDS", "0"))  # 0 = بدون تقسيم
+SHARD_KEY = os.environ.get("CINEMA_SHARD_KEY", "theater")
+KEY_COLUMNS = {"theater": "theater_id", "customer": "customer_id"}
+
+# داخل عمليات الـ shards: "i/N" ورقم الـ shard لكل صالة (من المنسّق)
+SHARD = os.environ.get("CINEMA_SHARD")
+PLAN = [int(s) for s in os.environ.get("CINEMA_SHARD_PLAN", "").split(",") if s]
+
+
+def plan(table, count):
+    """shard لكل كود صالة: الأكبر تذاكر أول، كل وحدة للـ shard الأقل تذاكر."""
+    codes = table.column("theater_id")
+    sizes = np.bincount(codes[codes >= 0], minlength=table.sizes["theater_id"])
+    loads = np.zeros(count, dtype=np.int64)
+    owners = np.zeros(len(sizes), dtype=np.int64)
+    for code in np.argsort(-sizes, kind="stable"):
+        owners[code] = np.argmin(loads)
+        loads[owners[code]] += sizes[code]
+    return owners.tolist()
+
+
+def code_owners(dictionary, size, count, key, plan=(), known=None):
+    """shard لكل كود في قاموس عمود المفتاح (الأكواد الجديدة تنضاف لـ known)."""
+    start = 0 if known is None else len(known)
+    if start >= size:
+        return known
+    if key == "customer":
+        from cinema_api.sketches import hash_values
+
+        new = (hash_values(dictionary.values[start:size]) % np.uint64(count)).astype(np.int64)
+    else:
+        codes = np.arange(start, size)
+        planned = np.asarray(plan, dtype=np.int64)
+        new = codes % count  # صالات أضيفت بعد الـ plan
+        known_codes = codes < len(planned)
+        new[known_codes] = planned[codes[known_codes]]
+    return new if known is None else np.concatenate([known, new])
+
+
+# -----------------------
+# داخل عمليات الـ shards
+# -----------------------
+_owners = None
+_seen = 0  # صفوف البيانات الكاملة اللي وصلت لهذي العملية (مو صفوف الـ shard)
+
+
+def _layout():
+    index, count = (int(x) for x in SHARD.split("/"))
+    return index, count
+
+
+def row_owners(store, codes):
+    global _owners
+    index, count = _layout()
+    column = KEY_COLUMNS[SHARD_KEY]
+    _owners = code_owners(store.dictionaries[column], len(store.dictionaries[column]),
+                          count, SHARD_KEY, PLAN, _owners)
+    return np.where(codes >= 0, _owners[np.maximum(codes, 0)], 0)
+
+
+def own(store):
+    """store فيه صفوف هذا الـ shard بس (نفس القواميس، فالأكواد نفسها في كل العمليات)."""
+    from cinema_api.store import TicketStore
+
+    global _seen
+    index, _ = _layout()
+    _seen = store.rows
+    codes = store.arrays[KEY_COLUMNS[SHARD_KEY]][:store.rows]
+    mine = np.flatnonzero(row_owners(store, codes) == index)
+    arrays = {c: np.asarray(a[:store.rows])[mine] for c, a in store.arrays.items()}
+    return TicketStore.from_arrays(store.schema, arrays, len(mine),
+                                   {c: d.values for c, d in store.dictionaries.items()})
+
+
+def own_rows(store, df):
+    """صفوف الدفعة اللي لهذا الـ shard. الدفعة كلها تنرمّز أول عشان القيم
+    الجديدة تاخذ نفس الأكواد في كل العمليات."""
+    codes = store.encode(df)[KEY_COLUMNS[SHARD_KEY]]
+    index, _ = _layout()
+    return df[row_owners(store, codes) == index]
+
+
+def _init_worker(env):
+    global SHARD, SHARD_KEY, PLAN
+    os.environ.update(env)
+    SHARD, SHARD_KEY = env["CINEMA_SHARD"], env["CINEMA_SHARD_KEY"]
+    PLAN = [int(s) for s in env["CINEMA_SHARD_PLAN"].split(",") if s]
+    from cinema_api import data_loader
+
+    data_loader.load()
+
+
+def _ready():
+    return _layout()[0], _seen
+
+
+def _call(func, args, start, batch):
+    """تلحق التذاكر الجديدة (batch = البيانات الكاملة من start) وتنفذ func على الـ shard."""
+    global _seen
+    from cinema_api import data_loader
+
+    if batch is not None and start + len(batch) > _seen:
+        data_loader.append_tickets(batch.iloc[_seen - start:])
+        _seen = start + len(batch)
+    with metrics.collect() as spans:
+        result = func(data_loader.get_snapshot(), *args)
+    return _layout()[0], _seen, result, spans
+
+
+# -----------------------
+# المنسّق (عملية الـ API)
+# -----------------------
+class Coordinator:
+    def __init__(self, count=SHARDS, key=SHARD_KEY):
+        self.count = count
+        self.key = key
+        self.pools = []
+        self.synced = []
+
+    @property
+    def active(self):
+        return bool(self.pools)
+
+    def start(self):
+        """عملية لكل shard (pool بعملية وحدة، فكل shard له عمليته دايماً)."""
+        if self.count <= 0 or self.pools or SHARD is not None:
+            return
+        from cinema_api import data_loader
+
+        snapshot = data_loader.get_snapshot()
+        if snapshot.partitions is not None:
+            log.warning("CINEMA_SHARDS needs the in-memory store; shards not started")
+            return
+        env = {"CINEMA_WATCH_INTERVAL": "0", "CINEMA_SHARD_KEY": self.key,
+               "CINEMA_SHARD_PLAN": ",".join(map(str, plan(snapshot.table, self.count)))}
+        if data_loader.SNAPSHOT_BUILD:
+            env["CINEMA_SNAPSHOT_BUILD"] = data_loader.SNAPSHOT_BUILD
+        else:
+            env["CINEMA_TICKETS_BYTES"] = str(data_loader.TICKETS_OFFSET)
+        context = multiprocessing.get_context("spawn")
+        self.pools = [ProcessPoolExecutor(1, mp_context=context, initializer=_init_worker,
+                                          initargs=({**env, "CINEMA_SHARD": f"{i}/{self.count}"},))
+                      for i in range(self.count)]
+        self.synced = [0] * self.count
+        try:
+            for future in [pool.submit(_ready) for pool in self.pools]:
+                index, seen = future.result()
+                self.synced[index] = seen
+        except Exception:
+            log.exception("shard processes failed to start; aggregations run locally")
+            self.stop()
+
+    def stop(self):
+        for pool in self.pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.pools = []
+        self.synced = []
+
+    def gather(self, snapshot, func, *args):
+        """[func(shard snapshot, *args) لكل shard] — تنتظر كل الـ shards."""
+        from cinema_api.executor import delta
+
+        start = min(self.synced)
+        batch = delta(snapshot, start) if start < snapshot.rows else None
+        futures = [pool.submit(_call, func, args, start, batch) for pool in self.pools]
+        results = [None] * len(futures)
+        for future in futures:
+            index, seen, result, spans = future.result()
+            self.synced[index] = max(self.synced[index], seen)
+            metrics.replay(spans)
+            results[index] = result
+        return results
+
+    def stats(self):
+        return {"shards": len(self.pools), "key": self.key, "synced_rows": list(self.synced)}
+
+
+coordinator = Coordinator()
+
+
+def split_by(column):
+    """كل قيمة من column في shard واحد بس؟ (فالتجميع حسبها ما يحتاج جمع بين الـ shards)"""
+    return coordinator.active and KEY_COLUMNS.get(coordinator.key) == column
+
+
+def scatter(snapshot, func, *args):
+    """النتائج الجزئية من كل shard، أو None لو ما فيه shards شغالة (الحساب
+    يصير محلي). عملية shard ماتت → نوقف التقسيم ونرجع للحساب المحلي."""
+    if not coordinator.active:
+        return None
+    try:
+        return coordinator.gather(snapshot, func, *args)
+    except Exception:
+        log.exception("shard call failed; aggregations run locally from now on")
+        coordinator.stop()
+        return None
+
+
+# -----------------------
+# الدمج
+# -----------------------
+def merge_sums(partials):
+    """إطارات مجاميع مفهرسة بالكود (aggregate_codes) → مجموعها."""
+    filled = [p for p in partials if len(p)]
+    if len(filled) <= 1:
+        return filled[0] if filled else partials[0]
+    return pd.concat(filled).groupby(level=0).sum()
+
+
+def merge_ordered(frames, limit):
+    """أول limit صف من إطارات مرتبة حسب (purchase_time, ticket_id)."""
+    from cinema_api.indexes import time_values
+
+    frame = pd.concat(frames, ignore_index=True)
+    times = time_values(frame["purchase_time"].to_numpy())
+    order = np.lexsort((frame["ticket_id"].to_numpy(), times))[:limit]
+    return frame.take(order).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # python -m cinema_api.shards [--key theater|customer] [--counts 1,2,4,8]
+    # زمن كل عملية محلياً ثم موزعة على N shard (مع التأكد إن النتيجة نفسها)
+    import argparse
+    import time
+    # نفس الموديول اللي تستخدمه عمليات الـ shards (مو نسخة __main__)
+    from cinema_api import shards
+    from cinema_api.data_loader import get_snapshot
+    from cinema_api.executor import plain
+    from cinema_api.rollup import aggregate, top_revenue
+    from cinema_api.routers.dashboard import summarize
+    from cinema_api.routers.filters import filter_params, page
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--key", choices=sorted(KEY_COLUMNS), default=SHARD_KEY)
+    parser.add_argument("--counts", default="1,2,4,8")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    snapshot = get_snapshot()
+    everything = filter_params()
+    priced = filter_params(min_total=float(np.median(snapshot.table.column("total"))))
+    cases = {
+        "dashboard/summary": lambda: summarize(snapshot, everything),
+        "movies/top min_total": lambda: aggregate(snapshot, "movie_id", priced)["revenue"],
+        "customers/top": lambda: top_revenue(snapshot, "customer_id", everything, 5),
+        "revenue/daily": lambda: aggregate(snapshot, "day", everything)["revenue"],
+        "filter/data page": lambda: page(snapshot, everything, None, 100)[0],
+    }
+
+    def same(a, b):
+        if isinstance(a, pd.Series):
+            return a.index.equals(b.index) and np.allclose(a.to_numpy(), b.to_numpy())
+        if isinstance(a, pd.DataFrame):
+            return plain(a).reset_index(drop=True).equals(plain(b).reset_index(drop=True))
+        return a == b
+
+    def timed(func):
+        samples = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            result = func()
+            samples.append((time.perf_counter() - t0) * 1000)
+        return sorted(samples)[len(samples) // 2], result
+
+    baseline = {name: timed(func) for name, func in cases.items()}
+    print(f"{snapshot.rows:,} tickets, key={args.key}, {os.cpu_count()} CPUs")
+    print(f"{'':<22}" + "".join(f"{name:>22}" for name in cases))
+    print(f"{'local':<22}" + "".join(f"{ms:>19.1f} ms" for ms, _ in baseline.values()))
+    for count in (int(c) for c in args.counts.split(",")):
+        shards.coordinator = shards.Coordinator(count, args.key)
+        t0 = time.perf_counter()
+        shards.coordinator.start()
+        started = time.perf_counter() - t0
+        cells = []
+        for name, func in cases.items():
+            ms, result = timed(func)
+            mark = "" if same(baseline[name][1], result) else " !="
+            cells.append(f"{ms:>10.1f} ms x{baseline[name][0] / ms:4.1f}{mark}")
+        shards.coordinator.stop()
+        print(f"{f'{count} shards ({started:.0f}s up)':<22}" + "".join(f"{c:>22}" for c in cells))
@@ -0,0 +1,249 @@
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+# نوع التخزين لكل عمود في TicketStore
+CATEGORY, DATETIME, NUMBER, OBJECT = "category", "datetime", "number", "object"
+
+
+def grow(array, size):
+    """مصفوفة جديدة بسعة أكبر فيها نفس البيانات (الـ snapshots القديمة تبقى على القديمة)."""
+    # النص بعرض ثابت (من ملفات mmap) يرجع object عشان القيم الأطول ما تنقص
+    dtype = object if array.dtype.kind == "U" else array.dtype
+    out = np.empty(size, dtype=dtype)
+    out[:len(array)] = array
+    return out
+
+
+class Dictionary:
+    """ترميز قاموسي append-only: الكود اللي ينعطى لقيمة ما يتغير أبداً، فالـ
+    snapshots القديمة تقدر تقرأ نفس القاموس وهو يكبر."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+        # مفاتيح البحث بحروف صغيرة: كود القيمة → رقم المفتاح
+        self.lower = {}
+        self.lower_ids = np.empty(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.values)
+
+    @classmethod
+    def from_values(cls, values):
+        dictionary = cls()
+        for value in values:
+            dictionary._add(value)
+        return dictionary
+
+    def encode(self, values):
+        codes, uniques = pd.factorize(values)
+        lookup = np.full(len(uniques) + 1, -1, dtype=np.int32)  # آخر خانة لـ -1
+        for i, value in enumerate(uniques):
+            code = self.codes.get(value)
+            if code is None:
+                code = self._add(value)
+            lookup[i] = code
+        return lookup[codes]
+
+    def _add(self, value):
+        code = len(self.values)
+        if code >= len(self.lower_ids):
+            self.lower_ids = grow(self.lower_ids, max(16, 2 * code))
+        self.lower_ids[code] = self.lower.setdefault(str(value).lower(), len(self.lower))
+        self.codes[value] = code
+        self.values.append(value)
+        return code
+
+    def lower_keys(self, codes):
+        """رقم المفتاح (بحروف صغيرة) لكل كود، و -1 للقيم الفاضية."""
+        return np.where(codes >= 0, self.lower_ids[np.maximum(codes, 0)], -1)
+
+    def key_ids(self, values):
+        """أرقام المفاتيح لقائمة قيم بحروف صغيرة (القيم غير المعروفة تنشال)."""
+        return sorted({self.lower[v] for v in values if v in self.lower})
+
+
+class TicketTable:
+    """عرض ثابت (immutable) لأول `rows` صف من الـ store. الصفوف اللي قبل
+    rows ما تتغير أبداً، فالقراءة آمنة حتى والـ store يضيف بعدها."""
+
+    def __init__(self, schema, arrays, rows, dictionaries, sizes):
+        self.schema = schema              # {column: kind}
+        self.arrays = arrays              # {column: ndarray بسعة >= rows}
+        self.rows = rows
+        self.dictionaries = dictionaries  # {column: Dictionary}
+        self.sizes = sizes                # عدد الفئات وقت النشر
+        self._dtypes = {}                 # CategoricalDtype لكل عمود (بناها يكلف حجم القاموس)
+
+    def column(self, name, positions=None):
+        """القيم الخام للعمود (أكواد int32 للأعمدة القاموسية)."""
+        array = self.arrays[name]
+        return array[:self.rows] if positions is None else array[positions]
+
+    def lower_keys(self, name, positions=None):
+        return self.dictionaries[name].lower_keys(self.column(name, positions))
+
+    def decode(self, name, codes):
+        values = self.dictionaries[name].values
+        return np.array([values[c] if c >= 0 else None for c in codes], dtype=object)
+
+    def _series(self, name, array):
+        if self.schema[name] == CATEGORY:
+            dtype = self._dtypes.get(name)
+            if dtype is None:
+                dtype = self._dtypes[name] = pd.CategoricalDtype(
+                    self.dictionaries[name].values[:self.sizes[name]])
+            return pd.Categorical.from_codes(array, dtype=dtype, validate=False)
+        return array
+
+    def _frame(self, rows, dimensions):
+        columns = {c: self._series(c, a[rows]) for c, a in self.arrays.items()}
+        for dimension in dimensions:
+            key = dimension.key
+            columns.update(dimension.columns(self.dictionaries[key], self.arrays[key][rows]))
+        return pd.DataFrame(columns, copy=False)
+
+    def to_frame(self, start=0, end=None, dimensions=()):
+        """الصفوف [start, end) كإطار. dimensions: أعمدة الأبعاد تنضاف بعد أعمدة
+        الحقائق (late materialization)."""
+        end = self.rows if end is None else min(end, self.rows)
+        return self._frame(slice(start, end), dimensions)
+
+    def take(self, positions, dimensions=()):
+        return self._frame(positions, dimensions)
+
+
+class Dimension:
+    """جدول بعد (فيلم، صالة، عرض، عميل) بجانب جدول الحقائق: التذكرة فيها كود
+    المفتاح بس، وأعمدة البعد تنضاف لصفوف الإخراج (صفحة أو ملف) وقت الطلب
+    (late materialization) بدل نسخة لكل صف في الـ store."""
+
+    def __init__(self, key, frame, categorical=()):
+        self.key = key
+        self.frame = frame                     # مفهرس بالـ ID
+        self.categorical = set(categorical) & set(frame.columns)
+        self._aligned = weakref.WeakKeyDictionary()  # Dictionary → (size, أعمدة)
+        self._lock = threading.Lock()
+
+    def aligned(self, dictionary, size):
+        """أعمدة البعد بترتيب أكواد قاموس المفتاح (صف لكل كود). القاموس
+        append-only، فالنسخة الأكبر تنفع لأي جدول أصغر."""
+        with self._lock:
+            cached = self._aligned.get(dictionary)
+            if cached is not None and cached[0] >= size:
+                return cached[1]
+            size = max(size, len(dictionary))
+            rows = self.frame.reindex(dictionary.values[:size])
+            columns = {c: pd.Categorical(rows[c]) if c in self.categorical
+                       else rows[c].to_numpy() for c in rows.columns}
+            self._aligned[dictionary] = (size, columns)
+            return columns
+
+    def columns(self, dictionary, codes):
+        """{عمود: قيم} لصفوف أكواد المفتاح codes (-1 = بدون قيمة)."""
+        aligned = self.aligned(dictionary, int(codes.max()) + 1 if len(codes) else 0)
+        missing = codes < 0
+        safe = np.maximum(codes, 0)
+        out = {}
+        for name, values in aligned.items():
+            if isinstance(values, pd.Categorical):
+                picked = values.codes[safe] if len(values) else np.full(len(codes), -1)
+                out[name] = pd.Categorical.from_codes(
+                    np.where(missing, -1, picked), dtype=values.dtype, validate=False)
+                continue
+            if not len(values):
+                out[name] = np.full(len(codes), np.nan)
+                continue
+            picked = values[safe]
+            if missing.any():
+                if picked.dtype.kind in "iub":
+                    picked = picked.astype(np.float64)
+                picked[missing] = np.datetime64("NaT") if picked.dtype.kind == "M" else np.nan
+            out[name] = picked
+        return out
+
+
+class TicketStore:
+    """تخزين عمودي append-only: مصفوفة بسعة لكل عمود، والأعمدة النصية
+    المتكررة مرمّزة بقاموس. الإضافة تكلف حجم الدفعة (مع مضاعفة السعة)."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.arrays = {}
+        self.rows = 0
+        self.dictionaries = {c: Dictionary() for c, k in schema.items()
+                             if k == CATEGORY}
+
+    @classmethod
+    def from_frame(cls, df, categorical=()):
+        schema = {}
+        for c in df.columns:
+            if c in categorical:
+                schema[c] = CATEGORY
+            elif pd.api.types.is_datetime64_any_dtype(df[c]):
+                schema[c] = DATETIME
+            elif pd.api.types.is_numeric_dtype(df[c]):
+                schema[c] = NUMBER
+            else:
+                schema[c] = OBJECT
+        store = cls(schema)
+        store.arrays = {c: np.empty(0, dtype=store._dtype(c, df[c]))
+                        for c in df.columns}
+        store.append(df)
+        return store
+
+    @classmethod
+    def from_arrays(cls, schema, arrays, rows, dictionaries):
+        """store من مصفوفات جاهزة (مثلاً mmap للقراءة فقط — أول إضافة تنسخها)."""
+        store = cls(schema)
+        store.arrays = dict(arrays)
+        store.rows = rows
+        store.dictionaries = {c: Dictionary.from_values(v)
+                              for c, v in dictionaries.items()}
+        return store
+
+    def _dtype(self, name, col):
+        kind = self.schema[name]
+        if kind == CATEGORY:
+            return np.int32
+        if kind == DATETIME:
+            return "datetime64[ns]"
+        if kind == NUMBER:
+            return col.dtype
+        return object
+
+    def _encode(self, name, col):
+        kind = self.schema[name]
+        if kind == CATEGORY:
+            return self.dictionaries[name].encode(col)
+        if kind == DATETIME:
+            return pd.to_datetime(col, errors="coerce").to_numpy("datetime64[ns]")
+        if kind == NUMBER:
+            # NaN في عمود int يرفع ValueError — الدفعة ترفض قبل ما نكتب شي
+            return col.to_numpy(dtype=self.arrays[name].dtype)
+        return col.to_numpy(dtype=object)
+
+    @property
+    def table(self):
+        return TicketTable(self.schema, dict(self.arrays), self.rows,
+                           self.dictionaries,
+                           {c: len(d) for c, d in self.dictionaries.items()})
+
+    def encode(self, df):
+        """أعمدة df مرمّزة بنفس schema وقواميس الـ store، بدون إضافتها له."""
+        return {c: self._encode(c, df[c]) for c in self.schema}
+
+    def append(self, df):
+        """تضيف صفوف df (نفس أعمدة الـ store) وترجع TicketTable جديد.
+        لازم يكون فيه كاتب واحد بس في نفس الوقت."""
+        encoded = self.encode(df)
+        start, end = self.rows, self.rows + len(df)
+        for c, values in encoded.items():
+            array = self.arrays[c]
+            if end > len(array) or not array.flags.writeable:
+                self.arrays[c] = array = grow(array[:start], max(end, 2 * len(array)))
+            array[start:end] = values
+        self.rows = end
+        return self.table
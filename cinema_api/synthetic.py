@@ -0,0 +1,200 @@
+# بيانات تجريبية بأي حجم (نفس أعمدة وصيغ IDs ملفات cinema_api):
+#   - نفس seed = نفس الملفات بالضبط
+#   - الأفلام والعملاء والصالات بشعبية غير متساوية (Zipf): قليل منهم ياخذ
+#     أغلب التذاكر، مثل البيانات الحقيقية
+#   - كل تذكرة تابعة لعرض (نفس الصالة والفيلم) ومشتراة قبل بدايته بـ 0-12
+#     يوم، وعدد تذاكر العرض ما يتعدى سعته
+#   - tickets.csv ينكتب دفعة دفعة حسب وقت العروض فالذاكرة ثابتة حتى 50M تذكرة
+#
+#   python -m cinema_api.synthetic OUT_DIR --tickets 1000000 [--seed 0]
+#   CINEMA_DATA_DIR=OUT_DIR uvicorn cinema_api.main:app
+import argparse
+from pathlib import Path
+import time
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+
+START = pd.Timestamp("2025-01-01")
+DAYS = 365                     # مدى أوقات العروض
+CHUNK = 1_000_000              # تذاكر كل دفعة كتابة
+SEAT_TYPES = ["Regular", "VIP", "Couple"]
+SEAT_SHARE = [0.81, 0.14, 0.05]
+SEAT_MARKUP = [1.0, 1.5, 1.8]  # سعر المقعد = base_price × markup
+CAPACITIES = [60, 80, 100, 120, 150]
+CITIES = ["Riyadh", "Jeddah", "Dammam", "Mecca", "Medina", "Khobar", "Abha", "Tabuk"]
+MEAN_FILL = 0.55               # متوسط نسبة امتلاء العرض
+
+
+def ident(prefix, numbers, width):
+    """T000001 / S0001 / C0001 / M001 / T01 (العرض يزيد لو الأرقام أكبر)."""
+    width = max(width, len(str(int(numbers.max())))) if len(numbers) else width
+    return np.char.add(prefix, np.char.zfill(numbers.astype(str), width))
+
+
+def sizes(tickets):
+    """عدد الصفوف لكل جدول حسب عدد التذاكر (نفس نسب الملفات الأصلية تقريباً)."""
+    return {
+        "theaters": int(np.clip(tickets // 200_000, 5, 99)),
+        "movies": int(np.clip(40 + tickets // 250_000, 40, 999)),
+        "customers": max(600, int(tickets / 3.3)),
+    }
+
+
+def zipf_weights(rng, n, s, q=0):
+    """أوزان Zipf (1/(rank+q)^s) بترتيب عشوائي (فالأشهر مو دايماً ID رقم 1)."""
+    weights = 1.0 / (np.arange(1, n + 1) + q) ** s
+    return rng.permutation(weights / weights.sum())
+
+
+def sample(rng, cdf, k):
+    return np.minimum(np.searchsorted(cdf, rng.random(k), "right"), len(cdf) - 1)
+
+
+# -----------------------
+# جداول الأبعاد
+# -----------------------
+def make_theaters(rng, n):
+    return pd.DataFrame({
+        "theater_id": ident("T", np.arange(1, n + 1), 2),
+        "name": [f"Theater {i}" for i in range(1, n + 1)],
+        "city": rng.choice(CITIES, n, p=zipf_weights(rng, len(CITIES), 1.0)),
+        "total_screens": rng.integers(3, 9, n),
+    })
+
+
+def make_movies(rng, n):
+    seed = pd.read_csv(BASE_DIR / "movies.csv")
+    titles = seed["Title"].to_numpy()
+    # الأسماء تتكرر بعد أول len(titles) فيلم مع رقم جزء (Lost Stars 2 ...)
+    parts = np.arange(n) // len(titles)
+    title = np.array([t if p == 0 else f"{t} {p + 1}"
+                      for t, p in zip(titles[np.arange(n) % len(titles)], parts)])
+    return pd.DataFrame({
+        "movie_id": ident("M", np.arange(1, n + 1), 3),
+        "Title": title,
+        "genre": rng.choice(seed["genre"].unique(), n),
+        "duration_min": rng.choice(np.arange(85, 135, 5), n),
+        "popularity": np.round(rng.beta(2, 2.5, n) * 0.85 + 0.1, 3),
+    })
+
+
+def make_customers(rng, n):
+    seed = pd.read_csv(BASE_DIR / "customers.csv")["name"].str.split(" ", n=1)
+    first = seed.str[0].unique()
+    family = seed.str[1].dropna().unique()
+    return pd.DataFrame({
+        "customer_id": ident("C", np.arange(1, n + 1), 4),
+        "name": np.char.add(np.char.add(rng.choice(first, n).astype(str), " "),
+                            rng.choice(family, n).astype(str)),
+        "age": rng.integers(16, 70, n),
+        "phone": np.char.add("05", np.char.zfill(rng.integers(0, 10**7, n).astype(str), 7)),
+    })
+
+
+def make_shows(rng, tickets, theaters, movies):
+    """العروض مرتبة بوقت البداية، ومعها عدد التذاكر المطلوب لكل عرض."""
+    capacity_mean = np.mean(CAPACITIES)
+    n = max(1, int(np.ceil(tickets / (capacity_mean * MEAN_FILL))))
+    theater = sample(rng, np.cumsum(zipf_weights(rng, len(theaters), 0.8)), n)
+    screens = theaters["total_screens"].to_numpy()[theater]
+    movie_weights = movies["popularity"].to_numpy() ** 2
+    movie = sample(rng, np.cumsum(movie_weights / movie_weights.sum()), n)
+    seconds = np.sort(rng.integers(0, DAYS * 86_400, n))
+    shows = pd.DataFrame({
+        "show_id": ident("S", np.arange(1, n + 1), 4),
+        "theater_id": theaters["theater_id"].to_numpy()[theater],
+        "screen_no": rng.integers(0, screens) + 1,
+        "movie_id": movies["movie_id"].to_numpy()[movie],
+        "start_time": START + pd.to_timedelta(seconds, unit="s"),
+        "duration_min": movies["duration_min"].to_numpy()[movie],
+        "base_price": rng.integers(35, 49, n),
+        "capacity": rng.choice(CAPACITIES, n),
+    })
+
+    # عدد التذاكر: حسب شعبية الفيلم والصالة، وما يتعدى السعة (الزيادة
+    # تتوزع على العروض اللي فيها مكان)
+    weights = movie_weights[movie] * rng.gamma(2.0, 0.5, n)
+    capacity = shows["capacity"].to_numpy()
+    counts = np.zeros(n, dtype=np.int64)
+    remaining = tickets
+    while remaining > 0:
+        room = capacity - counts
+        p = weights * (room > 0)
+        if not p.sum():
+            raise ValueError("not enough seats for the requested tickets")
+        counts += np.minimum(rng.multinomial(remaining, p / p.sum()), room)
+        remaining = tickets - int(counts.sum())
+    return shows, counts
+
+
+def ticket_chunks(rng, shows, counts, customers, chunk=CHUNK):
+    """دفعات tickets.csv بترتيب وقت العروض (تقريباً ترتيب الشراء)."""
+    # q يكبر مع عدد العملاء: أعلى عميل بمئات التذاكر مو بعشرات الآلاف
+    n = len(customers)
+    customer_cdf = np.cumsum(zipf_weights(rng, n, 1.2, q=max(50, n // 300)))
+    seat_cdf = np.cumsum(SEAT_SHARE)
+    customer_ids = customers["customer_id"].to_numpy()
+    # نهاية تذاكر كل عرض؛ رقم العرض لتذاكر الدفعة من searchsorted (بدل
+    # np.repeat لكل التذاكر مرة وحدة: 8 بايت لكل تذكرة)
+    ends = np.cumsum(counts)
+    total = int(ends[-1]) if len(ends) else 0
+    width = max(6, len(str(total)))  # نفس عرض الـ ID في كل الدفعات
+    next_id = 1
+    for lo in range(0, total, chunk):
+        rows = np.searchsorted(ends, np.arange(lo, min(lo + chunk, total)), side="right")
+        k = len(rows)
+        show = shows.iloc[rows]
+        seat = sample(rng, seat_cdf, k)
+        price = np.round(show["base_price"].to_numpy() * np.take(SEAT_MARKUP, seat), 1)
+        before = pd.to_timedelta(rng.integers(0, 12 * 86_400, k), unit="s")
+        batch = pd.DataFrame({
+            "ticket_id": ident("T", np.arange(next_id, next_id + k), width),
+            "show_id": show["show_id"].to_numpy(),
+            "theater_id": show["theater_id"].to_numpy(),
+            "movie_id": show["movie_id"].to_numpy(),
+            "customer_id": customer_ids[sample(rng, customer_cdf, k)],
+            "purchase_time": show["start_time"].to_numpy() - before,
+            "seat_type": np.take(SEAT_TYPES, seat),
+            "price": price,
+            "quantity": 1,
+            "total": price,
+        })
+        next_id += k
+        yield batch
+
+
+def generate(directory, tickets, seed=0, chunk=CHUNK):
+    """يكتب tickets/shows/customers/movies/theaters.csv في directory."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    n = sizes(tickets)
+    theaters = make_theaters(rng, n["theaters"])
+    movies = make_movies(rng, n["movies"])
+    customers = make_customers(rng, n["customers"])
+    shows, counts = make_shows(rng, tickets, theaters, movies)
+
+    for name, frame in (("theaters", theaters), ("movies", movies),
+                        ("customers", customers), ("shows", shows)):
+        frame.to_csv(directory / f"{name}.csv", index=False)
+    # التذاكر تنكتب لملف مؤقت أول عشان مراقب tickets.csv ما يقرا نص ملف
+    partial = directory / "tickets.csv.partial"
+    with open(partial, "w", newline="") as f:
+        for i, batch in enumerate(ticket_chunks(rng, shows, counts, customers, chunk)):
+            batch.to_csv(f, index=False, header=i == 0)
+    partial.replace(directory / "tickets.csv")
+    return {"tickets": tickets, "shows": len(shows), **n}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="synthetic cinema CSVs")
+    parser.add_argument("directory")
+    parser.add_argument("--tickets", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    counts = generate(args.directory, args.tickets, args.seed)
+    print(", ".join(f"{k} {v:,}" for k, v in counts.items()),
+          f"in {time.perf_counter() - t0:.1f}s")
@@ -0,0 +1,270 @@
+# سلاسل الإيراد الزمنية (/revenue/revenue/series):
+#   - كل segment في الفهرس عنده أوقات مرتبة و prefix sum للإيراد بنفس
+#     الترتيب، فإيراد وعدد تذاكر أي مدى [start, end) = searchsorted مرتين
+#     (O(log n)) بدل تجميع كل التذاكر
+#   - فلتر عمود واحد (مثلاً أفلام معينة) يستخدم نفس الفكرة لكل مفتاح؛ باقي
+#     تركيبات الفلاتر تنحسب من الصفوف المطابقة (الفهرس) وترتيبها
+#   - حدود الفترات (ساعة/يوم/أسبوع/شهر) تنحسب بتوقيت المنطقة المطلوبة (الرياض
+#     افتراضياً) وتتحول لتوقيت البيانات المخزنة
+#
+#   python -m cinema_api.timeseries   # مقارنة مع groupby على الصفوف + زمن
+import os
+import numpy as np
+import pandas as pd
+from cinema_api.indexes import NAT, prefix_sums, time_values
+from cinema_api.metrics import span
+
+# المنطقة الزمنية لأوقات purchase_time المخزنة (بدون tz) — صالاتنا بالرياض
+DATA_TZ = os.environ.get("CINEMA_DATA_TZ", "Asia/Riyadh")
+DEFAULT_TZ = "Asia/Riyadh"
+
+FREQS = {"hour": "h", "day": "D", "week": "W-MON", "month": "MS"}
+MAX_BUCKETS = 10_000
+ONE_NS = pd.Timedelta(1, "ns")
+MAX_KEY_LINES = 256  # أكثر من كذا مفتاح: أسرع نحسب من الصفوف المطابقة
+
+
+def bucket_start(ts, bucket):
+    """بداية الفترة اللي فيها ts (بنفس منطقته الزمنية)."""
+    if bucket == "hour":
+        return ts.floor("h")
+    day = ts.tz_localize(None).normalize()
+    if bucket == "week":
+        day -= pd.Timedelta(days=day.weekday())
+    elif bucket == "month":
+        day = day.replace(day=1)
+    return day.tz_localize(ts.tz, nonexistent="shift_forward", ambiguous=False)
+
+
+def to_data_ns(stamps):
+    """أوقات بـ tz → int64 ns بتوقيت البيانات المخزنة (نفس فهرس purchase_time)."""
+    return stamps.tz_convert(DATA_TZ).tz_localize(None).as_unit("ns").asi8
+
+
+def parse_time(value, tz):
+    """تاريخ الطلب بتوقيت tz (لو ما فيه منطقة زمنية)."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize(tz) if ts.tz is None else ts.tz_convert(tz)
+
+
+def extent(snapshot):
+    """(أول وقت، آخر وقت) في البيانات كـ int64 ns، أو None لو ما فيه أوقات."""
+    if snapshot.partitions is not None:
+        return snapshot.partitions.extent()
+    lines = [s.revenue_line[0] for s in snapshot.index.segments]
+    lines = [times for times in lines if len(times)]
+    if not lines:
+        return None
+    return min(t[0] for t in lines), max(t[-1] for t in lines)
+
+
+def data_time(ns, tz):
+    return pd.Timestamp(ns).tz_localize(DATA_TZ).tz_convert(tz)
+
+
+def period_range(snapshot, tz, start_date=None, end_date=None):
+    """(start, end) بتوقيت tz للمدى [start_date, end_date] (شامل end_date مثل
+    /filter/data): end = أول لحظة بعد المدى. الناقص منها من مدى البيانات."""
+    bounds = extent(snapshot)
+    start = parse_time(start_date, tz) if start_date else \
+        data_time(bounds[0], tz) if bounds else None
+    end = parse_time(end_date, tz) + ONE_NS if end_date else \
+        data_time(bounds[1], tz) + ONE_NS if bounds else None
+    return start, end
+
+
+def bucket_count(start, end, bucket):
+    """عدد تقريبي (حد أعلى) للفترات — للتحقق قبل الحساب."""
+    if start is None or end is None or end <= start:
+        return 0
+    hours = (end - start) / pd.Timedelta(hours=1)
+    return int(hours / {"hour": 1, "day": 23, "week": 167, "month": 672}[bucket]) + 2
+
+
+def edges(start, end, bucket, before=0):
+    """حدود الفترات (DatetimeIndex بـ tz): أول حد بداية الفترة اللي فيها start
+    (ومعها before فترات قبلها)، وآخر حد بعد end."""
+    freq = FREQS[bucket]
+    first = bucket_start(start, bucket)
+    if before:
+        first = pd.date_range(end=first, periods=before + 1, freq=freq)[0]
+    stamps = pd.date_range(first, end, freq=freq)
+    if not len(stamps) or stamps[-1] < end:
+        stamps = stamps.append(pd.date_range(stamps[-1] if len(stamps) else first,
+                                             periods=2, freq=freq)[1:])
+    return stamps
+
+
+def clip(stamps, start, end, skip=0):
+    """الحدود كـ ns بتوقيت البيانات، وأول وآخر فترة مقصوصة على [start, end)
+    (أول skip حد — فترات المتوسط المتحرك قبل المدى — تبقى كاملة)."""
+    bounds = to_data_ns(stamps)
+    low, high = to_data_ns(pd.DatetimeIndex([start, end]))
+    bounds[skip:] = np.clip(bounds[skip:], low, high)
+    return bounds
+
+
+# -----------------------
+# خطوط الإيراد: (أوقات مرتبة، prefix sum) — المجموع على أي مدى من searchsorted
+# -----------------------
+class ScanLines:
+    """خط لكل partition مطابق (الـ fragments مرتبة بالوقت أصلاً)، يتبني وقت
+    المرور عليه فالذاكرة بحجم partition واحد. within = (أول، آخر) حد مطلوب."""
+
+    def __init__(self, snapshot, dims, within):
+        self.snapshot = snapshot
+        self.dims = {**dims, "start_date": pd.Timestamp(within[0]),
+                     "end_date": pd.Timestamp(within[1])}
+
+    def __iter__(self):
+        for table, positions in self.snapshot.scan(**self.dims):
+            times = time_values(table.column("purchase_time", positions))
+            yield times, prefix_sums(table.column("total", positions).astype("float64"))
+
+
+def revenue_lines(snapshot, filters, within=None):
+    """خطوط تغطي الصفوف المطابقة لفلاتر الأبعاد (فلاتر التاريخ تنحسب بالحدود)."""
+    index = snapshot.index
+    dims = {**filters, "start_date": None, "end_date": None}
+    if snapshot.partitions is not None:
+        return ScanLines(snapshot, dims, within)
+    compiled = index.compile(**dims)
+    keys = compiled["keys"]
+    if compiled["min_total"] is None and not keys:
+        return [s.revenue_line for s in index.segments]
+    if compiled["min_total"] is None and len(keys) == 1:
+        (column, ids), = keys.items()
+        if len(ids) <= MAX_KEY_LINES:
+            lines = []
+            for segment in index.segments:
+                per_key = segment.key_lines(column)
+                lines.extend(per_key[i] for i in ids if i in per_key)
+            return lines
+
+    positions = index.select(**dims)
+    times = time_values(snapshot.table.column("purchase_time", positions))
+    totals = snapshot.table.column("total", positions).astype("float64")
+    dated = times != NAT
+    order = np.argsort(times[dated], kind="stable")
+    return [(times[dated][order], prefix_sums(totals[dated][order]))]
+
+
+def range_totals(lines, bounds):
+    """(الإيراد، عدد التذاكر) لكل فترة [bounds[i], bounds[i+1])."""
+    revenue = np.zeros(max(0, len(bounds) - 1))
+    tickets = np.zeros(len(revenue), dtype=np.int64)
+    for times, prefix in lines:
+        idx = np.searchsorted(times, bounds, "left")
+        revenue += np.diff(prefix[idx])
+        tickets += np.diff(idx)
+    return revenue, tickets
+
+
+def moving_average(values, window):
+    """متوسط آخر window قيمة (القيم الأولى window-1 قبل المدى المطلوب)."""
+    sums = np.cumsum(np.concatenate([[0.0], values]))
+    return (sums[window:] - sums[:-window]) / window
+
+
+def money(value):
+    return round(float(value), 2)
+
+
+def series(snapshot, filters, bucket="day", tz=DEFAULT_TZ, window=None, compare=None):
+    """الإيراد وعدد التذاكر لكل فترة في [start_date, end_date] بتوقيت tz.
+    window: متوسط متحرك على آخر window فترة؛ compare="yoy": نفس الفترة
+    السنة الماضية ونسبة النمو."""
+    start, end = period_range(snapshot, tz, filters["start_date"], filters["end_date"])
+    out = {"bucket": bucket, "tz": tz, "start": None, "end": None,
+           "totals": {"revenue": 0.0, "tickets": 0}, "series": []}
+    if start is None or end <= start:
+        return out
+
+    before = (window - 1) if window else 0
+    stamps = edges(start, end, bucket, before)
+    bounds = clip(stamps, start, end, before)
+    year = pd.DateOffset(years=1)
+    previous = clip(stamps[before:] - year, start - year, end - year) \
+        if compare == "yoy" else bounds
+    with span("filter"):
+        lines = revenue_lines(snapshot, filters,
+                              (min(bounds[0], previous[0]), max(bounds[-1], previous[-1])))
+    with span("aggregate"):
+        revenue, tickets = range_totals(lines, bounds)
+
+    rows = [{"start": s.isoformat()} for s in stamps[before:-1]]
+    for row, r, t in zip(rows, revenue[before:], tickets[before:]):
+        row["revenue"] = money(r)
+        row["tickets"] = int(t)
+    if window:
+        for row, r, t in zip(rows, moving_average(revenue, window),
+                             moving_average(tickets, window)):
+            row["revenue_ma"] = money(r)
+            row["tickets_ma"] = round(float(t), 2)
+    if compare == "yoy":
+        prev_revenue, prev_tickets = range_totals(lines, previous)
+        for row, r, p, t in zip(rows, revenue[before:], prev_revenue, prev_tickets):
+            row["revenue_last_year"] = money(p)
+            row["tickets_last_year"] = int(t)
+            row["growth_pct"] = round((r - p) / p * 100, 2) if p else None
+
+    out.update(start=start.isoformat(), end=(end - ONE_NS).isoformat(), series=rows,
+               totals={"revenue": money(revenue[before:].sum()),
+                       "tickets": int(tickets[before:].sum())})
+    return out
+
+
+def revenue_series(snapshot, filters, bucket, tz, window, compare):
+    return series(snapshot, filters, bucket, tz, window, compare), {}
+
+
+# -----------------------
+# تحقق: نفس الأرقام من groupby على الصفوف المفلترة
+# -----------------------
+def naive_series(snapshot, filters, bucket, tz):
+    start, end = period_range(snapshot, tz, filters["start_date"], filters["end_date"])
+    positions = snapshot.index.select(**{**filters, "start_date": None, "end_date": None})
+    frame = snapshot.table.to_frame(0, snapshot.rows) if positions is None else \
+        snapshot.table.take(positions)
+    times = frame["purchase_time"].dt.tz_localize(DATA_TZ).dt.tz_convert(tz)
+    keep = (times >= start) & (times < end)
+    frame, times = frame[keep], times[keep]
+    buckets = times.map(lambda t: bucket_start(t, bucket))
+    grouped = frame["total"].astype("float64").groupby(buckets.to_numpy())
+    return {k.isoformat(): (money(v), int(c))
+            for (k, v), c in zip(grouped.sum().items(), grouped.size())}
+
+
+if __name__ == "__main__":
+    import time
+
+    from cinema_api.data_loader import get_snapshot
+
+    snapshot = get_snapshot()
+    blank = {"start_date": None, "end_date": None, "customers": None, "movies": None,
+             "theaters": None, "seat_type": None, "min_total": None}
+    movie = str(snapshot.table.decode("movie_id", np.array([0]))[0]).lower()
+    cases = [
+        ("all", blank),
+        ("one movie", {**blank, "movies": [movie]}),
+        ("min_total", {**blank, "min_total": 50.0, "start_date": "2025-05-03T10:30"}),
+    ]
+    for label, filters in cases:
+        for bucket in FREQS:
+            for tz in ("Asia/Riyadh", "UTC", "Europe/London"):
+                got = series(snapshot, filters, bucket, tz)
+                fast = {row["start"]: (row["revenue"], row["tickets"])
+                        for row in got["series"] if row["tickets"]}
+                slow = naive_series(snapshot, filters, bucket, tz)
+                bad = [k for k in slow.keys() | fast.keys()
+                       if k not in fast or k not in slow
+                       or abs(fast[k][0] - slow[k][0]) > 0.05 or fast[k][1] != slow[k][1]]
+                assert not bad, (label, bucket, tz, bad[:3])
+        t0 = time.perf_counter()
+        for _ in range(20):
+            series(snapshot, filters, "day", DEFAULT_TZ, window=7, compare="yoy")
+        fast_ms = (time.perf_counter() - t0) / 20 * 1000
+        t0 = time.perf_counter()
+        naive_series(snapshot, filters, "day", DEFAULT_TZ)
+        slow_ms = (time.perf_counter() - t0) * 1000
+        print(f"{label:<10} ok  series {fast_ms:7.2f} ms   groupby {slow_ms:8.2f} ms")
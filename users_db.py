@@ -1,35 +1,324 @@
+# المستخدمين وجلسات الدخول (SQLite):
+#   - اتصال واحد مفتوح لكل thread (بدل اتصال جديد مع كل استدعاء) بـ WAL:
+#     القراءات ما تنتظر الكتابة، و synchronous=NORMAL يكفي مع WAL. نفس نص
+#     الـ SQL دايماً فـ sqlite3 يعيد استخدام الـ statement المجهز (cached_statements)
+#   - كلمات المرور بـ scrypt مع salt لكل مستخدم (الصيغة في العمود نفسه، فنقدر
+#     نغير البارامترات لاحقاً). كلمات المرور القديمة (نص عادي) تتحول لـ hash
+#     أول ما صاحبها يسجل دخول
+#   - الدخول يصدر token عشوائي؛ الجدول فيه sha256 حقه بس (تسريب القاعدة ما
+#     يعطي tokens شغالة). التحقق من الـ token من كاش في الذاكرة (TTL + LRU)،
+#     فالطلب الموثّق ما يحتاج hash كلمة مرور ولا القاعدة
+#
+#   python users_db.py [threads]   # دخول/ثانية وتحقق tokens/ثانية مع threads
+from collections import OrderedDict
+import base64
+from functools import lru_cache
+import hashlib
+import hmac
+import os
+import secrets
 import sqlite3
+import threading
+import time
 
-DB_NAME = "users.db"
+DB_NAME = os.environ.get("CINEMA_USERS_DB", "users.db")
+SESSION_TTL = int(os.environ.get("CINEMA_SESSION_TTL", str(12 * 3600)))  # ثواني
+CACHE_ENTRIES = 10_000
+# الكاش يرجع للقاعدة كل CACHE_TTL ثانية على الأكثر، فالـ token اللي ينلغى من
+# عملية ثانية (worker ثاني) يوقف خلال هالمدة
+CACHE_TTL = 60
+# الجلسات المنتهية تنمسح مع أول دخول بعد كل PURGE_INTERVAL ثانية
+PURGE_INTERVAL = int(os.environ.get("CINEMA_SESSION_PURGE_INTERVAL", "3600"))
+SCRYPT = {"n": 2 ** 14, "r": 8, "p": 1}
 
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE,
+    password TEXT
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    token_hash TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    created REAL NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires);
+"""
+
+_last_purge = 0.0
+
+_local = threading.local()
+_connections = []  # كل الاتصالات المفتوحة (close_all)
+_connections_lock = threading.Lock()
+
+
+def connection():
+    """اتصال الـ thread الحالي (ينفتح أول مرة بس)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "name", None) != DB_NAME:
+        conn = sqlite3.connect(DB_NAME, timeout=5, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        _local.conn, _local.name = conn, DB_NAME
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+
+def close_all():
+    """يسكّر اتصالات كل الـ threads (نهاية التشغيل أو الاختبارات)."""
+    with _connections_lock:
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass  # اتصال thread ثاني: ينسكّر لما الـ thread يخلص
+        _connections.clear()
+    _local.conn = None
+    tokens.clear()
+
+
+# -----------------------
+# كلمات المرور
+# -----------------------
+def hash_password(password):
+    """"scrypt$n$r$p$salt$hash" (base64)."""
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, dklen=32, **SCRYPT)
+    encode = lambda b: base64.b64encode(b).decode()  # noqa: E731
+    return f"scrypt${SCRYPT['n']}${SCRYPT['r']}${SCRYPT['p']}${encode(salt)}${encode(digest)}"
+
+
+def verify_password(stored, password):
+    """(صحيحة؟، يحتاج hash جديد؟) — الثاني للنص العادي أو بارامترات قديمة."""
+    if not stored:
+        return False, False
+    if not stored.startswith("scrypt$"):
+        return hmac.compare_digest(stored.encode(), password.encode()), True
+    _, n, r, p, salt, digest = stored.split("$")
+    check = hashlib.scrypt(password.encode(), salt=base64.b64decode(salt),
+                           n=int(n), r=int(r), p=int(p), dklen=32)
+    outdated = (int(n), int(r), int(p)) != (SCRYPT["n"], SCRYPT["r"], SCRYPT["p"])
+    return hmac.compare_digest(check, base64.b64decode(digest)), outdated
+
+
+# -----------------------
+# المستخدمين
+# -----------------------
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    # إنشاء جدول المستخدمين لو غير موجود
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        password TEXT
-    )
-    """)
+    conn = connection()
+    conn.executescript(SCHEMA)
     conn.commit()
-    conn.close()
+
 
 def add_user(username, password):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+    """True لو انضاف، False لو الاسم موجود."""
+    conn = connection()
     try:
-        c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password))
-        conn.commit()
+        with conn:
+            conn.execute("INSERT INTO users (username, password) VALUES (?, ?)",
+                         (username, hash_password(password)))
     except sqlite3.IntegrityError:
-        pass  # المستخدم موجود مسبقاً
-    conn.close()
+        return False  # المستخدم موجود مسبقاً
+    return True
+
 
 def get_user(username, password):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE username=? AND password=?", (username, password))
-    user = c.fetchone()
-    conn.close()
+    """صف المستخدم (id, username, password) لو كلمة المرور صحيحة، وإلا None."""
+    conn = connection()
+    user = conn.execute("SELECT id, username, password FROM users WHERE username = ?",
+                        (username,)).fetchone()
+    if user is None:
+        # نفس زمن المستخدم الموجود تقريباً: ما يبين أي الأسماء موجودة
+        verify_password(_dummy_hash(), password)
+        return None
+    valid, outdated = verify_password(user[2], password)
+    if not valid:
+        return None
+    if outdated:
+        with conn:
+            conn.execute("UPDATE users SET password = ? WHERE id = ?",
+                         (hash_password(password), user[0]))
     return user
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash():
+    return hash_password(secrets.token_hex(8))
+
+
+# -----------------------
+# الجلسات
+# -----------------------
+class TokenCache:
+    """token hash → (username، ينتهي) مع LRU وحد CACHE_TTL للمدخل."""
+
+    def __init__(self, max_entries=CACHE_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= now:
+                self.misses += 1
+                if entry is not None:
+                    del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, username, expires, now):
+        with self._lock:
+            self.entries[key] = (username, min(expires, now + self.ttl))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+tokens = TokenCache()
+
+
+def _token_hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def login(username, password, ttl=SESSION_TTL):
+    """(token، وقت الانتهاء) لو كلمة المرور صحيحة، وإلا None."""
+    user = get_user(username, password)
+    if user is None:
+        return None
+    token = secrets.token_urlsafe(32)
+    now = time.time()
+    _purge_expired(now)
+    conn = connection()
+    with conn:
+        conn.execute("INSERT INTO sessions (token_hash, user_id, created, expires) "
+                     "VALUES (?, ?, ?, ?)", (_token_hash(token), user[0], now, now + ttl))
+    tokens.put(_token_hash(token), user[1], now + ttl, now)
+    return token, now + ttl
+
+
+def validate(token):
+    """اسم المستخدم لو الـ token شغال، وإلا None (من الكاش، والقاعدة لو مو فيه)."""
+    if not token:
+        return None
+    key, now = _token_hash(token), time.time()
+    username = tokens.get(key, now)
+    if username is not None:
+        return username
+    row = _session(key, now)
+    if row is None:
+        return None
+    tokens.put(key, row[0], row[1], now)
+    return row[0]
+
+
+def _session(key, now):
+    """(username، ينتهي) من جدول الجلسات، أو None."""
+    return connection().execute(
+        "SELECT users.username, sessions.expires FROM sessions "
+        "JOIN users ON users.id = sessions.user_id "
+        "WHERE sessions.token_hash = ? AND sessions.expires > ?", (key, now)).fetchone()
+
+
+def logout(token):
+    key = _token_hash(token)
+    tokens.pop(key)
+    conn = connection()
+    with conn:
+        conn.execute("DELETE FROM sessions WHERE token_hash = ?", (key,))
+
+
+def purge_sessions():
+    """يمسح الجلسات المنتهية، ويرجع عددها."""
+    conn = connection()
+    with conn:
+        return conn.execute("DELETE FROM sessions WHERE expires <= ?", (time.time(),)).rowcount
+
+
+def _purge_expired(now):
+    """purge_sessions مرة كل PURGE_INTERVAL على الأكثر (من login)."""
+    global _last_purge
+    if now - _last_purge < PURGE_INTERVAL:
+        return
+    _last_purge = now
+    purge_sessions()
+
+
+if __name__ == "__main__":
+    # python users_db.py [threads]
+    # الطريقة القديمة (اتصال جديد كل استدعاء، كلمة المرور نص) مقابل الجديدة
+    import sys
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    DB_NAME = os.path.join(tempfile.mkdtemp(), "users.db")
+    init_db()
+    for i in range(threads):
+        add_user(f"user{i}", f"password{i}")
+
+    def rate(func, seconds=2.0):
+        """عمليات/ثانية لـ func(i) من threads بالتوازي."""
+        deadline = time.perf_counter() + seconds
+
+        def worker(i):
+            n = 0
+            while time.perf_counter() < deadline:
+                func(i)
+                n += 1
+            return n
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            total = sum(pool.map(worker, range(threads)))
+        return total / (time.perf_counter() - started)
+
+    old = sqlite3.connect(DB_NAME)
+    old.execute("CREATE TABLE plain (username TEXT UNIQUE, password TEXT)")
+    old.executemany("INSERT INTO plain VALUES (?, ?)",
+                    [(f"user{i}", f"password{i}") for i in range(threads)])
+    old.commit()
+    old.close()
+
+    def plain_check(i):
+        conn = sqlite3.connect(DB_NAME)
+        conn.execute("SELECT * FROM plain WHERE username=? AND password=?",
+                     (f"user{i}", f"password{i}")).fetchone()
+        conn.close()
+
+    issued = [login(f"user{i}", f"password{i}")[0] for i in range(threads)]
+    keys = [_token_hash(token) for token in issued]
+
+    print(f"{threads} threads")
+    print(f"  old get_user (connect + plaintext) : {rate(plain_check):12,.0f} /s")
+    print(f"  login (scrypt + session insert)    : "
+          f"{rate(lambda i: login(f'user{i}', f'password{i}')):12,.0f} /s")
+    print(f"  token check, database              : {rate(lambda i: _session(keys[i], time.time())):12,.0f} /s")
+    tokens.clear()
+    print(f"  token check, cached                : {rate(lambda i: validate(issued[i])):12,.0f} /s")
+    t0 = time.perf_counter()
+    for _ in range(100_000):
+        validate(issued[0])
+    print(f"  cached check latency               : "
+          f"{(time.perf_counter() - t0) / 100_000 * 1e6:12.2f} µs")
+    print(f"  cache: {tokens.stats()}, expired sessions purged: {purge_sessions()}")